@@ -14,4 +14,8 @@ python src/manage.py migrate
 
 # Start server
 echo "Starting server..."
+if [ "$SERVER_MODE" = "asgi" ]; then
+  # Production: gunicorn + uvicorn workers (see gunicorn.conf.py)
+  exec gunicorn -c gunicorn.conf.py recommender_project.asgi:application
+fi
 python src/manage.py runserver 0.0.0.0:8000
\ No newline at end of file
@@ -0,0 +1,27 @@
+# backend/gunicorn.conf.py
+# Production server: gunicorn managing uvicorn workers running the ASGI app.
+#
+#   gunicorn -c gunicorn.conf.py recommender_project.asgi:application
+#
+# Every worker is a single-threaded event loop, so slow clients cost a
+# socket and a coroutine rather than a thread. Sync (DRF) views still work;
+# Django runs them in a thread pool. Tune with the environment variables below.
+import multiprocessing
+import os
+
+chdir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src')
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+worker_class = 'uvicorn.workers.UvicornWorker'
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+
+# Recycle workers now and then so a slow leak can't grow without bound
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 10000))
+max_requests_jitter = max_requests // 10
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 60))
+graceful_timeout = 30
+keepalive = 75  # Longer than the load balancer's idle timeout, so it closes first
+
+# Load the app (and Django) once in the master, so workers share its memory
+preload_app = True
+accesslog = '-'
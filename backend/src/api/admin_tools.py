@@ -0,0 +1,89 @@
+# backend/src/api/admin_tools.py
+"""
+Admin building blocks for tables with millions of rows.
+
+The stock changelist runs COUNT(*) over the whole table twice per page
+(once for the paginator, once for "N total"), loads every column of every
+row it shows and searches with LIKE '%term%', which can't use an index. A
+LargeTableAdmin instead:
+
+- takes the unfiltered total from the planner's estimate (pg_class.reltuples)
+  once the table is past ADMIN_ESTIMATED_COUNT_MIN rows, and skips the
+  second count altogether;
+- loads only `list_only` for the rows on the page;
+- searches `prefix_search_fields` with istartswith, which the expression
+  indexes from the apps' migrations (UPPER(column) text_pattern_ops) serve
+  on Postgres.
+"""
+from functools import cached_property, reduce
+from operator import or_
+
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.admin.views.main import ChangeList
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Counts an unfiltered queryset from the planner's row estimate on
+    Postgres, when the table is big enough for COUNT(*) to hurt. Filtered
+    querysets, small tables and other databases get the exact count.
+    """
+
+    @cached_property
+    def count(self):
+        query = getattr(self.object_list, 'query', None)
+        if query is not None and not query.where and not query.distinct:
+            estimate = self._estimate(self.object_list)
+            if estimate is not None and estimate >= settings.ADMIN_ESTIMATED_COUNT_MIN:
+                return estimate
+        return super().count
+
+    @staticmethod
+    def _estimate(queryset):
+        connection = connections[queryset.db]
+        if connection.vendor != 'postgresql':
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                [queryset.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+        # -1 until the table has been vacuumed or analyzed
+        return row[0] if row and row[0] >= 0 else None
+
+
+class ProjectedChangeList(ChangeList):
+    def get_queryset(self, request, exclude_parameters=None):
+        queryset = super().get_queryset(request, exclude_parameters)
+        if self.model_admin.list_only:
+            queryset = queryset.only(*self.model_admin.list_only)
+        return queryset
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_only = None  # Fields to load for the changelist; None loads them all
+    prefix_search_fields = ()
+
+    def get_changelist(self, request, **kwargs):
+        return ProjectedChangeList
+
+    def get_search_fields(self, request):
+        # The admin only shows the search box when there are search fields
+        return self.prefix_search_fields
+
+    def get_search_results(self, request, queryset, search_term):
+        """
+        Rows where any of `prefix_search_fields` starts with the search term.
+        """
+        term = search_term.strip()
+        if not term or not self.prefix_search_fields:
+            return queryset, False
+        condition = reduce(or_, (Q(**{f'{field}__istartswith': term}) for field in self.prefix_search_fields))
+        return queryset.filter(condition), False
@@ -0,0 +1,226 @@
+# backend/src/api/async_views.py
+"""
+Async-native versions of the quiz and recommendation endpoints.
+
+DRF views are synchronous, so under ASGI each one ties up a thread for the
+whole request. These are plain Django async views with the same behaviour
+and JSON shapes as their DRF counterparts in views.py, built on the async ORM
+and cache APIs, so one ASGI worker can hold thousands of slow clients.
+"""
+import json
+from functools import partial, wraps
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse, HttpResponseNotModified, JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+from rest_framework.exceptions import AuthenticationFailed
+
+from products.fragments import RawJSON
+from products.versioning import aget_catalog_version
+from quiz.services import QuizValidationError, aprocess_quiz
+from recommendations.cache import acache_recommendations, aget_cached_recommendations, profile_version
+from recommendations.jobs import aempty_capsule_version, aenqueue_recompute, ahas_recent_job, amaterialize_recommendations
+from recommendations.models import Recommendation
+from recommendations.pagination import (
+    ahas_next_page, decode_cursor, etag_matches, load_page, make_etag, next_link,
+)
+from recommender_project.routers import on_primary, reading_replica, replica_reads
+from users.authentication import AsyncJWTAuthentication
+from users.models import UserProfile
+from .metrics import stage
+from .renderers import render_json
+
+
+def jwt_required(view=None, *, cached=True):
+    """
+    The async equivalent of @permission_classes([IsAuthenticated]) with JWT
+    authentication: sets request.user or answers 401. Views that write use
+    @jwt_required(cached=False), so they get the user from the database.
+    """
+    if view is None:
+        return partial(jwt_required, cached=cached)
+    authentication = AsyncJWTAuthentication(cached=cached)
+
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        try:
+            result = await authentication.aauthenticate(request)
+        except AuthenticationFailed as e:  # InvalidToken is a subclass
+            # Same body DRF would render for the exception
+            result, body = None, e.detail if isinstance(e.detail, dict) else {"detail": e.detail}
+        else:
+            body = {"detail": "Authentication credentials were not provided."}
+        if result is None:
+            return JsonResponse(
+                body, status=401,
+                headers={'WWW-Authenticate': authentication.authenticate_header(request)},
+            )
+        request.user, request.auth = result
+        return await view(request, *args, **kwargs)
+
+    return wrapper
+
+
+ROW_FIELDS = ('profile_version', 'catalog_version', 'product__public_json')
+
+
+async def _materialized_rows(user_id):
+    """
+    The user's materialized capsule as tuples, like the values_list() in views.py.
+    """
+    # values() rather than values_list(): on Django 5.2 values_list().aiterator()
+    # runs the query on the event loop thread and fails
+    queryset = Recommendation.objects.filter(user_id=user_id).order_by('rank').values(*ROW_FIELDS)
+    return [tuple(row[field] for field in ROW_FIELDS) async for row in queryset.aiterator()]
+
+
+@csrf_exempt
+@require_POST
+@jwt_required(cached=False)
+async def quiz_submit(request):
+    """
+    Async version of views.quiz_submit.
+    """
+    user = request.user
+
+    try:
+        quiz_data = json.loads(request.body)
+        with stage('score'):
+            changed = await aprocess_quiz(user, quiz_data)
+        if changed:
+            # Build the new capsule in the background so the results page is ready
+            with stage('enqueue'):
+                await aenqueue_recompute(user.pk)
+        return JsonResponse({"status": "success", "message": "Profile updated successfully."})
+    except QuizValidationError as e:
+        return JsonResponse({"status": "error", "message": str(e), "errors": e.errors}, status=400)
+    except Exception as e:
+        return JsonResponse({"status": "error", "message": str(e)}, status=400)
+
+
+@replica_reads()
+@require_GET
+@jwt_required
+async def get_recommendations(request):
+    """
+    Async version of views.get_recommendations. The one difference: when no
+    capsule is materialized and no job is queued for it (or just failed),
+    this view builds it inline (in a worker thread) rather than answering
+    202, since waiting costs an async worker next to nothing.
+    """
+    user = request.user
+
+    try:
+        profile = user.profile # Fetched together with the user by AsyncJWTAuthentication
+    except UserProfile.DoesNotExist:
+        return JsonResponse({"error": "User profile not found. Please complete the quiz first."}, status=404)
+
+    with stage('version'):
+        catalog_version = await aget_catalog_version()
+    version = profile_version(profile)
+
+    if 'cursor' in request.GET:
+        return await _ranking_page(request, profile, version, catalog_version)
+
+    etag = make_etag(user.pk, version, catalog_version)
+    if etag_matches(request, etag):
+        return _not_modified(etag)
+
+    with stage('cache'):
+        data = await aget_cached_recommendations(user.pk, profile, catalog_version)
+        more = data is not None and await ahas_next_page(user.pk, profile, version, catalog_version)
+    if data is not None:
+        return _page(request, data, version, catalog_version, 0, more)
+
+    with stage('db'):
+        rows = await _materialized_rows(user.pk)
+        if reading_replica() and (not rows or rows[0][0] != version):
+            # The replica may not have replayed the capsule the job just wrote
+            with on_primary():
+                rows = await _materialized_rows(user.pk)
+
+    if rows and rows[0][0] == version:
+        data, built_for = [RawJSON(row[2]) for row in rows], rows[0][1]
+    else:
+        # No rows may also mean the job found no products matching the profile
+        with stage('db'):
+            data, built_for = [], await aempty_capsule_version(user.pk, version)
+
+    if built_for is None:
+        with stage('enqueue'):
+            in_flight = await ahas_recent_job(user.pk)
+        if in_flight:
+            return JsonResponse(
+                {"status": "pending", "message": "Your recommendations are being generated."},
+                status=202,
+            )
+        # Built from, and read back from, the primary
+        with on_primary():
+            with stage('engine'):
+                built = await amaterialize_recommendations(user.pk)
+            with stage('db'):
+                rows = await _materialized_rows(user.pk)
+        data = [RawJSON(row[2]) for row in rows]
+        built_for = built[0].catalog_version if built else catalog_version
+
+    if built_for == catalog_version:
+        with stage('cache'):
+            await acache_recommendations(user.pk, profile, catalog_version, data)
+            more = await ahas_next_page(user.pk, profile, version, catalog_version)
+        return _page(request, data, version, catalog_version, 0, more)
+
+    with stage('enqueue'):
+        if not await ahas_recent_job(user.pk):
+            # The catalog has moved on: keep serving this capsule while a fresh one is built
+            await aenqueue_recompute(user.pk)
+    return _page(request, data, version, built_for, 0, more=False)
+
+
+# May load the catalog index or rebuild an evicted ranking, both synchronous
+aload_page = sync_to_async(load_page)
+
+
+async def _ranking_page(request, profile, version, catalog_version):
+    """
+    Async version of views._ranking_page.
+    """
+    try:
+        cursor_version, cursor_catalog_version, offset = decode_cursor(request.GET['cursor'])
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    if (cursor_version, cursor_catalog_version) != (version, catalog_version):
+        return JsonResponse(
+            {"error": "Your recommendations have changed since this page was requested. Start again from the first page."},
+            status=410,
+        )
+
+    etag = make_etag(request.user.pk, version, catalog_version, offset)
+    if etag_matches(request, etag):
+        return _not_modified(etag)
+
+    with stage('cache'):
+        data, more = await aload_page(request.user.pk, profile, version, catalog_version, offset)
+    return _page(request, data, version, catalog_version, offset, more)
+
+
+def _page(request, data, version, catalog_version, offset, more):
+    etag = make_etag(request.user.pk, version, catalog_version, offset)
+    # Now that there is a page, `If-None-Match: *` (or the stale capsule's tag) applies
+    if etag_matches(request, etag, exists=True):
+        return _not_modified(etag)
+    response = HttpResponse(
+        render_json(data), content_type='application/json',
+        headers=_cache_headers(etag),
+    )
+    if more:
+        response['Link'] = next_link(request, version, catalog_version, offset + len(data))
+    return response
+
+
+def _not_modified(etag):
+    return HttpResponseNotModified(headers=_cache_headers(etag))
+
+
+def _cache_headers(etag):
+    return {'ETag': etag, 'Cache-Control': 'private, no-cache', 'Vary': 'Authorization'}
@@ -0,0 +1,278 @@
+# backend/src/api/metrics.py
+"""
+Per-process request metrics, exported in the Prometheus text format.
+
+`api.middleware.RequestMetricsMiddleware` records every request against its
+URL name (not the raw path, so the number of series stays bounded): a
+latency histogram, response status classes and response sizes. A sampled
+fraction of requests (METRICS_SAMPLE_RATE) also has its SQL queries counted
+and timed, by a wrapper installed on every database connection.
+
+Views mark the stages of the recommendation pipeline with `stage()`; the
+durations end up both in the metrics and in the response's Server-Timing
+header.
+
+Counters live in a fixed number of shards picked by thread id, each with its
+own lock, so request threads almost never contend and memory doesn't grow
+with the number of threads. Every process keeps its own counters; scrape
+each worker (or run one worker per metrics port) to see them all.
+"""
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SHARD_COUNT = 16
+OVERFLOW_VIEW = 'other'
+UNMATCHED_VIEW = 'unmatched'
+
+_current = contextvars.ContextVar('request_metrics', default=None)
+
+
+class RequestTimings:
+    """
+    What one in-flight request has measured so far.
+    """
+
+    def __init__(self, sampled):
+        self.started = time.perf_counter()
+        self.sampled = sampled
+        self.stages = {}
+        self.queries = 0
+        self.query_seconds = 0.0
+
+    def add_stage(self, name, seconds):
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def time_query(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.query_seconds += time.perf_counter() - started
+            self.queries += 1
+
+    def server_timing(self, total):
+        parts = [f'{name};dur={seconds * 1000:.2f}' for name, seconds in self.stages.items()]
+        if self.sampled:
+            parts.append(f'sql;desc="{self.queries} queries";dur={self.query_seconds * 1000:.2f}')
+        parts.append(f'total;dur={total * 1000:.2f}')
+        return ', '.join(parts)
+
+
+@contextmanager
+def stage(name):
+    """
+    Times a block as one named stage of the current request. A no-op outside
+    of a request (e.g. in background jobs or management commands).
+    """
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add_stage(name, time.perf_counter() - started)
+
+
+def _query_wrapper(execute, sql, params, many, context):
+    timings = _current.get()
+    if timings is None or not timings.sampled:
+        return execute(sql, params, many, context)
+    return timings.time_query(execute, sql, params, many, context)
+
+
+def install_query_wrapper(sender, connection, **kwargs):
+    """
+    connection_created receiver. Wrapping the connection itself, rather than
+    using connection.execute_wrapper() per request, also catches the queries
+    async views run through sync_to_async in other threads: the request's
+    context (and so its RequestTimings) travels with them.
+    """
+    if _query_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_query_wrapper)
+
+
+@contextmanager
+def track_request(sampled):
+    timings = RequestTimings(sampled)
+    token = _current.set(timings)
+    try:
+        yield timings
+    finally:
+        _current.reset(token)
+
+
+class _ViewStats:
+    __slots__ = (
+        'requests', 'statuses', 'buckets', 'seconds', 'response_bytes', 'sampled',
+        'queries', 'query_seconds', 'stages',
+    )
+
+    def __init__(self):
+        self.requests = 0
+        self.statuses = {}
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)  # the last one is +Inf
+        self.seconds = 0.0
+        self.response_bytes = 0
+        self.sampled = 0
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.stages = {}  # name -> [count, seconds]
+
+    def merge(self, other):
+        self.requests += other.requests
+        for status, count in other.statuses.items():
+            self.statuses[status] = self.statuses.get(status, 0) + count
+        self.buckets = [a + b for a, b in zip(self.buckets, other.buckets)]
+        self.seconds += other.seconds
+        self.response_bytes += other.response_bytes
+        self.sampled += other.sampled
+        self.queries += other.queries
+        self.query_seconds += other.query_seconds
+        for name, (count, seconds) in other.stages.items():
+            totals = self.stages.setdefault(name, [0, 0.0])
+            totals[0] += count
+            totals[1] += seconds
+
+
+class _Shard:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.views = {}
+
+
+class MetricsRegistry:
+    def __init__(self, max_views=200, shards=SHARD_COUNT):
+        # Caps the (view, method) pairs we track; anything past it is lumped into "other"
+        self.max_views = max_views
+        self._shards = [_Shard() for _ in range(shards)]
+        self._keys = set()
+        self._keys_lock = threading.Lock()
+
+    def _key(self, view, method):
+        key = (view, method)
+        if key in self._keys:
+            return key
+        with self._keys_lock:
+            if len(self._keys) < self.max_views:
+                self._keys.add(key)
+                return key
+        return (OVERFLOW_VIEW, method)
+
+    def record(self, view, method, status, seconds, response_bytes, timings):
+        key = self._key(view, method)
+        bucket = len(LATENCY_BUCKETS)
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                bucket = i
+                break
+        status_class = f'{status // 100}xx'
+
+        shard = self._shards[threading.get_ident() % len(self._shards)]
+        with shard.lock:
+            stats = shard.views.get(key)
+            if stats is None:
+                stats = shard.views[key] = _ViewStats()
+            stats.requests += 1
+            stats.statuses[status_class] = stats.statuses.get(status_class, 0) + 1
+            stats.buckets[bucket] += 1
+            stats.seconds += seconds
+            if response_bytes is not None:
+                stats.response_bytes += response_bytes
+            if timings.sampled:
+                stats.sampled += 1
+                stats.queries += timings.queries
+                stats.query_seconds += timings.query_seconds
+            for name, stage_seconds in timings.stages.items():
+                totals = stats.stages.get(name)
+                if totals is None:
+                    totals = stats.stages[name] = [0, 0.0]
+                totals[0] += 1
+                totals[1] += stage_seconds
+
+    def collect(self):
+        """
+        Merges the shards into one {(view, method): _ViewStats} snapshot.
+        """
+        merged = {}
+        for shard in self._shards:
+            with shard.lock:
+                for key, stats in shard.views.items():
+                    merged.setdefault(key, _ViewStats()).merge(stats)
+        return merged
+
+    def reset(self):
+        for shard in self._shards:
+            with shard.lock:
+                shard.views.clear()
+        with self._keys_lock:
+            self._keys.clear()
+
+    def render(self):
+        """
+        The current counters in the Prometheus text exposition format.
+        """
+        stats_by_key = sorted(self.collect().items())
+        lines = []
+
+        def family(name, kind, help_text, samples):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            lines.extend(samples)
+
+        def labels(**values):
+            return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in values.items()) + '}'
+
+        histogram = []
+        for (view, method), stats in stats_by_key:
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS + ('+Inf',), stats.buckets):
+                cumulative += count
+                histogram.append(
+                    f'http_request_duration_seconds_bucket{labels(view=view, method=method, le=bound)} {cumulative}'
+                )
+            histogram.append(f'http_request_duration_seconds_sum{labels(view=view, method=method)} {stats.seconds}')
+            histogram.append(f'http_request_duration_seconds_count{labels(view=view, method=method)} {stats.requests}')
+        family('http_request_duration_seconds', 'histogram', 'Request latency by URL name.', histogram)
+
+        family('http_responses_total', 'counter', 'Responses by URL name and status class.', [
+            f'http_responses_total{labels(view=view, method=method, status=status)} {count}'
+            for (view, method), stats in stats_by_key
+            for status, count in sorted(stats.statuses.items())
+        ])
+        family('http_response_size_bytes_total', 'counter', 'Response body bytes by URL name.', [
+            f'http_response_size_bytes_total{labels(view=view, method=method)} {stats.response_bytes}'
+            for (view, method), stats in stats_by_key
+        ])
+        family('http_sampled_requests_total', 'counter', 'Requests instrumented for SQL (see METRICS_SAMPLE_RATE).', [
+            f'http_sampled_requests_total{labels(view=view, method=method)} {stats.sampled}'
+            for (view, method), stats in stats_by_key
+        ])
+        family('db_queries_total', 'counter', 'SQL queries run by sampled requests.', [
+            f'db_queries_total{labels(view=view, method=method)} {stats.queries}'
+            for (view, method), stats in stats_by_key
+        ])
+        family('db_query_seconds_total', 'counter', 'Time spent in SQL by sampled requests.', [
+            f'db_query_seconds_total{labels(view=view, method=method)} {stats.query_seconds}'
+            for (view, method), stats in stats_by_key
+        ])
+
+        stage_samples = []
+        for (view, method), stats in stats_by_key:
+            for name, (count, seconds) in sorted(stats.stages.items()):
+                stage_samples.append(f'pipeline_stage_seconds_sum{labels(view=view, method=method, stage=name)} {seconds}')
+                stage_samples.append(f'pipeline_stage_seconds_count{labels(view=view, method=method, stage=name)} {count}')
+        family('pipeline_stage_seconds', 'summary', 'Time spent in each stage of a view.', stage_samples)
+
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+registry = MetricsRegistry()
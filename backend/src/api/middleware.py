@@ -0,0 +1,61 @@
+# backend/src/api/middleware.py
+import random
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from .metrics import UNMATCHED_VIEW, registry, track_request
+
+
+class RequestMetricsMiddleware:
+    """
+    Records latency, status and response size for every request, and SQL
+    query counts/time for a sampled fraction of them (see api/metrics.py).
+    Adds a Server-Timing header with the per-stage breakdown.
+
+    Works in both sync and async stacks, so it doesn't force async views
+    back onto a thread. Keep it near the top of MIDDLEWARE so the timings
+    cover the rest of the stack.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = settings.METRICS_SAMPLE_RATE
+        self.server_timing = settings.METRICS_SERVER_TIMING
+        registry.max_views = settings.METRICS_MAX_VIEWS
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with track_request(self._sample()) as timings:
+            response = self.get_response(request)
+        return self._finish(request, response, timings)
+
+    async def __acall__(self, request):
+        with track_request(self._sample()) as timings:
+            response = await self.get_response(request)
+        return self._finish(request, response, timings)
+
+    def _sample(self):
+        return self.sample_rate >= 1 or random.random() < self.sample_rate
+
+    def _finish(self, request, response, timings):
+        elapsed = time.perf_counter() - timings.started
+
+        match = getattr(request, 'resolver_match', None)
+        view = (match.view_name or match.route) if match else UNMATCHED_VIEW
+        if response.streaming:
+            size = response.get('Content-Length')
+            size = int(size) if size else None
+        else:
+            size = len(response.content)
+        registry.record(view, request.method, response.status_code, elapsed, size, timings)
+
+        if self.server_timing:
+            response['Server-Timing'] = timings.server_timing(elapsed)
+        return response
@@ -0,0 +1,62 @@
+# backend/src/api/renderers.py
+import orjson
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+from products.fragments import RawJSON, join_fragments
+
+_encoder = JSONEncoder()
+
+
+def render_json(data):
+    """
+    Encodes a response body. Pre-serialized fragments (RawJSON, or a list of
+    them, either as the whole body or as a value of a top-level dict) are
+    copied through as they are; anything else goes through orjson, which
+    writes the same compact UTF-8 JSON as DRF's renderer, only faster.
+    """
+    if isinstance(data, RawJSON):
+        return data
+    if _is_fragment_list(data):
+        return join_fragments(data)
+    if isinstance(data, dict) and any(isinstance(value, RawJSON) or _is_fragment_list(value) for value in data.values()):
+        # e.g. {"count": 12, "results": [fragments]}: only the small dynamic values get encoded
+        return RawJSON(b'{' + b','.join(
+            orjson.dumps(str(key)) + b':' + render_json(value) for key, value in data.items()
+        ) + b'}')
+    # Whatever orjson doesn't know natively (Decimal, lazy strings, ...) gets DRF's treatment
+    return orjson.dumps(data, default=_encoder.default, option=orjson.OPT_NON_STR_KEYS)
+
+
+def _is_fragment_list(data):
+    return isinstance(data, (list, tuple)) and bool(data) and all(isinstance(item, RawJSON) for item in data)
+
+
+class FragmentJSONRenderer(JSONRenderer):
+    """
+    DRF's JSONRenderer, built on render_json. Falls back to the stock
+    renderer for anything orjson refuses (e.g. integers over 64 bits) and
+    for the browsable API's indented output.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if self.get_indent(accepted_media_type, renderer_context or {}) is None:
+            try:
+                return render_json(data)
+            except orjson.JSONEncodeError:
+                pass
+        return super().render(_decoded(data), accepted_media_type, renderer_context)
+
+
+def _decoded(data):
+    # The stock renderer can't embed fragments, so turn them back into plain
+    # values (orjson.loads only takes exact bytes, not subclasses)
+    if isinstance(data, RawJSON):
+        return orjson.loads(bytes(data))
+    if isinstance(data, (list, tuple)):
+        return [orjson.loads(bytes(item)) if isinstance(item, RawJSON) else item for item in data]
+    if isinstance(data, dict):
+        return {key: _decoded(value) for key, value in data.items()}
+    return data
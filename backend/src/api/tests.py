@@ -1,3 +1,100 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.db import OperationalError
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from products.models import CatalogChange, Product
+from products.tests import make_product
+from recommender_project import routers
+from recommender_project.routers import ReplicaRouter, note_user, on_primary, pin_to_primary, replica_reads
+from .admin_tools import EstimatedCountPaginator
+
+
+@override_settings(DATABASE_REPLICAS=['replica1', 'replica2'], DATABASE_REPLICA_RETRY_SECONDS=30)
+class ReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        self.enterContext(mock.patch.dict(routers._down_until, clear=True))
+        self.router = ReplicaRouter()
+
+    def read_alias(self, model=Product):
+        return self.router.db_for_read(model)
+
+    def test_blocks_take_turns_and_nested_blocks_share_a_replica(self):
+        with replica_reads() as first:
+            self.assertEqual(self.read_alias(), first)
+            self.assertEqual(self.read_alias(CatalogChange), 'default')
+            with replica_reads() as nested:
+                self.assertEqual(nested, first)
+            with on_primary():
+                self.assertEqual(self.read_alias(), 'default')
+        with replica_reads() as second:
+            self.assertEqual({first, second}, {'replica1', 'replica2'})
+        self.assertEqual(self.read_alias(), 'default')
+        self.assertEqual(self.router.db_for_write(Product), 'default')
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_without_replicas_everything_reads_the_primary(self):
+        with replica_reads() as alias:
+            self.assertIsNone(alias)
+            self.assertEqual(self.read_alias(), 'default')
+
+    def test_a_failing_replica_is_skipped_and_the_read_retried_on_the_primary(self):
+        used = []
+
+        @replica_reads()
+        def read():
+            used.append(self.read_alias())
+            if used[-1] != 'default':
+                raise OperationalError('replica went away')
+            return 'rows'
+
+        with mock.patch.object(routers.time, 'monotonic', return_value=1000):
+            self.assertEqual(read(), 'rows')
+            self.assertEqual(used[1], 'default')
+            with replica_reads() as alias:
+                # Only the other replica is left
+                self.assertNotIn(alias, (used[0], None))
+            self.assertEqual(routers.healthy_replicas(), [alias])
+
+        with mock.patch.object(routers.time, 'monotonic', return_value=1030):
+            self.assertEqual(len(routers.healthy_replicas()), 2)
+
+    def test_a_pinned_user_reads_the_primary_except_for_the_catalog(self):
+        pin_to_primary([7])
+        self.addCleanup(cache.delete, routers.pin_key(7))
+        with replica_reads():
+            note_user(8)
+            self.assertNotEqual(self.read_alias(), 'default')
+        with replica_reads():
+            note_user(7)
+            self.assertEqual(self.read_alias(), 'default')
+            with replica_reads():
+                self.assertEqual(self.read_alias(), 'default')
+            with mock.patch.object(routers, '_replayed_version', return_value=5):
+                with replica_reads(catalog_version=5):
+                    self.assertNotEqual(self.read_alias(), 'default')
+                # No replica has caught up with this version yet
+                with replica_reads(catalog_version=6):
+                    self.assertEqual(self.read_alias(), 'default')
+
+
+@override_settings(ADMIN_ESTIMATED_COUNT_MIN=1000)
+class EstimatedCountPaginatorTests(TestCase):
+    def setUp(self):
+        Product.objects.bulk_create([make_product(f'P{number}') for number in range(3)])
+
+    def count(self, queryset):
+        return EstimatedCountPaginator(queryset, 100).count
+
+    def test_only_a_big_unfiltered_table_is_estimated(self):
+        with mock.patch.object(EstimatedCountPaginator, '_estimate', return_value=5000) as estimate:
+            self.assertEqual(self.count(Product.objects.order_by('pk')), 5000)
+            self.assertEqual(self.count(Product.objects.filter(item_id='P1').order_by('pk')), 1)
+        estimate.assert_called_once()
+        with mock.patch.object(EstimatedCountPaginator, '_estimate', return_value=999):
+            self.assertEqual(self.count(Product.objects.order_by('pk')), 3)
+
+    def test_other_databases_count_exactly(self):
+        # The estimate comes from Postgres' statistics
+        self.assertEqual(self.count(Product.objects.order_by('pk')), 3)
@@ -1,9 +1,20 @@
 # backend/src/api/urls.py
-from django.urls import path
-from .views import hello_world, quiz_submit, get_recommendations # Add new views
+from django.urls import include, path
+from products.views import catalog_changes
+from . import async_views
+from .views import hello_world, quiz_submit, quiz_batch_submit, get_recommendations, get_outfits, metrics # Add new views
 
 urlpatterns = [
     path('hello/', hello_world, name='hello-world'),
     path('quiz/submit/', quiz_submit, name='quiz-submit'),
+    path('quiz/batch/', quiz_batch_submit, name='quiz-batch'),
     path('recommendations/', get_recommendations, name='get-recommendations'),
+    path('recommendations/outfits/', get_outfits, name='get-outfits'),
+    path('metrics/', metrics, name='metrics'),
+    path('products/', include('products.urls')),
+    path('catalog/changes/', catalog_changes, name='catalog-changes'),
+
+    # Async-native variants for ASGI deployments (see api/async_views.py)
+    path('async/quiz/submit/', async_views.quiz_submit, name='quiz-submit-async'),
+    path('async/recommendations/', async_views.get_recommendations, name='get-recommendations-async'),
 ]
\ No newline at end of file
@@ -1,10 +1,27 @@
 # backend/src/api/views.py
-from rest_framework.decorators import api_view, permission_classes # <--- Add permission_classes(remeber)
-from rest_framework.permissions import IsAuthenticated
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+from rest_framework.decorators import api_view, authentication_classes, permission_classes # <--- Add permission_classes(remeber)
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
-from products.models import Product
-from quiz.services import QuizProcessor
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from products.catalog_index import get_catalog_index
+from products.fragments import RawJSON
+from products.versioning import get_catalog_version
+from quiz.services import QuizProcessor, QuizValidationError, process_quiz_batch
+from recommendations.cache import cache_recommendations, get_cached_recommendations, profile_version
+from recommendations.jobs import empty_capsule_version, enqueue_recompute, has_recent_job
+from recommendations.models import Recommendation
+from recommendations.outfits import get_outfits as build_user_outfits
+from recommendations.pagination import (
+    decode_cursor, etag_matches, has_next_page, load_page, make_etag, next_link,
+)
+from recommender_project.routers import on_primary, reading_replica, replica_reads
+from users.authentication import CachedJWTAuthentication
 from users.models import UserProfile
+from .metrics import registry, stage
+from .renderers import render_json
 
 
 
@@ -17,6 +34,7 @@ def hello_world(request):
 
 
 @api_view(['POST'])
+@authentication_classes([JWTAuthentication]) # Writes the profile, so no cached user
 @permission_classes([IsAuthenticated]) # This line protects the endpoint
 def quiz_submit(request):
     """
@@ -28,19 +46,58 @@ def quiz_submit(request):
 
     try:
         # Use the service we just built!
-        processor = QuizProcessor(user=user, quiz_data=quiz_data)
-        processor.process_and_save()
+        with stage('score'):
+            processor = QuizProcessor(user=user, quiz_data=quiz_data)
+            changed = processor.process_and_save()
+        if changed:
+            # Build the new capsule in the background so the results page is ready
+            with stage('enqueue'):
+                enqueue_recompute(user.pk)
         return Response({"status": "success", "message": "Profile updated successfully."})
+    except QuizValidationError as e:
+        return Response({"status": "error", "message": str(e), "errors": e.errors}, status=400)
     except Exception as e:
         return Response({"status": "error", "message": str(e)}, status=400)
     
 
+@api_view(['POST'])
+@permission_classes([IsAdminUser])
+def quiz_batch_submit(request):
+    """
+    Accepts a list of completed quizzes ({"email": ..., "quiz": {...}}) from a
+    partner integration and saves them in a handful of queries. Each item gets
+    its own result, so one bad quiz doesn't fail the whole upload.
+    """
+    items = request.data
+    if not isinstance(items, list):
+        return Response({"status": "error", "message": "Expected a list of quizzes."}, status=400)
+    if len(items) > settings.QUIZ_BATCH_MAX_ITEMS:
+        return Response(
+            {"status": "error", "message": f"At most {settings.QUIZ_BATCH_MAX_ITEMS} quizzes per request."},
+            status=400,
+        )
+
+    with stage('score'):
+        results = process_quiz_batch(items)
+    summary = {status: 0 for status in ('updated', 'unchanged', 'error')}
+    for result in results:
+        summary[result['status']] += 1
+    return Response({"status": "success", "summary": summary, "results": results})
+
+
+@replica_reads()
 @api_view(['GET'])
+@authentication_classes([CachedJWTAuthentication]) # user and profile come from the per-process cache
 @permission_classes([IsAuthenticated])
 def get_recommendations(request):
     """
-    Generates and returns a personalized list of 40 product recommendations
-    for the currently logged-in user.
+    Returns the personalized list of 40 product recommendations for the
+    currently logged-in user, or a 202 "pending" status while it is still
+    being generated.
+
+    Responses carry a strong ETag (answered with 304 on If-None-Match) and,
+    when there is more, a Link: rel="next" header whose cursor pages through
+    the rest of the user's ranking (see recommendations/pagination.py).
     """
     user = request.user
     
@@ -49,41 +106,158 @@ def get_recommendations(request):
     except UserProfile.DoesNotExist:
         return Response({"error": "User profile not found. Please complete the quiz first."}, status=404)
 
-    # --- Start implementing the recommendation logic from the flowchart ---
-    
-    # 1. First round of filtration: Body Type
-    # We will query all products to start.
-    all_products = Product.objects.all()
-    
-    # Filter products where the product's body_type string contains the user's primary type
-    body_type_filtered_products = all_products.filter(
-        body_type__icontains=profile.primary_body_type
+    with stage('version'):
+        catalog_version = get_catalog_version()
+    version = profile_version(profile)
+
+    if 'cursor' in request.query_params:
+        return _ranking_page(request, profile, version, catalog_version)
+
+    # The versions alone tell us whether the client's copy is current, so
+    # this needs neither the cache nor the database.
+    etag = make_etag(user.pk, version, catalog_version)
+    if etag_matches(request, etag):
+        return _not_modified(etag)
+
+    # Repeat visits are served from the cache, which is keyed on the profile
+    # and catalog versions so it never hands back a stale capsule.
+    with stage('cache'):
+        data = get_cached_recommendations(user.pk, profile, catalog_version)
+        more = data is not None and has_next_page(user.pk, profile, version, catalog_version)
+    if data is not None:
+        return _page(request, data, version, catalog_version, 0, more)
+
+    # The capsule itself is built in the background when the quiz is submitted
+    # (see recommendations/jobs.py); here we only read the materialized rows.
+    with stage('db'):
+        rows = _materialized_rows(user.pk)
+        if reading_replica() and (not rows or rows[0][0] != version):
+            # The replica may not have replayed the capsule the job just wrote
+            with on_primary():
+                rows = _materialized_rows(user.pk)
+
+    if rows and rows[0][0] == version:
+        data, built_for = [RawJSON(row[2]) for row in rows], rows[0][1]
+    else:
+        # No rows may also mean the job found no products matching the profile
+        with stage('db'):
+            data, built_for = [], empty_capsule_version(user.pk, version)
+
+    if built_for == catalog_version:
+        with stage('cache'):
+            cache_recommendations(user.pk, profile, catalog_version, data)
+            more = has_next_page(user.pk, profile, version, catalog_version)
+        return _page(request, data, version, catalog_version, 0, more)
+
+    if built_for is not None:
+        with stage('enqueue'):
+            if not has_recent_job(user.pk):
+                # The catalog has moved on: keep serving this capsule while a fresh one is built
+                enqueue_recompute(user.pk)
+        # No next page: the ranking behind it belongs to a catalog we no longer serve
+        return _page(request, data, version, built_for, 0, more=False)
+
+    # Nothing materialized for the current profile yet
+    with stage('enqueue'):
+        if not has_recent_job(user.pk):
+            enqueue_recompute(user.pk)
+    return Response(
+        {"status": "pending", "message": "Your recommendations are being generated."},
+        status=202,
     )
 
-    # 2. Second round of filtration: Lifestyle
-    # For simplicity, we'll just combine the lifestyle tags for now.
-    user_lifestyles = [profile.weekday_lifestyle] + profile.weekend_lifestyle.split(',')
-    
-    # This is a placeholder for a more complex query.
-    # A real implementation would use Elasticsearch for a more efficient OR query.
-    # For now, we'll just filter by weekday lifestyle.
-    lifestyle_filtered_products = body_type_filtered_products.filter(
-        lifestyle__icontains=profile.weekday_lifestyle
+
+@replica_reads()
+@api_view(['GET'])
+@authentication_classes([CachedJWTAuthentication])
+@permission_classes([IsAuthenticated])
+def get_outfits(request):
+    """
+    Returns complete outfits (top + bottom or a dress, plus optional
+    outerwear and shoes) put together from the user's capsule, best first,
+    as [{"score": 4.2, "items": [products]}].
+    """
+    user = request.user
+    try:
+        profile = user.profile
+    except UserProfile.DoesNotExist:
+        return Response({"error": "User profile not found. Please complete the quiz first."}, status=404)
+
+    with stage('version'):
+        catalog_version = get_catalog_version()
+    with stage('outfits'):
+        outfits = build_user_outfits(user.pk, profile, profile_version(profile), catalog_version)
+
+    index = get_catalog_index(catalog_version)
+    # Each outfit becomes one pre-rendered fragment around the products' own
+    return Response([
+        render_json({"score": round(score, 3), "items": [index.fragment(position) for position in positions]})
+        for score, positions in outfits
+    ])
+
+
+def _materialized_rows(user_id):
+    return list(
+        Recommendation.objects.filter(user_id=user_id)
+        .order_by('rank')
+        .values_list('profile_version', 'catalog_version', 'product__public_json')
     )
-    
-    # TODO: Implement proportional weighting and style filtering here.
-    # For now, we'll just return the first 40 items from our filtered list.
-    
-    final_recommendations = lifestyle_filtered_products[:40]
-    
-    # Serialize the data to send back to the frontend
-    data = [
-        {
-            "item_id": p.item_id,
-            "item_name": p.item_name,
-            "image_url": p.image_url,
-            "category": p.category,
-        } for p in final_recommendations
-    ]
-    
-    return Response(data)
\ No newline at end of file
+
+
+def _ranking_page(request, profile, version, catalog_version):
+    """
+    A later page of get_recommendations, cut from the cached ranking.
+    """
+    try:
+        cursor_version, cursor_catalog_version, offset = decode_cursor(request.query_params['cursor'])
+    except ValueError as e:
+        return Response({"error": str(e)}, status=400)
+    if (cursor_version, cursor_catalog_version) != (version, catalog_version):
+        return Response(
+            {"error": "Your recommendations have changed since this page was requested. Start again from the first page."},
+            status=410,
+        )
+
+    etag = make_etag(request.user.pk, version, catalog_version, offset)
+    if etag_matches(request, etag):
+        return _not_modified(etag)
+
+    with stage('cache'):
+        data, more = load_page(request.user.pk, profile, version, catalog_version, offset)
+    return _page(request, data, version, catalog_version, offset, more)
+
+
+def _page(request, data, version, catalog_version, offset, more):
+    etag = make_etag(request.user.pk, version, catalog_version, offset)
+    # Now that there is a page, `If-None-Match: *` (or the stale capsule's tag) applies
+    if etag_matches(request, etag, exists=True):
+        return _not_modified(etag)
+    response = Response(data, headers=_cache_headers(etag))
+    if more:
+        response['Link'] = next_link(request, version, catalog_version, offset + len(data))
+    return response
+
+
+def _not_modified(etag):
+    return Response(status=304, headers=_cache_headers(etag))
+
+
+def _cache_headers(etag):
+    # Per-user data: browsers may keep it, but must revalidate, and shared caches must not mix users
+    return {'ETag': etag, 'Cache-Control': 'private, no-cache', 'Vary': 'Authorization'}
+
+
+def metrics(request):
+    """
+    Prometheus scrape endpoint for this process's request metrics. When
+    METRICS_TOKEN is set, scrapers must send it as a bearer token; without
+    one the endpoint is only open with DEBUG on.
+    """
+    token = settings.METRICS_TOKEN
+    if token:
+        supplied = request.headers.get('Authorization', '').removeprefix('Bearer ')
+        if not constant_time_compare(supplied, token):
+            return HttpResponseForbidden()
+    elif not settings.DEBUG:
+        return HttpResponseForbidden()
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
\ No newline at end of file
@@ -0,0 +1,173 @@
+# backend/src/benchmarks/concurrency.py
+"""
+WSGI vs ASGI throughput with many concurrent, slow clients.
+
+Both sides run in-process against the real handlers (no test client), driven
+by the same closed loop of virtual clients:
+
+  * WSGI: requests are handled by a fixed pool of threads, like a threaded
+    WSGI server. A slow client holds its thread while it trickles its request
+    in and reads the response, modelled as a sleep inside the thread.
+  * ASGI: requests go through the ASGI handler on one event loop. The same
+    slow-client time is an `await asyncio.sleep`, which holds nothing.
+
+The client latency is a model, not a network, so treat the absolute numbers
+as relative: the point is how each side degrades as clients outnumber threads.
+With fast clients the sync stack does more requests per CPU second (every
+async ORM or cache call is a hop to a thread); ASGI pulls ahead once slow
+clients outnumber the WSGI threads.
+"""
+import asyncio
+import io
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+HOST = 'localhost'  # Allowed by ALLOWED_HOSTS in DEBUG, unlike the test client's "testserver"
+
+
+def _wsgi_environ(path, token):
+    return {
+        'REQUEST_METHOD': 'GET',
+        'SCRIPT_NAME': '',
+        'PATH_INFO': path,
+        'QUERY_STRING': '',
+        'SERVER_NAME': HOST,
+        'SERVER_PORT': '80',
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'REMOTE_ADDR': '127.0.0.1',
+        'HTTP_HOST': HOST,
+        'HTTP_AUTHORIZATION': f'JWT {token}',
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': 'http',
+        'wsgi.input': io.BytesIO(b''),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+
+
+def wsgi_request(application, path, token, client_latency):
+    """
+    One request through the WSGI handler, holding the calling thread for the
+    slow client's time. Returns the status code.
+    """
+    time.sleep(client_latency)
+    status = []
+    result = application(_wsgi_environ(path, token), lambda status_line, headers: status.append(status_line))
+    try:
+        for _ in result:
+            pass
+    finally:
+        result.close()  # fires request_finished, which closes the DB connection
+    return int(status[0].split()[0])
+
+
+async def asgi_request(application, path, token, client_latency):
+    """
+    One request through the ASGI handler. Returns the status code.
+    """
+    await asyncio.sleep(client_latency)
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode(),
+        'query_string': b'',
+        'root_path': '',
+        'headers': [(b'host', HOST.encode()), (b'authorization', f'JWT {token}'.encode())],
+        'client': ('127.0.0.1', 0),
+        'server': (HOST, 80),
+    }
+    done = asyncio.Event()
+    received = False
+    status = []
+
+    async def receive():
+        nonlocal received
+        if not received:
+            received = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        # Django listens for a disconnect while the view runs; ours comes after the response
+        await done.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            status.append(message['status'])
+        elif message['type'] == 'http.response.body' and not message.get('more_body'):
+            done.set()
+
+    await application(scope, receive, send)
+    done.set()
+    return status[0]
+
+
+async def _drive(request, tokens, total, concurrency):
+    """
+    Runs `total` requests from `concurrency` virtual clients, each sending its
+    next request as soon as the previous one completes.
+    """
+    latencies = []
+    errors = 0
+    remaining = total
+
+    async def client(number):
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            token = tokens[(number + remaining) % len(tokens)]
+            started = time.perf_counter()
+            if await request(token) != 200:
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client(number) for number in range(concurrency)))
+    return _summary(latencies, errors, time.perf_counter() - started)
+
+
+def run_wsgi(path, tokens, total, concurrency, threads, client_latency):
+    from django.core.wsgi import get_wsgi_application
+    application = get_wsgi_application()
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        with ThreadPoolExecutor(max_workers=threads, thread_name_prefix='wsgi') as pool:
+            async def request(token):
+                return await loop.run_in_executor(pool, wsgi_request, application, path, token, client_latency)
+            return await _drive(request, tokens, total, concurrency)
+
+    return asyncio.run(main())
+
+
+def run_asgi(path, tokens, total, concurrency, client_latency):
+    from django.core.asgi import get_asgi_application
+    application = get_asgi_application()
+
+    async def request(token):
+        return await asgi_request(application, path, token, client_latency)
+
+    return asyncio.run(_drive(request, tokens, total, concurrency))
+
+
+def _summary(latencies, errors, elapsed):
+    latencies.sort()
+
+    def percentile(p):
+        return round(latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000, 2)
+
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'seconds': round(elapsed, 3),
+        'requests_per_second': round(len(latencies) / elapsed, 1),
+        'median_ms': round(statistics.median(latencies) * 1000, 2),
+        'p95_ms': percentile(0.95),
+        'p99_ms': percentile(0.99),
+    }
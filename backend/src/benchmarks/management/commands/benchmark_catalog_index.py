@@ -0,0 +1,95 @@
+# backend/src/benchmarks/management/commands/benchmark_catalog_index.py
+import statistics
+import time
+from types import SimpleNamespace
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+
+from benchmarks.synthetic import synthetic_products
+from products.catalog_index import CatalogIndex
+from products.models import Product
+from products.tags import sync_product_tags
+
+class Command(BaseCommand):
+    help = 'Benchmark the catalog tag index against SQL substring filtering on a synthetic catalog'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', type=int, default=100_000, help='Number of synthetic products.')
+        parser.add_argument('--repeat', type=int, default=20, help='Timed runs per query.')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        profile = SimpleNamespace(
+            primary_body_type='Pear',
+            secondary_body_type='Hourglass',
+            weekday_lifestyle='Smart Casual',
+            weekend_lifestyle='Lounge,Social/ Trendy',
+        )
+        lifestyles = [profile.weekday_lifestyle] + profile.weekend_lifestyle.split(',')
+
+        def legacy_query():
+            # What get_recommendations used to run (weekday lifestyle only)
+            return list(
+                Product.objects.filter(body_type__icontains=profile.primary_body_type)
+                .filter(lifestyle__icontains=profile.weekday_lifestyle)[:40]
+            )
+
+        def full_sql_query():
+            # The full multi-criteria query written as SQL OR-of-LIKEs
+            body = Q(body_type__icontains=profile.primary_body_type) | Q(body_type__icontains=profile.secondary_body_type)
+            lifestyle = Q()
+            for value in lifestyles:
+                lifestyle |= Q(lifestyle__icontains=value)
+            return list(Product.objects.filter(body).filter(lifestyle).values_list('item_id', 'body_type', 'lifestyle'))
+
+        def tag_table_query():
+            # The same query resolved through the normalized tag tables
+            return list(
+                Product.objects.with_any_tag('body_type', [profile.primary_body_type, profile.secondary_body_type])
+                .with_any_tag('lifestyle', lifestyles)
+                .values_list('item_id', 'body_type', 'lifestyle')
+            )
+
+        # Everything happens inside a transaction we roll back, so the real catalog is untouched.
+        with transaction.atomic():
+            self.stdout.write(f"Inserting {options['size']} synthetic products...")
+            products = Product.objects.bulk_create(
+                synthetic_products(options['size'], options['seed']), batch_size=5000
+            )
+            sync_product_tags(products, replace=False)
+
+            started = time.perf_counter()
+            index = CatalogIndex.build()
+            build_ms = (time.perf_counter() - started) * 1000
+
+            results = {
+                'SQL icontains (legacy, weekday only)': self._time(legacy_query, options['repeat']),
+                'SQL icontains (full multi-criteria)': self._time(full_sql_query, options['repeat']),
+                'SQL tag tables (full multi-criteria)': self._time(tag_table_query, options['repeat']),
+                'Tag index (full multi-criteria)': self._time(
+                    lambda: index.rank_for_profile(profile, limit=40), options['repeat']
+                ),
+            }
+
+            transaction.set_rollback(True)
+
+        self.stdout.write(f'Index built over {index.size} products in {build_ms:.1f} ms')
+        for name, timings in results.items():
+            self.stdout.write(
+                f'{name:<40} median {statistics.median(timings):8.2f} ms   p95 {self._p95(timings):8.2f} ms'
+            )
+
+    def _time(self, func, repeat):
+        func()  # warm up
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - started) * 1000)
+        return timings
+
+    def _p95(self, timings):
+        ordered = sorted(timings)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
@@ -0,0 +1,62 @@
+# backend/src/benchmarks/management/commands/benchmark_concurrency.py
+import json
+
+from django.core.management.base import BaseCommand
+from django.test.utils import setup_databases, teardown_databases
+from rest_framework_simplejwt.tokens import AccessToken
+
+from benchmarks.concurrency import run_asgi, run_wsgi
+from benchmarks.synthetic import create_catalog, create_users
+from recommendations.jobs import materialize_recommendations
+
+class Command(BaseCommand):
+    help = 'Compare WSGI (sync views, thread pool) and ASGI (async views) throughput under many slow clients'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--catalog-size', type=int, default=2000, help='Synthetic products.')
+        parser.add_argument('--users', type=int, default=200, help='Synthetic users; each request picks one.')
+        parser.add_argument('--requests', type=int, default=3000, help='Requests per server model.')
+        parser.add_argument('--concurrency', type=int, default=500, help='Concurrent virtual clients.')
+        parser.add_argument('--threads', type=int, default=16, help='WSGI worker threads.')
+        parser.add_argument('--client-latency', type=float, default=200,
+                            help='Milliseconds each slow client takes to send its request and read the answer.')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--output', type=str, default=None, help='Write the results as JSON here.')
+
+    def handle(self, *args, **options):
+        # Everything runs in test databases (test_<name>), never the real one
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            results = self._run(options)
+        finally:
+            teardown_databases(old_config, verbosity=0)
+
+        for name, result in results.items():
+            self.stdout.write(
+                f"{name:<6} {result['requests_per_second']:8.1f} req/s  median {result['median_ms']:8.2f} ms  "
+                f"p95 {result['p95_ms']:8.2f} ms  p99 {result['p99_ms']:8.2f} ms  {result['errors']} errors"
+            )
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                json.dump(results, file, indent=2)
+            self.stdout.write(f"Results written to {options['output']}")
+
+    def _run(self, options):
+        self.stdout.write(f"Seeding {options['catalog_size']} products and {options['users']} users...")
+        create_catalog(options['catalog_size'], options['seed'])
+        users = create_users(options['users'], options['seed'])
+        for user in users:
+            materialize_recommendations(user.pk)
+        tokens = [str(AccessToken.for_user(user)) for user in users]
+
+        latency = options['client_latency'] / 1000
+        self.stdout.write(
+            f"{options['requests']} requests from {options['concurrency']} clients, "
+            f"{options['client_latency']:g} ms client latency..."
+        )
+        return {
+            'wsgi': run_wsgi('/api/recommendations/', tokens, options['requests'], options['concurrency'],
+                             options['threads'], latency),
+            'asgi': run_asgi('/api/async/recommendations/', tokens, options['requests'], options['concurrency'],
+                             latency),
+        }
@@ -0,0 +1,115 @@
+# backend/src/benchmarks/management/commands/run_benchmarks.py
+import json
+import os
+import platform
+import sys
+from datetime import datetime, timezone
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_databases, teardown_databases
+
+from benchmarks.suite import Suite, compare
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'baseline.json')
+
+class Command(BaseCommand):
+    help = 'Run the recommender benchmarks on a throwaway database seeded with synthetic data'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--catalog-size', type=int, default=10_000, help='Synthetic products (1k to 1M).')
+        parser.add_argument('--users', type=int, default=200, help='Synthetic users with profiles.')
+        parser.add_argument('--repeat', type=int, default=20, help='Timed runs per benchmark.')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--only', nargs='*', default=None, help='Run only these benchmarks.')
+        parser.add_argument('--output', type=str, default=None, help='Write the results as JSON here.')
+        parser.add_argument('--baseline', type=str, default=DEFAULT_BASELINE, help='Baseline JSON to compare against.')
+        parser.add_argument('--timings', action='store_true',
+                            help='Also fail on medians slower than the baseline; only on the host that recorded it.')
+        parser.add_argument('--tolerance', type=float, default=0.25,
+                            help='Allowed slowdown against the baseline median with --timings (0.25 = 25%%).')
+        parser.add_argument('--update-baseline', action='store_true', help='Store this run as the new baseline.')
+
+    def handle(self, *args, **options):
+        # Everything runs in test databases (test_<name>), never the real one
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            results = self._run(options)
+        finally:
+            teardown_databases(old_config, verbosity=0)
+
+        for name, result in results['benchmarks'].items():
+            self.stdout.write(
+                f"{name:<40} median {result['median_ms']:9.2f} ms  p95 {result['p95_ms']:9.2f} ms  "
+                f"{result['queries']:4d} queries  {result['peak_memory_kb']:10.1f} KB peak"
+            )
+
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                json.dump(results, file, indent=2)
+            self.stdout.write(f"Results written to {options['output']}")
+
+        if options['update_baseline']:
+            with open(options['baseline'], 'w') as file:
+                json.dump(results, file, indent=2)
+                file.write('\n')
+            self.stdout.write(self.style.SUCCESS(f"Baseline updated: {options['baseline']}"))
+            return
+
+        baseline = self._load_baseline(options['baseline'], results['meta'])
+        tolerance = None
+        if options['timings']:
+            # Timings from another host (or Python) say more about the host than the code
+            if all(baseline.get('meta', {}).get(key) == results['meta'][key] for key in ('host', 'machine', 'python')):
+                tolerance = options['tolerance']
+            else:
+                self.stdout.write(self.style.WARNING(
+                    f"Baseline {options['baseline']} was recorded on another host; only checking query budgets."
+                ))
+        problems = compare(results, baseline, tolerance)
+        if problems:
+            for problem in problems:
+                self.stderr.write(self.style.ERROR(problem))
+            raise CommandError(f'{len(problems)} benchmark regression(s).')
+        self.stdout.write(self.style.SUCCESS('No regressions.'))
+
+    def _run(self, options):
+        suite = Suite(options['catalog_size'], options['users'], seed=options['seed'], repeat=options['repeat'])
+        self.stdout.write(f"Seeding {options['catalog_size']} products and {options['users']} users...")
+        suite.seed_data()
+        suite.prepare()
+
+        results = {}
+        for benchmark in suite.benchmarks():
+            if options['only'] and benchmark.name not in options['only']:
+                continue
+            self.stdout.write(f'Running {benchmark.name}...')
+            results[benchmark.name] = benchmark.run()
+
+        return {
+            'meta': {
+                'catalog_size': options['catalog_size'],
+                'users': options['users'],
+                'seed': options['seed'],
+                'database': connection.vendor,
+                'python': sys.version.split()[0],
+                'machine': platform.machine(),
+                'host': platform.node(),
+                'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            },
+            'benchmarks': results,
+        }
+
+    def _load_baseline(self, path, meta):
+        if not path or not os.path.exists(path):
+            return {}
+        with open(path) as file:
+            baseline = json.load(file)
+        # Query counts and timings are only comparable for the same data size and database
+        keys = ('catalog_size', 'users', 'database')
+        if any(baseline.get('meta', {}).get(key) != meta[key] for key in keys):
+            self.stdout.write(self.style.WARNING(
+                f'Baseline {path} was recorded with different settings; only checking query budgets.'
+            ))
+            return {}
+        return baseline
@@ -0,0 +1,290 @@
+# backend/src/benchmarks/suite.py
+"""
+The recommender hot-path benchmarks.
+
+Each benchmark is timed over several runs, profiled once with tracemalloc
+for peak memory, and run once with a query counter so we can assert a query
+budget. Results are plain dicts, so they can be written to JSON and
+compared against a stored baseline.
+"""
+import contextlib
+import io
+import os
+import random
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import connection
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from products.catalog_index import get_catalog_index, reset_catalog_index
+from products.models import Product
+from products.versioning import get_catalog_version
+from quiz.services import QuizProcessor, process_quiz_batch
+from recommendations.engine import build_capsule
+from recommendations.jobs import materialize_recommendations
+from users.models import UserAccount, UserProfile
+from .synthetic import VOCABULARY, create_catalog, create_users, synthetic_quiz, write_catalog_csv
+
+
+class QueryCounter:
+    """
+    Counts every query sent to the database. Unlike CaptureQueriesContext this
+    keeps working across test-client requests, which reset the query log.
+    """
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class Benchmark:
+    def __init__(self, name, func, repeat=20, max_queries=None, setup=None):
+        self.name = name
+        self.func = func
+        self.repeat = repeat
+        # None means "don't assert"; otherwise the most queries one call may run
+        self.max_queries = max_queries
+        # Runs before every call, outside the timing (e.g. to clear a cache)
+        self.setup = setup or (lambda: None)
+
+    def run(self):
+        self.setup()
+        self.func()  # warm up
+
+        timings = []
+        for _ in range(self.repeat):
+            self.setup()
+            started = time.perf_counter()
+            self.func()
+            timings.append((time.perf_counter() - started) * 1000)
+
+        self.setup()
+        queries = QueryCounter()
+        with connection.execute_wrapper(queries):
+            self.func()
+
+        self.setup()
+        tracemalloc.start()
+        try:
+            self.func()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        timings.sort()
+        return {
+            'runs': len(timings),
+            'median_ms': round(statistics.median(timings), 3),
+            'p95_ms': round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 3),
+            'min_ms': round(timings[0], 3),
+            'queries': queries.count,
+            'max_queries': self.max_queries,
+            'peak_memory_kb': round(peak / 1024, 1),
+        }
+
+
+class Suite:
+    """
+    Seeds a synthetic catalog and user base into the (throwaway) database and
+    builds the list of benchmarks to run against it.
+    """
+
+    def __init__(self, catalog_size, users, seed=42, repeat=20):
+        self.catalog_size = catalog_size
+        self.user_count = users
+        self.seed = seed
+        self.repeat = repeat
+        self.rng = random.Random(seed)
+
+    def seed_data(self):
+        create_catalog(self.catalog_size, self.seed)
+        self.users = create_users(self.user_count, self.seed)
+        self.user_ids = [user.pk for user in self.users]
+        self.workdir = tempfile.mkdtemp(prefix='benchmarks-')
+        self.csv_path = os.path.join(self.workdir, 'catalog.csv')
+        write_catalog_csv(self.csv_path, self.catalog_size, self.seed)
+
+    def _next_user_id(self):
+        return self.rng.choice(self.user_ids)
+
+    def benchmarks(self):
+        client = APIClient()
+        recommendations_cache = caches['recommendations']
+
+        tokens = {user.pk: str(AccessToken.for_user(user)) for user in self.users}
+
+        def get_recommendations(url='/api/recommendations/', status=200, **headers):
+            # Real JWT auth, so the benchmark covers the auth/profile cache too
+            client.credentials(HTTP_AUTHORIZATION=f'JWT {tokens[self.current_user]}')
+            response = client.get(url, **headers)
+            assert response.status_code == status, response.status_code
+            return response
+
+        def pick_user():
+            self.current_user = self._next_user_id()
+
+        def pick_user_warm():
+            pick_user()
+            get_recommendations()  # make sure this user's capsule is cached
+
+        def pick_user_cold():
+            pick_user()
+            recommendations_cache.clear()
+
+        def pick_user_revalidating():
+            pick_user()
+            self.current_etag = get_recommendations()['ETag']
+
+        def pick_user_paging():
+            pick_user()
+            link = get_recommendations()['Link']
+            self.current_page = link[1:link.index('>')]
+
+        def pick_user_without_outfits():
+            pick_user()
+            recommendations_cache.clear()
+            materialize_recommendations(self.current_user)  # re-caches the ranking the outfits come from
+
+        def capsule():
+            build_capsule(self.current_profile, index=get_catalog_index())
+
+        def pick_profile():
+            self.current_profile = UserProfile.objects.get(user_id=self._next_user_id())
+
+        def quiz():
+            user = UserAccount.objects.get(pk=self._next_user_id())
+            with contextlib.redirect_stdout(io.StringIO()):
+                QuizProcessor(user=user, quiz_data=synthetic_quiz(self.rng)).process_and_save()
+
+        def quiz_batch():
+            emails = UserAccount.objects.filter(pk__in=self.rng.sample(self.user_ids, min(500, len(self.user_ids))))
+            process_quiz_batch([
+                {'email': email, 'quiz': synthetic_quiz(self.rng)} for email in emails.values_list('email', flat=True)
+            ])
+
+        def import_products(*args):
+            def run():
+                call_command('import_products', self.csv_path, *args, stdout=io.StringIO())
+            return run
+
+        def build_index():
+            reset_catalog_index()
+            get_catalog_index()
+
+        search_words = [word for field in ('category', 'color_family', 'style') for word in VOCABULARY[field]]
+
+        def search():
+            query = ' '.join(self.rng.sample(search_words, self.rng.randint(1, 3)))
+            response = client.get('/api/products/search/', {'q': query})
+            assert response.status_code == 200, response.status_code
+
+        def browse():
+            filters = {
+                field: ','.join(self.rng.sample(VOCABULARY[field], self.rng.randint(1, 2)))
+                for field in self.rng.sample(['category', 'color_family', 'season', 'fit', 'style'], self.rng.randint(0, 3))
+            }
+            response = client.get('/api/products/', filters)
+            assert response.status_code == 200, response.status_code
+
+        def similar():
+            item_id = self.rng.choice(get_catalog_index().item_ids)
+            params = {'kind': self.rng.choice(['similar', 'complete'])}
+            if self.rng.random() < 0.5:
+                params['body_type'] = self.rng.choice(VOCABULARY['body_type'])
+            response = client.get(f'/api/products/{item_id}/similar/', params)
+            assert response.status_code == 200, response.status_code
+
+        def edit_product():
+            product = Product.objects.get(pk=self.rng.choice(get_catalog_index().item_ids))
+            product.item_name = f'{product.item_name.split(" #")[0]} #{self.rng.randint(0, 999)}'
+            product.save()  # logs the change like an admin edit
+            self.current_since = get_catalog_version(fresh=True) - 1
+
+        def catalog_changes():
+            response = client.get('/api/catalog/changes/', {'since': self.current_since})
+            body = b''.join(response.streaming_content)
+            assert response.status_code == 200 and b'"op":"update"' in body, response.status_code
+
+        import_repeat = max(3, self.repeat // 5)
+        upsert_batches = -(-self.catalog_size // 2000)
+
+        return [
+            Benchmark('catalog_index.build', build_index, repeat=import_repeat, max_queries=2),
+            Benchmark('engine.build_capsule', capsule, repeat=self.repeat, max_queries=0, setup=pick_profile),
+            Benchmark('jobs.materialize_recommendations',
+                      lambda: materialize_recommendations(self.current_user),
+                      repeat=self.repeat, max_queries=4, setup=pick_user),
+            # The capsule rows, plus the user and profile when they aren't cached yet
+            Benchmark('api.get_recommendations.materialized', get_recommendations,
+                      repeat=self.repeat, max_queries=2, setup=pick_user_cold),
+            Benchmark('api.get_recommendations.cached', get_recommendations,
+                      repeat=self.repeat, max_queries=0, setup=pick_user_warm),
+            Benchmark('api.get_recommendations.not_modified',
+                      lambda: get_recommendations(status=304, HTTP_IF_NONE_MATCH=self.current_etag),
+                      repeat=self.repeat, max_queries=0, setup=pick_user_revalidating),
+            # Cut from the ranking cached by the capsule job
+            Benchmark('api.get_recommendations.next_page', lambda: get_recommendations(self.current_page),
+                      repeat=self.repeat, max_queries=0, setup=pick_user_paging),
+            # Built from the cached ranking and the catalog index; repeat requests come from the cache
+            Benchmark('api.get_outfits', lambda: get_recommendations('/api/recommendations/outfits/'),
+                      repeat=self.repeat, max_queries=0, setup=pick_user_without_outfits),
+            # The BM25 index and catalog index are warm after the first request
+            Benchmark('products.search', search, repeat=self.repeat, max_queries=0),
+            Benchmark('products.browse', browse, repeat=self.repeat, max_queries=0),
+            # One primary-key lookup of the precomputed neighbor row
+            Benchmark('products.similar', similar, repeat=self.repeat, max_queries=1),
+            # The version window, the changes since, and their payloads
+            Benchmark('products.catalog_changes', catalog_changes, repeat=self.repeat, max_queries=3,
+                      setup=edit_product),
+            Benchmark('quiz.process_and_save', quiz, repeat=self.repeat, max_queries=4),
+            # The email lookup, then users, profiles and at most one bulk_update per quiz field
+            Benchmark('quiz.process_batch', quiz_batch, repeat=import_repeat, max_queries=12),
+            # Per batch the seen IDs and the stored hashes, plus the seen table and the vanished scan
+            Benchmark('import_products.upsert_unchanged', import_products('--upsert'),
+                      repeat=import_repeat, max_queries=2 * upsert_batches + 4),
+            Benchmark('import_products.replace', import_products(), repeat=import_repeat),
+        ]
+
+    def prepare(self):
+        """
+        Makes sure every benchmark user has a materialized capsule, and the
+        catalog its neighbor table, before the read-path benchmarks run.
+        """
+        for user_id in self.user_ids:
+            materialize_recommendations(user_id)
+        call_command('compute_neighbors', stdout=io.StringIO())
+
+
+def compare(results, baseline, tolerance=None):
+    """
+    Compares a run against a baseline. Returns a list of human-readable
+    problems: query budget violations, more queries than the baseline, and,
+    if a `tolerance` is given, a median slower than the baseline by more
+    than that (0.25 = 25%).
+    """
+    problems = []
+    for name, result in results['benchmarks'].items():
+        if result['max_queries'] is not None and result['queries'] > result['max_queries']:
+            problems.append(f"{name}: {result['queries']} queries, budget is {result['max_queries']}")
+
+        previous = baseline.get('benchmarks', {}).get(name)
+        if previous is None:
+            continue
+        if result['queries'] > previous['queries']:
+            problems.append(f"{name}: {result['queries']} queries, baseline had {previous['queries']}")
+        if tolerance is None or not previous['median_ms']:
+            continue
+        if result['median_ms'] > previous['median_ms'] * (1 + tolerance):
+            problems.append(
+                f"{name}: median {result['median_ms']:.2f} ms vs baseline {previous['median_ms']:.2f} ms"
+            )
+    return problems
@@ -0,0 +1,147 @@
+# backend/src/benchmarks/synthetic.py
+"""
+Seeded synthetic data for benchmarks: product catalogs (as model instances or
+as a CSV in the import_products format) and users with completed profiles.
+Tag vocabularies are taken from data/product_catalog.csv, so tag selectivity
+is close to the real catalog's.
+"""
+import csv
+import random
+
+from django.contrib.auth.hashers import make_password
+
+from products.changes import reset_changes
+from products.models import Product
+from products.tags import sync_product_tags
+from products.versioning import bump_catalog_version
+from users.models import UserAccount, UserProfile
+
+VOCABULARY = {
+    'category': ['Top', 'Bottom', 'Outerwear', 'Dress/ Jumpsuit', 'Bag', 'Shoe'],
+    'color_family': ['Black', 'White', 'Brown', 'Red', 'Blue', 'Beige', 'Green', 'Grey', 'Pink', 'Navy', 'Yellow', 'Metallic', 'Purple', 'Nude'],
+    'season': ['All Season', 'Summer', 'Winter'],
+    'fit': ['Fitted', 'Relaxed', 'Structured'],
+    'style': ['Classic', 'Chic', 'Romantic', 'Edgy', 'Preppy', 'Contemporary', 'Glamorous', 'Streetstyle', 'Bohemian'],
+    'body_type': ['Rectangle', 'Hourglass', 'Pear', 'Apple', 'Inverted Triangle'],
+    'lifestyle': ['Smart Casual', 'Lounge', 'Social/ Trendy', 'Business Casual', 'Business Formal', 'Athleisure'],
+    'utility': ['Basics', 'Versitile', 'Statement', 'Layering'],
+}
+
+# Same columns as data/product_catalog.csv
+CSV_HEADERS = [
+    'ID', 'Item Name', 'Image', 'Category', 'Colour Name', 'Colour Family', 'Colour_is_neutral',
+    'Season', 'Fit', 'Style', 'BodyType', 'Lifestyle', 'Utility',
+]
+
+
+def synthetic_products(count, seed=42):
+    """
+    Yields unsaved Product instances with tags drawn from the real vocabulary.
+    """
+    rng = random.Random(seed)
+
+    def pick(field, low, high):
+        return ','.join(rng.sample(VOCABULARY[field], rng.randint(low, high)))
+
+    for i in range(count):
+        yield Product(
+            item_id=f'S{i:07d}',
+            item_name=f'Synthetic item {i}',
+            image_url=f'https://example.com/{i}.png',
+            category=rng.choice(VOCABULARY['category']),
+            color_name=rng.choice(VOCABULARY['color_family']),
+            color_family=rng.choice(VOCABULARY['color_family']),
+            is_neutral=rng.random() < 0.5,
+            season=rng.choice(VOCABULARY['season']),
+            fit=rng.choice(VOCABULARY['fit']),
+            style=pick('style', 1, 6),
+            body_type=pick('body_type', 1, 4),
+            lifestyle=pick('lifestyle', 1, 3),
+            utility=pick('utility', 1, 2),
+        )
+
+
+def create_catalog(count, seed=42, batch_size=5000):
+    """
+    Inserts a synthetic catalog (products plus their tag rows) and bumps the
+    catalog version. Returns the number of products created.
+    """
+    products = Product.objects.bulk_create(
+        (p for p in _with_derived_fields(synthetic_products(count, seed))), batch_size=batch_size
+    )
+    sync_product_tags(products, replace=False)
+    reset_changes(bump_catalog_version())
+    return len(products)
+
+
+def _with_derived_fields(products):
+    for product in products:
+        product.refresh_derived_fields()
+        yield product
+
+
+def write_catalog_csv(path, count, seed=42):
+    """
+    Writes a synthetic catalog in the import_products CSV format.
+    """
+    with open(path, 'w', newline='', encoding='utf-8') as file:
+        writer = csv.writer(file)
+        writer.writerow(CSV_HEADERS)
+        for p in synthetic_products(count, seed):
+            writer.writerow([
+                p.item_id, p.item_name, f'{p.item_id}.png ({p.image_url})', p.category, p.color_name,
+                p.color_family, str(p.is_neutral), p.season, p.fit, p.style, p.body_type, p.lifestyle, p.utility,
+            ])
+
+
+def synthetic_quiz(rng):
+    """
+    A quiz payload in the shape the frontend posts to /api/quiz/submit/.
+    """
+    styles = VOCABULARY['style']
+    return {
+        'primary_body_type': rng.choice(VOCABULARY['body_type']),
+        'secondary_body_type': rng.choice(VOCABULARY['body_type']),
+        'weekday_lifestyle': rng.choice(['Business Formal', 'Business Casual', 'Smart Casual']),
+        'weekend_lifestyle': rng.sample(['Lounge', 'Social/ Trendy', 'Athleisure'], rng.randint(1, 2)),
+        'seasonality_answer': rng.choice(['always', '3-months']),
+        'style_selections': [rng.sample(styles, 2) for _ in range(3)],
+    }
+
+
+def create_users(count, seed=42, batch_size=2000):
+    """
+    Inserts `count` users with filled-in profiles (bypassing the quiz, which
+    would cost several queries per user). Returns the created users.
+    """
+    rng = random.Random(seed)
+    password = make_password(None)  # unusable, and hashed only once
+    users = UserAccount.objects.bulk_create(
+        [
+            UserAccount(email=f'bench{seed}-{i}@example.com', first_name='Bench', last_name=str(i), password=password)
+            for i in range(count)
+        ],
+        batch_size=batch_size,
+    )
+    profiles = []
+    for user in users:
+        quiz = synthetic_quiz(rng)
+        scores = {}
+        for primary, secondary in quiz['style_selections']:
+            scores[primary] = scores.get(primary, 0.0) + 1.0
+            scores[secondary] = scores.get(secondary, 0.0) + 0.5
+        profiles.append(UserProfile(
+            user=user,
+            primary_body_type=quiz['primary_body_type'],
+            secondary_body_type=quiz['secondary_body_type'],
+            weekday_lifestyle=quiz['weekday_lifestyle'],
+            weekend_lifestyle=','.join(quiz['weekend_lifestyle']),
+            wardrobe_percentages={
+                'winter_wear': rng.choice([0.5, 0.75]), 'workwear': rng.random(),
+                'dresses': rng.random(), 'statement': rng.random() / 2,
+            },
+            style_scores=scores,
+            top_three_styles=','.join(sorted(scores, key=scores.get, reverse=True)[:3]),
+        ))
+    UserProfile.objects.bulk_create(profiles, batch_size=batch_size)
+    return users
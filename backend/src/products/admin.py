@@ -1,3 +1,58 @@
-from django.contrib import admin
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin.helpers import ActionForm
 
-# Register your models here.
+from api.admin_tools import LargeTableAdmin
+from .editing import collect_saves, delete_products, retag_products
+from .models import Product, Tag
+from .tags import MULTI_VALUE_TAG_FIELDS
+
+
+class TagActionForm(ActionForm):
+    tag_field = forms.ChoiceField(
+        required=False, label='Field',
+        choices=[('', '---------')] + [(kind, label) for kind, label in Tag.KIND_CHOICES if kind in MULTI_VALUE_TAG_FIELDS],
+    )
+    tag = forms.CharField(required=False, max_length=100)
+
+
+@admin.register(Product)
+class ProductAdmin(LargeTableAdmin):
+    list_display = ('item_id', 'item_name', 'category', 'color_family', 'season', 'style')
+    list_only = list_display
+    ordering = ('item_id',)
+    prefix_search_fields = ('item_id', 'item_name')
+    action_form = TagActionForm
+    actions = ('add_tag', 'remove_tag')
+
+    def _retag(self, request, queryset, remove):
+        kind, label = request.POST.get('tag_field'), request.POST.get('tag', '').strip()
+        if kind not in MULTI_VALUE_TAG_FIELDS or not label:
+            self.message_user(request, "Pick a field and enter a tag.", messages.ERROR)
+            return
+        changed = retag_products(queryset, kind, label, remove=remove)
+        self.message_user(request, f"{'Removed' if remove else 'Added'} {kind} \"{label}\" on {changed} products.")
+
+    @admin.action(description='Add tag to selected products')
+    def add_tag(self, request, queryset):
+        self._retag(request, queryset, remove=False)
+
+    @admin.action(description='Remove tag from selected products')
+    def remove_tag(self, request, queryset):
+        self._retag(request, queryset, remove=True)
+
+    # A save (with its inlines) is logged under one catalog version, like the bulk edits
+    def changeform_view(self, *args, **kwargs):
+        with collect_saves():
+            return super().changeform_view(*args, **kwargs)
+
+    def changelist_view(self, *args, **kwargs):
+        with collect_saves():
+            return super().changelist_view(*args, **kwargs)
+
+    # Deletes go through the catalog change log like any other catalog change
+    def delete_model(self, request, obj):
+        delete_products(Product.objects.filter(pk=obj.pk))
+
+    def delete_queryset(self, request, queryset):
+        delete_products(queryset)
@@ -0,0 +1,172 @@
+# backend/src/products/bitmaps.py
+"""
+Compressed bitmaps of product positions, in the style of Roaring bitmaps.
+
+Positions are split on their high 16 bits into chunks of 65536. Each chunk
+that has any members gets one container: a sorted uint16 array while it
+holds at most ARRAY_MAX members, otherwise a plain 8 KB bitmap (1024
+uint64 words). A rare facet value costs a few bytes per product that has
+it, while a common one never costs more than 1 bit per catalog slot, and
+every operation stays vectorized inside a container.
+"""
+import numpy as np
+
+CHUNK_BITS = 16
+CHUNK_SIZE = 1 << CHUNK_BITS
+WORDS = CHUNK_SIZE // 64
+ARRAY_MAX = 4096  # Past this, a bitmap container is smaller than an array
+
+
+def _is_dense(container):
+    return container.dtype == np.uint64
+
+
+def _to_dense(values):
+    mask = np.zeros(CHUNK_SIZE, dtype=bool)
+    mask[values] = True
+    return np.packbits(mask, bitorder='little').view(np.uint64)
+
+
+def _to_values(words):
+    return np.flatnonzero(np.unpackbits(words.view(np.uint8), bitorder='little')).astype(np.uint16)
+
+
+def _compact(container):
+    """
+    Returns the cheaper representation of a container, or None if it is empty.
+    """
+    if _is_dense(container):
+        count = int(np.bitwise_count(container).sum())
+        if count > ARRAY_MAX:
+            return container
+        container = _to_values(container)
+    if len(container) > ARRAY_MAX:
+        return _to_dense(container)
+    return container if len(container) else None
+
+
+def _contains(words, values):
+    return ((words[values >> 6] >> (values & 63).astype(np.uint64)) & np.uint64(1)).astype(bool)
+
+
+def _and(a, b):
+    if _is_dense(a) and _is_dense(b):
+        return _compact(a & b)
+    if _is_dense(a):
+        a, b = b, a
+    if _is_dense(b):
+        return _compact(a[_contains(b, a)])
+    return _compact(np.intersect1d(a, b, assume_unique=True))
+
+
+def _and_count(a, b):
+    if _is_dense(a) and _is_dense(b):
+        return int(np.bitwise_count(a & b).sum())
+    if _is_dense(a):
+        a, b = b, a
+    if _is_dense(b):
+        return int(_contains(b, a).sum())
+    return len(np.intersect1d(a, b, assume_unique=True))
+
+
+def _or(a, b):
+    if not _is_dense(a) and not _is_dense(b):
+        return _compact(np.union1d(a, b))
+    a = a if _is_dense(a) else _to_dense(a)
+    b = b if _is_dense(b) else _to_dense(b)
+    return a | b
+
+
+def _and_not(a, b):
+    if _is_dense(a):
+        return _compact(a & ~(b if _is_dense(b) else _to_dense(b)))
+    if _is_dense(b):
+        return _compact(a[~_contains(b, a)])
+    return _compact(np.setdiff1d(a, b, assume_unique=True))
+
+
+def _count(container):
+    return int(np.bitwise_count(container).sum()) if _is_dense(container) else len(container)
+
+
+class Bitmap:
+    """
+    An immutable set of non-negative integers (product positions).
+    """
+    __slots__ = ('keys', 'containers')
+
+    def __init__(self, keys=(), containers=()):
+        self.keys = list(keys)  # sorted chunk numbers
+        self.containers = list(containers)
+
+    @classmethod
+    def from_positions(cls, positions):
+        positions = np.unique(np.asarray(positions, dtype=np.int64))
+        keys, starts = np.unique(positions >> CHUNK_BITS, return_index=True)
+        bitmap = cls()
+        for key, chunk in zip(keys.tolist(), np.split(positions, starts[1:])):
+            bitmap.keys.append(key)
+            bitmap.containers.append(_compact((chunk & (CHUNK_SIZE - 1)).astype(np.uint16)))
+        return bitmap
+
+    def __len__(self):
+        return sum(_count(container) for container in self.containers)
+
+    def __bool__(self):
+        return bool(self.keys)
+
+    def positions(self):
+        """
+        The members as a sorted int64 array.
+        """
+        parts = [
+            (key << CHUNK_BITS) + (_to_values(container) if _is_dense(container) else container).astype(np.int64)
+            for key, container in zip(self.keys, self.containers)
+        ]
+        return np.concatenate(parts) if parts else np.zeros(0, dtype=np.int64)
+
+    def _pairs(self, other):
+        other_containers = dict(zip(other.keys, other.containers))
+        for key, container in zip(self.keys, self.containers):
+            match = other_containers.get(key)
+            if match is not None:
+                yield key, container, match
+
+    def __and__(self, other):
+        result = Bitmap()
+        for key, a, b in self._pairs(other):
+            container = _and(a, b)
+            if container is not None:
+                result.keys.append(key)
+                result.containers.append(container)
+        return result
+
+    def intersection_count(self, other):
+        """
+        len(self & other), without building the intersection.
+        """
+        return sum(_and_count(a, b) for _, a, b in self._pairs(other))
+
+    def __or__(self, other):
+        containers = dict(zip(self.keys, self.containers))
+        for key, container in zip(other.keys, other.containers):
+            existing = containers.get(key)
+            containers[key] = container if existing is None else _or(existing, container)
+        keys = sorted(containers)
+        return Bitmap(keys, [containers[key] for key in keys])
+
+    def __sub__(self, other):
+        other_containers = dict(zip(other.keys, other.containers))
+        result = Bitmap()
+        for key, container in zip(self.keys, self.containers):
+            match = other_containers.get(key)
+            if match is not None:
+                container = _and_not(container, match)
+            if container is not None:
+                result.keys.append(key)
+                result.containers.append(container)
+        return result
+
+    @property
+    def nbytes(self):
+        return sum(container.nbytes for container in self.containers)
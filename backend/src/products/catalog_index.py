@@ -0,0 +1,339 @@
+# backend/src/products/catalog_index.py
+"""
+An in-process inverted index over the product catalog.
+
+Every tag value (e.g. body_type "Pear" or lifestyle "Smart Casual") maps to a
+packed bitset with one bit per product. Filtering a profile against the
+catalog then becomes a handful of bitwise AND/OR operations on small NumPy
+arrays instead of `icontains` LIKE scans over the products table.
+
+The index is built once per worker process (see `get_catalog_index`) and
+rebuilt whenever the catalog version changes. When a compiled snapshot is
+configured (see products/snapshot.py) workers map that instead.
+"""
+import threading
+from functools import cached_property
+
+import numpy as np
+from django.conf import settings
+
+from recommender_project.routers import replica_reads
+from .fragments import PUBLIC_FIELDS, RawJSON, encode_public
+from .models import Product, ProductTag
+from .tags import MULTI_VALUE_TAG_FIELDS, normalize_tag, split_tags
+from .versioning import get_catalog_version
+
+# The Product fields we build an inverted index for. New fields go at the
+# end: compiled snapshots refer to them by position.
+TAG_FIELDS = ('body_type', 'lifestyle', 'style', 'season', 'utility', 'category', 'color_family', 'is_neutral')
+
+# Single-valued fields are read straight off the products table; the
+# multi-valued ones come from the normalized ProductTag rows.
+COLUMN_TAG_FIELDS = tuple(f for f in TAG_FIELDS if f not in MULTI_VALUE_TAG_FIELDS)
+
+
+class CatalogIndex:
+    """
+    An immutable snapshot of the catalog: the public columns of every product
+    plus one packed bitset per (field, tag value).
+    """
+
+    def __init__(self, rows, bitsets, labels, fragments=None):
+        # rows: a sequence of dicts with the PUBLIC_FIELDS of every product.
+        # bitsets: {field: {tag key: packed bitset}}
+        # labels: {field: {tag key: display label}}
+        # fragments: each row's stored JSON fragment (RawJSON), when we have them
+        self.rows = rows
+        self.fragments = fragments
+        self.size = len(rows)
+        self.version = None
+        self.labels = labels
+        self._bitsets = bitsets
+        self._matrices = {}
+
+    def fragment(self, position):
+        """
+        The public JSON for the product at `position`.
+        """
+        if self.fragments is not None:
+            return self.fragments[position]
+        return encode_public(self.rows[position])
+
+    @classmethod
+    def from_postings(cls, rows, postings, fragments=None):
+        """
+        Builds the index from {field: {tag label: [row positions]}}.
+        """
+        size = len(rows)
+        bitsets = {}
+        labels = {}
+        for field in TAG_FIELDS:
+            labels[field] = {}
+            bitsets[field] = {}
+            for label, positions in postings.get(field, {}).items():
+                key = normalize_tag(label)
+                labels[field].setdefault(key, label)
+                mask = np.zeros(size, dtype=bool)
+                mask[positions] = True
+                existing = bitsets[field].get(key)
+                packed = np.packbits(mask, bitorder='little')
+                bitsets[field][key] = packed if existing is None else existing | packed
+        return cls(rows, bitsets, labels, fragments)
+
+    @cached_property
+    def item_ids(self):
+        # Snapshot-backed rows can hand these out without decoding whole rows
+        item_ids = getattr(self.rows, 'item_ids', None)
+        return item_ids if item_ids is not None else [row['item_id'] for row in self.rows]
+
+    @cached_property
+    def positions_by_id(self):
+        return {item_id: position for position, item_id in enumerate(self.item_ids)}
+
+    @classmethod
+    def build(cls, queryset=None):
+        """
+        Loads the catalog in two streamed queries (products, then their
+        normalized tags) and builds the index.
+        """
+        if queryset is None:
+            queryset = Product.objects.all()
+
+        columns = PUBLIC_FIELDS + tuple(f for f in COLUMN_TAG_FIELDS if f not in PUBLIC_FIELDS) + ('public_json',)
+        rows = []
+        fragments = []
+        positions_by_id = {}
+        postings = {field: {} for field in TAG_FIELDS}
+
+        values = queryset.order_by('item_id').values_list(*columns)
+        for position, record in enumerate(values.iterator(chunk_size=2000)):
+            product = dict(zip(columns, record))
+            row = {field: product[field] for field in PUBLIC_FIELDS}
+            rows.append(row)
+            # Postgres hands BinaryField values back as memoryview
+            fragments.append(RawJSON(product['public_json']) or encode_public(row))
+            positions_by_id[product['item_id']] = position
+            for field in COLUMN_TAG_FIELDS:
+                for label in column_tags(product[field]):
+                    postings[field].setdefault(label, []).append(position)
+
+        links = ProductTag.objects.filter(product__in=queryset.values('pk')).values_list(
+            'product_id', 'tag__kind', 'tag__name'
+        )
+        for product_id, kind, label in links.iterator(chunk_size=5000):
+            position = positions_by_id.get(product_id)
+            if position is not None:
+                postings[kind].setdefault(label, []).append(position)
+
+        return cls.from_postings(rows, postings, fragments)
+
+    # --- Bitset helpers ---
+
+    @property
+    def nbytes(self):
+        return (self.size + 7) // 8
+
+    def empty(self):
+        return np.zeros(self.nbytes, dtype=np.uint8)
+
+    def full(self):
+        return np.packbits(np.ones(self.size, dtype=bool), bitorder='little')
+
+    def bitset(self, field, value):
+        """
+        Returns the bitset of products tagged with `value` in `field`
+        (an empty bitset when nobody carries that tag).
+        """
+        bits = self._bitsets[field].get(normalize_tag(value))
+        return self.empty() if bits is None else bits
+
+    def any_of(self, field, values):
+        """
+        OR of the bitsets for every value in `values`.
+        """
+        result = self.empty()
+        for value in values:
+            result = result | self.bitset(field, value)
+        return result
+
+    def to_mask(self, bits):
+        """
+        Unpacks a bitset into a bool array with one entry per product.
+        """
+        return np.unpackbits(bits, count=self.size, bitorder='little').astype(bool)
+
+    def count(self, bits):
+        return int(np.unpackbits(bits, count=self.size, bitorder='little').sum())
+
+    def positions(self, bits):
+        return np.flatnonzero(self.to_mask(bits))
+
+    def bits_at(self, bits, positions):
+        """
+        The bits of `bits` at `positions` only, as a bool array, without
+        unpacking the whole bitset.
+        """
+        positions = np.asarray(positions, dtype=np.intp)
+        return ((bits[positions >> 3] >> (positions & 7)) & 1).astype(bool)
+
+    def tags_at(self, field, positions):
+        """
+        The tag keys of `field` on each product at `positions`, as a list of
+        sets, read off the bitsets.
+        """
+        tags = [set() for _ in range(len(positions))]
+        for key, bits in self._bitsets[field].items():
+            for i in np.flatnonzero(self.bits_at(bits, positions)):
+                tags[i].add(key)
+        return tags
+
+    def tag_matrix(self, field):
+        """
+        A dense (products x tag values) float32 matrix for `field`, built once
+        and cached on the index. Returns (tag keys, matrix).
+        """
+        cached = self._matrices.get(field)
+        if cached is None:
+            keys = sorted(self._bitsets[field])
+            matrix = np.zeros((self.size, len(keys)), dtype=np.float32)
+            for column, key in enumerate(keys):
+                matrix[:, column] = self.to_mask(self._bitsets[field][key])
+            cached = self._matrices[field] = (keys, matrix)
+        return cached
+
+    # --- Queries ---
+
+    def match(self, required=()):
+        """
+        AND of every bitset in `required`, as a bool mask over the catalog.
+        """
+        candidates = self.full()
+        for bits in required:
+            candidates = candidates & bits
+        return self.to_mask(candidates)
+
+    def weigh(self, weighted=()):
+        """
+        Sums (bitset, weight) pairs into one float32 score per product.
+        """
+        scores = np.zeros(self.size, dtype=np.float32)
+        for bits, weight in weighted:
+            scores += self.to_mask(bits) * np.float32(weight)
+        return scores
+
+    def rank(self, required=(), weighted=(), limit=None):
+        """
+        Runs a multi-criteria query against the index.
+
+        `required` is a list of bitsets that must all match (AND).
+        `weighted` is a list of (bitset, weight) pairs; matching products are
+        ordered by the sum of their weights, ties keep catalog order.
+        Returns an array of row positions.
+        """
+        positions = np.flatnonzero(self.match(required))
+        if weighted and len(positions):
+            scores = self.weigh(weighted)
+            order = np.argsort(-scores[positions], kind='stable')
+            positions = positions[order]
+
+        if limit is not None:
+            positions = positions[:limit]
+        return positions
+
+    def profile_criteria(self, profile):
+        """
+        The recommendation filter pipeline for a UserProfile, as
+        (required bitsets, weighted bitsets):
+
+        1. Body type: products for the primary OR the secondary body type,
+           with primary matches weighted higher.
+        2. Lifestyle: products for the weekday lifestyle OR any of the weekend
+           lifestyles, with weekday matches weighted higher.
+        """
+        required = []
+        weighted = []
+
+        body_types = [t for t in (profile.primary_body_type, profile.secondary_body_type) if t]
+        if body_types:
+            required.append(self.any_of('body_type', body_types))
+            weighted.append((self.bitset('body_type', body_types[0]), 2.0))
+            if len(body_types) > 1:
+                weighted.append((self.bitset('body_type', body_types[1]), 1.0))
+
+        weekend_lifestyles = split_tags(profile.weekend_lifestyle)
+        lifestyles = ([profile.weekday_lifestyle] if profile.weekday_lifestyle else []) + weekend_lifestyles
+        if lifestyles:
+            required.append(self.any_of('lifestyle', lifestyles))
+            if profile.weekday_lifestyle:
+                weighted.append((self.bitset('lifestyle', profile.weekday_lifestyle), 2.0))
+            for lifestyle in weekend_lifestyles:
+                weighted.append((self.bitset('lifestyle', lifestyle), 1.0))
+
+        return required, weighted
+
+    def rank_for_profile(self, profile, limit=None):
+        """
+        Products passing the profile's body type and lifestyle filters,
+        best matches first.
+        """
+        required, weighted = self.profile_criteria(profile)
+        return self.rank(required=required, weighted=weighted, limit=limit)
+
+
+def column_tags(value):
+    """
+    The tag labels of a products-table column: its comma-separated values,
+    or for a boolean column, "true" when it is set.
+    """
+    if isinstance(value, bool):
+        return ['true'] if value else []
+    return split_tags(value)
+
+
+# --- Per-worker singleton ---
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_catalog_index(version=None):
+    """
+    Returns this worker's catalog index, (re)building it on first use and
+    whenever the catalog version has moved on.
+    """
+    global _index
+    if version is None:
+        version = get_catalog_version()
+    index = _index
+    if index is None or index.version != version:
+        with _index_lock:
+            if _index is None or _index.version != version:
+                _index = _load_index(version)
+            index = _index
+    return index
+
+
+def _load_index(version):
+    """
+    Maps the compiled snapshot when there is one for `version` (near-instant,
+    and shared between worker processes); otherwise builds from the database.
+    """
+    if settings.CATALOG_SNAPSHOT_PATH:
+        from .snapshot import load_snapshot_index
+        index = load_snapshot_index(settings.CATALOG_SNAPSHOT_PATH, version)
+        if index is not None:
+            return index
+
+    with replica_reads(catalog_version=version):
+        index = CatalogIndex.build()
+    index.version = version
+    return index
+
+
+def reset_catalog_index():
+    """
+    Drops this worker's index so the next request rebuilds it from the DB.
+    """
+    global _index
+    with _index_lock:
+        _index = None
@@ -0,0 +1,117 @@
+# backend/src/products/changes.py
+"""
+The catalog change log behind /api/catalog/changes/.
+
+Every write to the products table records one CatalogChange row per
+product it inserted, updated or deleted, under the catalog version it
+produced and in the same transaction. A client that last synced at version
+N asks for the changes after N and gets every product touched since then
+once, with its net change and current JSON payload.
+
+The log keeps the changes of the last CATALOG_CHANGE_LOG_VERSIONS versions,
+pruning older rows as new ones come in, and a wholesale replacement
+(`import_products` without --upsert) starts it over.
+CatalogVersion.changes_since records how far back it reaches; clients
+further behind than that get a full snapshot instead.
+"""
+from itertools import groupby, islice
+from operator import itemgetter
+
+import orjson
+from django.conf import settings
+
+from .models import CatalogChange, CatalogVersion, Product
+
+INSERT, UPDATE, DELETE = CatalogChange.INSERT, CatalogChange.UPDATE, CatalogChange.DELETE
+
+
+def record_changes(version, inserted=(), updated=(), deleted=()):
+    """
+    Logs the item_ids a change touched under the `version` it produced,
+    and prunes whatever has aged out of the log. Call it inside the
+    transaction that made the change.
+    """
+    CatalogChange.objects.bulk_create(
+        [
+            CatalogChange(version=version, item_id=item_id, op=op)
+            for op, item_ids in ((INSERT, inserted), (UPDATE, updated), (DELETE, deleted))
+            for item_id in item_ids
+        ],
+        batch_size=5000,
+    )
+    horizon = version - settings.CATALOG_CHANGE_LOG_VERSIONS
+    if horizon > 0:
+        CatalogChange.objects.filter(version__lte=horizon).delete()
+        CatalogVersion.objects.filter(pk=1, changes_since__lt=horizon).update(changes_since=horizon)
+
+
+def reset_changes(version):
+    """
+    Empties the log after the catalog was replaced wholesale: nothing up to
+    `version` can be replayed, so clients from before it get a snapshot.
+    """
+    CatalogChange.objects.all().delete()
+    CatalogVersion.objects.filter(pk=1).update(changes_since=version)
+
+
+def log_window():
+    """
+    (current catalog version, oldest version the log can sync from), read
+    from the database.
+    """
+    return CatalogVersion.objects.filter(pk=1).values_list('version', 'changes_since').first() or (0, 0)
+
+
+def net_changes(since, until):
+    """
+    Yields (item_id, op) for every product changed in versions since+1 to
+    `until`, once each and in item_id order. A product that was inserted
+    and deleted again in that range never reached the client, so it is
+    left out; one inserted and then updated is still an insert.
+    """
+    rows = (
+        CatalogChange.objects.filter(version__gt=since, version__lte=until)
+        .order_by('item_id', 'version', 'pk')
+        .values_list('item_id', 'op')
+        .iterator(chunk_size=5000)
+    )
+    for item_id, ops in groupby(rows, key=itemgetter(0)):
+        ops = [op for _, op in ops]
+        if ops[-1] == DELETE:
+            if ops[0] != INSERT:
+                yield item_id, DELETE
+        else:
+            yield item_id, INSERT if ops[0] == INSERT else UPDATE
+
+
+def with_payloads(changes, chunk_size=1000):
+    """
+    Adds each product's current public JSON to (item_id, op) pairs, fetched
+    a chunk at a time. Yields (item_id, op, payload); payload is None for
+    deletes. A product deleted after the change was read is skipped: the
+    client gets its delete on the next sync.
+    """
+    changes = iter(changes)
+    while chunk := list(islice(changes, chunk_size)):
+        wanted = [item_id for item_id, op in chunk if op != DELETE]
+        payloads = dict(Product.objects.filter(pk__in=wanted).values_list('item_id', 'public_json')) if wanted else {}
+        for item_id, op in chunk:
+            if op == DELETE:
+                yield item_id, op, None
+            elif item_id in payloads:
+                yield item_id, op, payloads[item_id]
+
+
+def snapshot():
+    """
+    The whole catalog as inserts, in the same shape as with_payloads.
+    """
+    rows = Product.objects.order_by('item_id').values_list('item_id', 'public_json').iterator(chunk_size=2000)
+    for item_id, payload in rows:
+        yield item_id, INSERT, payload
+
+
+def render_change(item_id, op, payload):
+    entry = b'{"op":"' + op.encode() + b'","item_id":' + orjson.dumps(item_id)
+    # Postgres hands BinaryField values back as memoryview
+    return entry + (b'}' if payload is None else b',"product":' + bytes(payload) + b'}')
@@ -0,0 +1,139 @@
+# backend/src/products/editing.py
+"""
+Bulk edits of the products table, for the admin's actions.
+
+A selection can run to hundreds of thousands of products, so these take a
+fixed number of queries however many rows they touch: the products change
+in one UPDATE (or DELETE), the ProductTag rows follow in set-based writes,
+and the change is logged under a single new catalog version, like an import.
+Single saves and deletes (the admin's change form) go through
+collect_saves, so they are logged the same way instead of bumping the
+version once per product.
+"""
+from contextlib import contextmanager
+
+from django.db import transaction
+
+from .changes import record_changes
+from .models import Product, ProductTag, Tag
+from .signals import announce_catalog_change, collected_saves
+from .tags import normalize_tag, rewrite_tags, sync_product_tags, tag_rewrites, with_tag, without_tag
+from .versioning import bump_catalog_version
+
+# In-process indexes get bigger changes than this as a rebuild on their next
+# use rather than as a delta, so we don't load every edited row to announce it.
+ANNOUNCE_LIMIT = 5000
+
+
+def _publish(updated):
+    version = bump_catalog_version()
+    record_changes(version, updated=updated)
+    if len(updated) <= ANNOUNCE_LIMIT:
+        announce_catalog_change(Product.objects.filter(pk__in=updated), (), version)
+    return version
+
+
+@contextmanager
+def collect_deletes():
+    """
+    Collects the item_ids of the Products deleted in the block into the list
+    it yields, for a caller that logs them itself, instead of the
+    post_delete receiver logging each under a version of its own. The
+    innermost block collects them.
+    """
+    outer = getattr(collected_saves, 'deleted', None)
+    collected_saves.deleted = deleted = []
+    try:
+        yield deleted
+    finally:
+        collected_saves.deleted = outer
+
+
+@contextmanager
+def collect_saves():
+    """
+    Runs the block in a transaction, and logs every Product saved or
+    deleted in it under one new catalog version when it exits, instead of
+    one version per product. Blocks nest; the outermost one does the logging.
+    """
+    if getattr(collected_saves, 'products', None) is not None:
+        yield
+        return
+    collected_saves.products = {}
+    try:
+        with transaction.atomic(), collect_deletes() as deleted:
+            yield
+            saves = collected_saves.products
+            collected_saves.products = None
+            if not saves and not deleted:
+                return
+            products = [product for product, _ in saves.values()]
+            sync_product_tags(products)
+            version = bump_catalog_version()
+            record_changes(
+                version,
+                inserted=[item_id for item_id, (_, created) in saves.items() if created],
+                updated=[item_id for item_id, (_, created) in saves.items() if not created],
+                deleted=deleted,
+            )
+            if len(products) + len(deleted) <= ANNOUNCE_LIMIT:
+                announce_catalog_change(products, deleted, version)
+    finally:
+        collected_saves.products = None
+
+
+def retag_products(queryset, kind, label, remove=False):
+    """
+    Adds `label` to (or with `remove`, takes it out of) the comma-separated
+    `kind` field of every product in `queryset` that doesn't have it yet (or
+    has it), and returns how many products changed.
+
+    The edited rows also lose their content hash: like a single save from
+    the admin, the next `import_products --upsert` rewrites them from the
+    file, which stays the source of truth.
+    """
+    label = label.strip()
+    key = normalize_tag(label)
+    with transaction.atomic():
+        if remove:
+            tag = Tag.objects.filter(kind=kind, key=key).first()
+            if tag is None:
+                return 0
+            targets = queryset.filter(pk__in=ProductTag.objects.filter(tag=tag).values('product_id'))
+        else:
+            tag, _ = Tag.objects.get_or_create(kind=kind, key=key, defaults={'name': label})
+            targets = queryset.exclude(pk__in=ProductTag.objects.filter(tag=tag).values('product_id'))
+
+        edit = without_tag if remove else with_tag
+        rewrites = tag_rewrites(targets, kind, lambda value: edit(value, label))
+        max_length = Product._meta.get_field(kind).max_length
+        too_long = [old for old, new in rewrites.items() if len(new) > max_length]
+        if too_long:
+            # Products the tag no longer fits on are left out (the tag fields are NOT NULL)
+            targets = targets.exclude(**{f'{kind}__in': too_long})
+            rewrites = {old: new for old, new in rewrites.items() if old not in too_long}
+
+        item_ids = list(targets.values_list('pk', flat=True))
+        if not item_ids:
+            return 0
+        rewrite_tags(targets, kind, rewrites, content_hash='')
+
+        if remove:
+            ProductTag.objects.filter(tag=tag, product__in=queryset.values('pk')).delete()
+        else:
+            ProductTag.objects.bulk_create(
+                [ProductTag(product_id=item_id, tag=tag) for item_id in item_ids],
+                batch_size=5000, ignore_conflicts=True,
+            )
+        _publish(updated=item_ids)
+    return len(item_ids)
+
+
+def delete_products(queryset):
+    """
+    Deletes the products in `queryset`, logging them as deleted from the
+    catalog, and returns how many there were.
+    """
+    with collect_saves():
+        _, deleted = Product.objects.filter(pk__in=queryset.values('pk')).delete()
+    return deleted.get(Product._meta.label, 0)
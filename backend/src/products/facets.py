@@ -0,0 +1,236 @@
+# backend/src/products/facets.py
+"""
+Faceted browsing of the catalog behind /api/products/.
+
+Every (facet, value) pair, e.g. category "Top" or style "Classic", holds a
+compressed bitmap of the catalog slots that have it (see bitmaps.py). A
+browse request ORs the selected values within each facet, ANDs the facets
+together for the matching products, and gets every facet's counts from
+intersections with the other facets' selections - the usual "disjunctive"
+counts, where picking a category doesn't zero out the other categories.
+There are only a few dozen facet values, so that is a few dozen bitmap
+intersections per request and no GROUP BY queries.
+
+Like the search index, each process builds a FacetIndex on first use and
+rebuilds it when the catalog version moves on; changes made by the process
+itself (imports, admin saves) are applied incrementally instead. Either
+way, pages list the matches in item_id order, so offsets mean the same in
+every process. Updated products leave a freed slot behind until more than
+half of the slots are free, then the index is compacted.
+"""
+import threading
+from functools import cached_property
+
+import numpy as np
+from django.dispatch import receiver
+
+from recommender_project.routers import replica_reads
+
+from .bitmaps import Bitmap
+from .models import Product
+from .signals import catalog_changed
+from .tags import normalize_tag, split_tags
+from .versioning import get_catalog_version
+
+FACETS = ('category', 'color_family', 'season', 'fit', 'is_neutral', 'style')
+MULTI_VALUE_FACETS = ('style',)
+
+
+def facet_labels(facet, value):
+    """
+    The display labels a product has for `facet`, given the field's value.
+    """
+    if facet in MULTI_VALUE_FACETS:
+        return split_tags(value)
+    if isinstance(value, bool):
+        return ['true' if value else 'false']
+    value = (value or '').strip()
+    return [value] if value else []
+
+
+class FacetIndex:
+    def __init__(self):
+        self.version = None
+        self.item_ids = []  # slot -> item_id, None for a slot freed by an update
+        self.slots = {}  # item_id -> slot
+        self.in_item_id_order = True  # whether slot order is item_id order
+        self.live = Bitmap()
+        self.bitmaps = {facet: {} for facet in FACETS}  # facet -> {key: Bitmap}
+        self.labels = {facet: {} for facet in FACETS}  # facet -> {key: display label}
+
+    @classmethod
+    def build(cls, records):
+        """
+        An index over `records`, {item_id: {facet: field value}}.
+        """
+        index = cls().updated(dict(sorted(records.items())), ())
+        index.in_item_id_order = True
+        return index
+
+    def updated(self, records, removed_ids):
+        """
+        A copy of this index with `records` added (replacing any earlier
+        version of the same product) and `removed_ids` taken out. New and
+        updated products take fresh slots at the end.
+        """
+        index = FacetIndex()
+        index.version = self.version
+        index.in_item_id_order = False
+        index.item_ids = list(self.item_ids)
+        index.slots = dict(self.slots)
+        index.labels = {facet: dict(labels) for facet, labels in self.labels.items()}
+
+        freed = [index.slots.pop(item_id) for item_id in (*removed_ids, *records) if item_id in index.slots]
+        for slot in freed:
+            index.item_ids[slot] = None
+        freed = Bitmap.from_positions(freed)
+
+        added = {facet: {} for facet in FACETS}
+        first_slot = len(index.item_ids)
+        for slot, (item_id, record) in enumerate(records.items(), start=first_slot):
+            index.item_ids.append(item_id)
+            index.slots[item_id] = slot
+            for facet in FACETS:
+                for label in facet_labels(facet, record[facet]):
+                    key = normalize_tag(label)
+                    index.labels[facet].setdefault(key, label)
+                    added[facet].setdefault(key, []).append(slot)
+
+        new_slots = Bitmap.from_positions(np.arange(first_slot, len(index.item_ids)))
+        index.live = (self.live - freed) | new_slots
+        for facet in FACETS:
+            bitmaps = {}
+            for key in self.bitmaps[facet].keys() | added[facet].keys():
+                bitmap = self.bitmaps[facet].get(key, Bitmap())
+                if freed:
+                    bitmap = bitmap - freed
+                if key in added[facet]:
+                    bitmap = bitmap | Bitmap.from_positions(added[facet][key])
+                if bitmap:
+                    bitmaps[key] = bitmap
+            index.bitmaps[facet] = bitmaps
+
+        if len(index.item_ids) > 2 * max(len(index.slots), 1):
+            index._compact()
+        return index
+
+    def _compact(self):
+        """
+        Drops the freed slots and renumbers the rest in item_id order, as a
+        fresh build would (in place; only called on an index nobody else can
+        see yet).
+        """
+        order = sorted(self.slots.values(), key=self.item_ids.__getitem__)
+        renumber = np.zeros(len(self.item_ids), dtype=np.int64)
+        renumber[order] = np.arange(len(order))
+        self.item_ids = [self.item_ids[slot] for slot in order]
+        self.slots = {item_id: slot for slot, item_id in enumerate(self.item_ids)}
+        self.live = Bitmap.from_positions(np.arange(len(order)))
+        for facet in FACETS:
+            self.bitmaps[facet] = {
+                key: Bitmap.from_positions(renumber[bitmap.positions()])
+                for key, bitmap in self.bitmaps[facet].items()
+            }
+            self.labels[facet] = {key: self.labels[facet][key] for key in self.bitmaps[facet]}
+        self.in_item_id_order = True
+
+    @cached_property
+    def ranks(self):
+        # slot -> position of its item_id in item_id order (freed slots sort last)
+        live = sorted(self.slots.values(), key=self.item_ids.__getitem__)
+        ranks = np.full(len(self.item_ids), len(live), dtype=np.int64)
+        ranks[live] = np.arange(len(live))
+        return ranks
+
+    def browse(self, filters, offset=0, limit=40):
+        """
+        Applies `filters` ({facet: [labels]}; any of a facet's labels
+        matches) and returns (item_ids of the requested page, total number
+        of matches, {facet: [(label, count)]}).
+        """
+        selected = {}
+        for facet, labels in filters.items():
+            bitmap = Bitmap()
+            for label in labels:
+                bitmap = bitmap | self.bitmaps[facet].get(normalize_tag(label), Bitmap())
+            selected[facet] = bitmap
+
+        # Every facet's counts use the selections of all the *other* facets;
+        # prefix/suffix intersections give us those without redoing the work.
+        names = list(selected)
+        prefix = [self.live]
+        for facet in names:
+            prefix.append(prefix[-1] & selected[facet])
+        suffix = [None] * (len(names) + 1)  # None: no filter
+        for i in range(len(names) - 1, -1, -1):
+            suffix[i] = selected[names[i]] if suffix[i + 1] is None else selected[names[i]] & suffix[i + 1]
+        others = {
+            facet: prefix[i] if suffix[i + 1] is None else prefix[i] & suffix[i + 1]
+            for i, facet in enumerate(names)
+        }
+        matches = prefix[-1]
+
+        counts = {}
+        for facet in FACETS:
+            base = others.get(facet, matches)
+            chosen = {normalize_tag(label) for label in filters.get(facet, ())}
+            values = [
+                (self.labels[facet][key], base.intersection_count(bitmap), key in chosen)
+                for key, bitmap in self.bitmaps[facet].items()
+            ]
+            counts[facet] = sorted(
+                ((label, count) for label, count, is_chosen in values if count or is_chosen),
+                key=lambda value: (-value[1], value[0]),
+            )
+
+        positions = matches.positions()
+        if not self.in_item_id_order:
+            positions = positions[np.argsort(self.ranks[positions])]
+        positions = positions[offset:offset + limit]
+        return [self.item_ids[slot] for slot in positions.tolist()], len(matches), counts
+
+
+def load_records():
+    values = Product.objects.order_by('item_id').values_list('item_id', *FACETS)
+    return {item_id: dict(zip(FACETS, record)) for item_id, *record in values.iterator(chunk_size=5000)}
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_facet_index():
+    """
+    This process's facet index, (re)built on first use and whenever the
+    catalog version has moved on.
+    """
+    global _index
+    version = get_catalog_version()
+    index = _index
+    if index is None or index.version != version:
+        with _index_lock:
+            if _index is None or _index.version != version:
+                with replica_reads(catalog_version=version):
+                    records = load_records()
+                index = FacetIndex.build(records)
+                index.version = version
+                _index = index
+            index = _index
+    return index
+
+
+@receiver(catalog_changed)
+def apply_catalog_change(sender, products, removed_ids, catalog_version, **kwargs):
+    """
+    Folds a committed catalog change into this process's index, if the index
+    is exactly one version behind; otherwise the next request rebuilds it.
+    """
+    global _index
+    with _index_lock:
+        index = _index
+        if index is None or index.version != catalog_version - 1:
+            return
+        records = {product.item_id: {facet: getattr(product, facet) for facet in FACETS} for product in products}
+        index = index.updated(records, removed_ids)
+        index.version = catalog_version
+        _index = index
@@ -0,0 +1,41 @@
+# backend/src/products/fragments.py
+"""
+Pre-serialized JSON for the public view of a product.
+
+Every product stores its public fields as ready-to-send JSON bytes
+(Product.public_json), written whenever the product is imported or saved.
+List endpoints then build their bodies by joining those fragments (see
+api/renderers.py) instead of building a dict per product and encoding it
+again on every request.
+"""
+import orjson
+
+# The fields we hand back to the frontend for every product.
+PUBLIC_FIELDS = ('item_id', 'item_name', 'image_url', 'category')
+
+
+class RawJSON(bytes):
+    """
+    Bytes that are already a complete JSON value. The API renderer copies
+    them into the response as they are.
+    """
+    __slots__ = ()
+
+
+def encode_public(values):
+    """
+    The public JSON fragment for a product, from anything with the
+    PUBLIC_FIELDS as attributes (a Product) or keys (a row dict).
+    """
+    if isinstance(values, dict):
+        public = {field: values[field] for field in PUBLIC_FIELDS}
+    else:
+        public = {field: getattr(values, field) for field in PUBLIC_FIELDS}
+    return RawJSON(orjson.dumps(public))
+
+
+def join_fragments(fragments):
+    """
+    A JSON array of already-encoded values, as RawJSON.
+    """
+    return RawJSON(b'[' + b','.join(fragments) + b']')
@@ -0,0 +1,40 @@
+# backend/src/products/management/commands/compile_catalog.py
+import os
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from products.catalog_index import CatalogIndex
+from products.snapshot import write_snapshot
+from products.versioning import get_catalog_version
+
+class Command(BaseCommand):
+    help = 'Compile the product catalog into a memory-mappable snapshot for the web workers'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output', type=str, default=None,
+            help='Where to write the snapshot (defaults to settings.CATALOG_SNAPSHOT_PATH).',
+        )
+
+    def handle(self, *args, **options):
+        path = options['output'] or settings.CATALOG_SNAPSHOT_PATH
+        if not path:
+            raise CommandError('No output path: pass --output or set CATALOG_SNAPSHOT_PATH.')
+
+        started = time.perf_counter()
+        # If an import lands while we read the catalog, try again so the
+        # snapshot is never stamped with a version it doesn't match.
+        for _ in range(3):
+            version = get_catalog_version(fresh=True)
+            index = CatalogIndex.build()
+            if get_catalog_version(fresh=True) == version:
+                break
+        else:
+            raise CommandError('The catalog kept changing while compiling; try again later.')
+
+        index.version = version
+        write_snapshot(index, path)
+        self.stdout.write(self.style.SUCCESS(
+            f'Compiled catalog v{version} ({index.size} products, {os.path.getsize(path)} bytes) '
+            f'to {path} in {time.perf_counter() - started:.2f}s.'
+        ))
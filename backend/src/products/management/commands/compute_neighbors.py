@@ -0,0 +1,46 @@
+# backend/src/products/management/commands/compute_neighbors.py
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from products.catalog_index import get_catalog_index
+from products.models import ProductNeighbors
+from products.neighbors import compute_neighbors
+from products.versioning import get_catalog_version
+
+class Command(BaseCommand):
+    help = 'Precompute "similar items" and "complete the look" neighbors for every product'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--k', type=int, default=settings.PRODUCT_NEIGHBORS, help='Neighbors kept per product and list.')
+        parser.add_argument('--block-size', type=int, default=None,
+                            help='Products scored against the catalog at once (default: sized to the catalog).')
+        parser.add_argument('--batch-size', type=int, default=2000, help='Rows per INSERT.')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        version = get_catalog_version(fresh=True)
+        index = get_catalog_index(version)
+        item_ids = index.item_ids
+
+        rows = []
+        # Readers see the old table until the new one is complete
+        with transaction.atomic():
+            ProductNeighbors.objects.all().delete()
+            for position, similar, complements in compute_neighbors(index, options['k'], options['block_size']):
+                rows.append(ProductNeighbors(
+                    product_id=item_ids[position],
+                    similar=[item_ids[p] for p in similar.tolist()],
+                    complements=[item_ids[p] for p in complements.tolist()],
+                    catalog_version=version,
+                ))
+                if len(rows) >= options['batch_size']:
+                    ProductNeighbors.objects.bulk_create(rows)
+                    rows = []
+            ProductNeighbors.objects.bulk_create(rows)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Computed neighbors for {index.size} products in {time.perf_counter() - started:.1f}s.'
+        ))
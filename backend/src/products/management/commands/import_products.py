@@ -1,13 +1,31 @@
 # backend/src/products/management/commands/import_products.py
 import csv
+from itertools import islice
+from django.conf import settings
+from django.core.management import call_command
 from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from products.changes import record_changes, reset_changes
+from products.editing import ANNOUNCE_LIMIT, collect_deletes
 from products.models import Product
+from products.signals import announce_catalog_change
+from products.tags import sync_product_tags
+from products.versioning import bump_catalog_version
+
+# Where --upsert stages the IDs it has seen, for the session of the import
+SEEN_TABLE = 'products_import_seen'
 
 class Command(BaseCommand):
     help = 'Import products from a CSV file'
 
     def add_arguments(self, parser):
         parser.add_argument('csv_file', type=str, help='The CSV file to import.')
+        parser.add_argument(
+            '--upsert', action='store_true',
+            help='Stream the file and only insert/update/delete rows that changed, '
+                 'instead of replacing the whole catalog.',
+        )
+        parser.add_argument('--batch-size', type=int, default=2000, help='Rows per batch in --upsert mode.')
 
     def handle(self, *args, **options):
         # We need to map CSV headers to model fields
@@ -29,38 +47,163 @@ class Command(BaseCommand):
 
         with open(options['csv_file'], 'r', encoding='utf-8-sig') as file:
             reader = csv.DictReader(file)
-            
-            # Clear existing products
-            Product.objects.all().delete()
+
+            if options['upsert']:
+                self._upsert(reader, options['batch_size'])
+                self._compile_snapshot()
+                return
+
+            # Clear existing products; the log starts over below, so they aren't logged one by one
+            with collect_deletes():
+                Product.objects.all().delete()
             self.stdout.write(self.style.WARNING('Deleted all existing products.'))
-            
-            products_to_create = []
-            for row in reader:
-                if not row.get('ID'): continue # Skip empty rows
-
-                # A simple helper to parse the image URL from the CSV format
-                image_full_string = row.get('Image', '')
-                image_url = image_full_string.split('(')[-1].replace(')', '') if '(' in image_full_string else ''
-                
-                # Convert 'True'/'False' strings to boolean
-                is_neutral = row.get('Colour_is_neutral', '').lower() == 'true'
-
-                product_data = {
-                    'item_id': row.get('ID'),
-                    'item_name': row.get('Item Name'),
-                    'image_url': image_url,
-                    'category': row.get('Category'),
-                    'color_name': row.get('Colour Name'),
-                    'color_family': row.get('Colour Family'),
-                    'is_neutral': is_neutral,
-                    'season': row.get('Season'),
-                    'fit': row.get('Fit'),
-                    'style': row.get('Style'),
-                    'body_type': row.get('BodyType'),
-                    'lifestyle': row.get('Lifestyle'),
-                    'utility': row.get('Utility'),
-                }
-                products_to_create.append(Product(**product_data))
-            
+
+            products_to_create = [self._parse_row(row) for row in reader if row.get('ID')] # Skip empty rows
+
             Product.objects.bulk_create(products_to_create)
-            self.stdout.write(self.style.SUCCESS(f'Successfully imported {len(products_to_create)} products.'))
\ No newline at end of file
+            # bulk_create skips signals, so write the normalized tag rows ourselves
+            sync_product_tags(products_to_create, replace=False)
+            # Retire every cached index and recommendation built on the old catalog,
+            # and make delta-sync clients start over from a snapshot
+            reset_changes(bump_catalog_version())
+            self.stdout.write(self.style.SUCCESS(f'Successfully imported {len(products_to_create)} products.'))
+            self._compile_snapshot()
+
+    def _compile_snapshot(self):
+        # Workers map the compiled snapshot when one is configured, so refresh it right away
+        if settings.CATALOG_SNAPSHOT_PATH:
+            call_command('compile_catalog', stdout=self.stdout)
+
+    def _parse_row(self, row):
+        """
+        Turns one CSV row into an unsaved Product with its content hash and
+        JSON fragment set.
+        """
+        # A simple helper to parse the image URL from the CSV format
+        image_full_string = row.get('Image', '')
+        image_url = image_full_string.split('(')[-1].replace(')', '') if '(' in image_full_string else ''
+
+        # Convert 'True'/'False' strings to boolean
+        is_neutral = row.get('Colour_is_neutral', '').lower() == 'true'
+
+        product_data = {
+            'item_id': row.get('ID'),
+            'item_name': row.get('Item Name'),
+            'image_url': image_url,
+            'category': row.get('Category'),
+            'color_name': row.get('Colour Name'),
+            'color_family': row.get('Colour Family'),
+            'is_neutral': is_neutral,
+            'season': row.get('Season'),
+            'fit': row.get('Fit'),
+            'style': row.get('Style'),
+            'body_type': row.get('BodyType'),
+            'lifestyle': row.get('Lifestyle'),
+            'utility': row.get('Utility'),
+        }
+        product = Product(**product_data)
+        product.refresh_derived_fields()
+        return product
+
+    def _upsert(self, reader, batch_size):
+        """
+        Streams the file in batches and diffs each batch against the stored
+        content hashes, so only new or changed rows are written. The IDs seen
+        are staged in a temporary table, and the products missing from the
+        file are deleted at the end a batch at a time, so memory doesn't grow
+        with the file. Everything runs in one transaction, so readers never
+        see a half-imported catalog.
+        """
+        counts = {'inserted': 0, 'updated': 0, 'deleted': 0, 'unchanged': 0}
+        version = None
+        # What the in-process indexes are told, while it stays within ANNOUNCE_LIMIT
+        written = []
+        vanished = []
+        rows = (row for row in reader if row.get('ID')) # Skip empty rows
+        item_id_length = Product._meta.get_field('item_id').max_length
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            # Created inside the transaction, so a failed import leaves nothing behind
+            cursor.execute(f'CREATE TEMPORARY TABLE {SEEN_TABLE} (item_id varchar({item_id_length}) PRIMARY KEY)')
+            while True:
+                batch = list(islice(rows, batch_size))
+                if not batch:
+                    break
+
+                # Later rows win if an ID appears twice in the file
+                products = {}
+                for row in batch:
+                    product = self._parse_row(row)
+                    products[product.item_id] = product
+                cursor.executemany(
+                    f'INSERT INTO {SEEN_TABLE} (item_id) VALUES (%s) ON CONFLICT DO NOTHING',
+                    [(item_id,) for item_id in products],
+                )
+
+                existing = dict(
+                    Product.objects.filter(pk__in=list(products)).values_list('item_id', 'content_hash')
+                )
+                changed = []
+                inserted_ids = []
+                updated_ids = []
+                for item_id, product in products.items():
+                    if item_id not in existing:
+                        inserted_ids.append(item_id)
+                    elif existing[item_id] != product.content_hash:
+                        updated_ids.append(item_id)
+                    else:
+                        counts['unchanged'] += 1
+                        continue
+                    changed.append(product)
+
+                if changed:
+                    Product.objects.bulk_create(
+                        changed,
+                        update_conflicts=True,
+                        unique_fields=['item_id'],
+                        update_fields=list(Product.CATALOG_FIELDS + Product.DERIVED_FIELDS),
+                    )
+                    sync_product_tags(changed)
+                    # The version row stays locked until the import commits
+                    version = version or bump_catalog_version()
+                    record_changes(version, inserted_ids, updated_ids)
+                    counts['inserted'] += len(inserted_ids)
+                    counts['updated'] += len(updated_ids)
+                    if self._announceable(counts):
+                        written.extend(changed)
+
+            # Delete whatever vanished from the file, in item_id order
+            last_id = ''
+            while True:
+                cursor.execute(
+                    f'SELECT item_id FROM {Product._meta.db_table} AS product '
+                    f'WHERE item_id > %s AND NOT EXISTS (SELECT 1 FROM {SEEN_TABLE} AS seen WHERE seen.item_id = product.item_id) '
+                    f'ORDER BY item_id LIMIT %s',
+                    [last_id, batch_size],
+                )
+                deleted_ids = [item_id for item_id, in cursor.fetchall()]
+                if not deleted_ids:
+                    break
+                with collect_deletes():  # Logged below, under the import's version
+                    Product.objects.filter(pk__in=deleted_ids).delete()
+                version = version or bump_catalog_version()
+                record_changes(version, deleted=deleted_ids)
+                counts['deleted'] += len(deleted_ids)
+                if self._announceable(counts):
+                    vanished.extend(deleted_ids)
+                last_id = deleted_ids[-1]
+            cursor.execute(f'DROP TABLE {SEEN_TABLE}')
+
+            if version is not None and self._announceable(counts):
+                # Lets the in-process indexes apply just this diff instead of
+                # rebuilding; after bigger imports they rebuild from the new version
+                announce_catalog_change(written, vanished, version)
+
+        self.stdout.write(self.style.SUCCESS(
+            'Upsert complete: {inserted} inserted, {updated} updated, '
+            '{deleted} deleted, {unchanged} unchanged.'.format(**counts)
+        ))
+
+    def _announceable(self, counts):
+        # Past the limit the products aren't kept around, just as in products/editing.py
+        return counts['inserted'] + counts['updated'] + counts['deleted'] <= ANNOUNCE_LIMIT
@@ -0,0 +1,49 @@
+from django.db import migrations
+
+TAG_FIELDS = ('style', 'body_type', 'lifestyle', 'utility')
+
+
+def populate_product_tags(apps, schema_editor):
+    """
+    Splits the existing comma-separated fields into Tag / ProductTag rows.
+    """
+    Product = apps.get_model('products', 'Product')
+    Tag = apps.get_model('products', 'Tag')
+    ProductTag = apps.get_model('products', 'ProductTag')
+
+    tag_ids = {}
+    links = []
+    for product in Product.objects.only('item_id', *TAG_FIELDS).iterator(chunk_size=2000):
+        seen = set()
+        for kind in TAG_FIELDS:
+            for label in (getattr(product, kind) or '').split(','):
+                label = label.strip()
+                if not label:
+                    continue
+                key = (kind, ' '.join(label.split()).casefold())
+                if key not in tag_ids:
+                    tag, _ = Tag.objects.get_or_create(kind=kind, key=key[1], defaults={'name': label})
+                    tag_ids[key] = tag.pk
+                if tag_ids[key] not in seen:
+                    seen.add(tag_ids[key])
+                    links.append(ProductTag(product_id=product.pk, tag_id=tag_ids[key]))
+        if len(links) >= 5000:
+            ProductTag.objects.bulk_create(links, ignore_conflicts=True)
+            links = []
+    ProductTag.objects.bulk_create(links, ignore_conflicts=True)
+
+
+def clear_product_tags(apps, schema_editor):
+    apps.get_model('products', 'ProductTag').objects.all().delete()
+    apps.get_model('products', 'Tag').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0002_tag_producttag'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_product_tags, clear_product_tags),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:20
+
+from django.db import migrations, models
+
+PUBLIC_FIELDS = ('item_id', 'item_name', 'image_url', 'category')
+
+
+def populate_public_json(apps, schema_editor):
+    """
+    Writes the JSON fragment for every existing product.
+    """
+    import orjson
+
+    Product = apps.get_model('products', 'Product')
+    batch = []
+    for product in Product.objects.only(*PUBLIC_FIELDS).iterator(chunk_size=2000):
+        product.public_json = orjson.dumps({field: getattr(product, field) for field in PUBLIC_FIELDS})
+        batch.append(product)
+        if len(batch) >= 2000:
+            Product.objects.bulk_update(batch, ['public_json'])
+            batch = []
+    Product.objects.bulk_update(batch, ['public_json'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0005_product_content_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='public_json',
+            field=models.BinaryField(default=b''),
+        ),
+        migrations.RunPython(populate_public_json, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+from django.db import migrations
+
+# The expression products.search.postgres.PostgresSearchBackend searches on
+SEARCH_DOCUMENT = (
+    "to_tsvector('english'::regconfig, "
+    "item_name || ' ' || category || ' ' || color_name || ' ' || replace(style, ',', ' '))"
+)
+
+
+def create_search_index(apps, schema_editor):
+    """
+    A GIN index over the products' full-text document. Postgres only: the
+    in-memory search backend needs nothing from the database.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        f"CREATE INDEX IF NOT EXISTS products_product_search_idx ON products_product USING gin (({SEARCH_DOCUMENT}))"
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS products_product_search_idx")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0006_product_public_json'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
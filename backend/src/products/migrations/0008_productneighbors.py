@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:33
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0007_product_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductNeighbors',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='neighbors', serialize=False, to='products.product')),
+                ('similar', models.JSONField(default=list)),
+                ('complements', models.JSONField(default=list)),
+                ('catalog_version', models.PositiveBigIntegerField()),
+            ],
+        ),
+    ]
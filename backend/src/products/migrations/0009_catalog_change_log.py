@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:53
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def start_change_log(apps, schema_editor):
+    """
+    The log starts out empty, so it can only answer for changes made from
+    the current version on.
+    """
+    CatalogVersion = apps.get_model('products', 'CatalogVersion')
+    CatalogVersion.objects.update(changes_since=F('version'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0008_productneighbors'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveBigIntegerField(db_index=True)),
+                ('item_id', models.CharField(max_length=10)),
+                ('op', models.CharField(choices=[('insert', 'Insert'), ('update', 'Update'), ('delete', 'Delete')], max_length=6)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='catalogversion',
+            name='changes_since',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.RunPython(start_change_log, migrations.RunPython.noop),
+    ]
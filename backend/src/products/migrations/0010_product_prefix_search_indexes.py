@@ -0,0 +1,39 @@
+from django.db import migrations
+
+# Django's istartswith on Postgres is UPPER(column::text) LIKE UPPER('term%'),
+# which these serve; text_pattern_ops makes LIKE usable under any collation.
+INDEXES = {
+    'products_product_item_id_prefix_idx': 'item_id',
+    'products_product_item_name_prefix_idx': 'item_name',
+}
+
+
+def create_prefix_indexes(apps, schema_editor):
+    """
+    Indexes for the admin's prefix search (see api/admin_tools.py). Postgres
+    only: elsewhere the search falls back to a scan.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, column in INDEXES.items():
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS {name} ON products_product ((UPPER({column}::text)) text_pattern_ops)"
+        )
+
+
+def drop_prefix_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name in INDEXES:
+        schema_editor.execute(f"DROP INDEX IF EXISTS {name}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0009_catalog_change_log'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_prefix_indexes, drop_prefix_indexes),
+    ]
@@ -1,6 +1,48 @@
 # backend/src/products/models.py
+import hashlib
+
 from django.db import models
 
+from .fragments import encode_public
+from .tags import normalize_tag
+
+
+class Tag(models.Model):
+    """
+    One normalized tag value, e.g. kind="lifestyle", name="Smart Casual".
+    """
+    KIND_CHOICES = [
+        ('style', 'Style'),
+        ('body_type', 'Body Type'),
+        ('lifestyle', 'Lifestyle'),
+        ('utility', 'Utility'),
+    ]
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    name = models.CharField(max_length=100)
+    # Normalized (case-folded) name, so exact lookups hit the unique index
+    key = models.CharField(max_length=100)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'key'], name='products_tag_kind_key_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()}: {self.name}"
+
+
+class ProductQuerySet(models.QuerySet):
+    def with_any_tag(self, kind, names):
+        """
+        Products carrying at least one of `names` for the given tag kind.
+        Resolves through the (tag, product) index instead of a LIKE scan.
+        """
+        keys = [normalize_tag(name) for name in names if name]
+        tagged = ProductTag.objects.filter(tag__kind=kind, tag__key__in=keys).values('product_id')
+        return self.filter(pk__in=tagged)
+
+
 class Product(models.Model):
     item_id = models.CharField(max_length=10, unique=True, primary_key=True)
     item_name = models.CharField(max_length=255)
@@ -16,5 +58,114 @@ class Product(models.Model):
     lifestyle = models.CharField(max_length=255) # Storing as comma-separated string
     utility = models.CharField(max_length=255) # Storing as comma-separated string
 
+    # Normalized copy of style/body_type/lifestyle/utility, kept in sync by products.tags
+    tags = models.ManyToManyField(Tag, through='ProductTag', related_name='products')
+
+    # Fingerprint of the imported fields, so re-imports can skip unchanged rows
+    content_hash = models.CharField(max_length=40, blank=True, editable=False)
+    # The public fields as ready-to-send JSON (see products/fragments.py)
+    public_json = models.BinaryField(default=b'', editable=False)
+
+    objects = ProductQuerySet.as_manager()
+
+    # The fields that come from the catalog CSV (and feed content_hash)
+    CATALOG_FIELDS = (
+        'item_name', 'image_url', 'category', 'color_name', 'color_family', 'is_neutral',
+        'season', 'fit', 'style', 'body_type', 'lifestyle', 'utility',
+    )
+    # Kept in sync with the catalog fields by refresh_derived_fields()
+    DERIVED_FIELDS = ('content_hash', 'public_json')
+
+    def __str__(self):
+        return f"{self.item_name} ({self.item_id})"
+
+    def compute_content_hash(self):
+        values = [str(getattr(self, field)) for field in ('item_id',) + self.CATALOG_FIELDS]
+        return hashlib.sha1('\x1f'.join(values).encode('utf-8')).hexdigest()
+
+    def compute_public_json(self):
+        return encode_public(self)
+
+    def refresh_derived_fields(self):
+        """
+        Recomputes the fields derived from the catalog columns. Call this
+        before bulk_create, which skips save().
+        """
+        self.content_hash = self.compute_content_hash()
+        self.public_json = self.compute_public_json()
+
+    def save(self, *args, **kwargs):
+        self.refresh_derived_fields()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = list(update_fields) + [
+                field for field in self.DERIVED_FIELDS if field not in update_fields
+            ]
+        super().save(*args, **kwargs)
+
+
+class ProductTag(models.Model):
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='product_tags')
+    tag = models.ForeignKey(Tag, on_delete=models.CASCADE, related_name='product_tags')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'tag'], name='products_producttag_uniq'),
+        ]
+        indexes = [
+            # Tag filters go tag -> products, so lead with tag_id
+            models.Index(fields=['tag', 'product'], name='products_pt_tag_product_idx'),
+        ]
+
+
+
+class ProductNeighbors(models.Model):
+    """
+    The precomputed nearest neighbors of one product, as item_ids in order
+    of similarity. Written by `manage.py compute_neighbors` (see
+    products/neighbors.py); one row per product, so serving them is a
+    single primary key lookup.
+    """
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, primary_key=True, related_name='neighbors')
+    # Same category: "similar items"
+    similar = models.JSONField(default=list)
+    # Other categories: "complete the look"
+    complements = models.JSONField(default=list)
+    # The catalog version the neighbors were computed from
+    catalog_version = models.PositiveBigIntegerField()
+
+    def __str__(self):
+        return f"Neighbors of {self.product_id}"
+
+
+class CatalogVersion(models.Model):
+    """
+    A single-row counter that is bumped every time the catalog changes.
+    Caches key on it, so bumping it retires every cached recommendation.
+    """
+    version = models.PositiveBigIntegerField(default=0)
+    # The change log (CatalogChange) holds every change made after this version
+    changes_since = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Catalog v{self.version}"
+
+
+class CatalogChange(models.Model):
+    """
+    One product inserted, updated or deleted by a catalog version: the feed
+    behind /api/catalog/changes/ (see products/changes.py). Deleted products
+    are gone from the products table, hence a plain item_id, not a key.
+    """
+    INSERT = 'insert'
+    UPDATE = 'update'
+    DELETE = 'delete'
+    OP_CHOICES = [(INSERT, 'Insert'), (UPDATE, 'Update'), (DELETE, 'Delete')]
+
+    version = models.PositiveBigIntegerField(db_index=True)
+    item_id = models.CharField(max_length=10)
+    op = models.CharField(max_length=6, choices=OP_CHOICES)
+
     def __str__(self):
-        return f"{self.item_name} ({self.item_id})"
\ No newline at end of file
+        return f"v{self.version} {self.op} {self.item_id}"
@@ -0,0 +1,103 @@
+# backend/src/products/neighbors.py
+"""
+Item-to-item neighbors: "similar items" and "complete the look".
+
+Every product becomes a tag vector with one weighted 0/1 entry per
+(field, tag value) from the catalog index. Two products' similarity is the
+weighted Jaccard index of their tags:
+
+    shared weight / (weight of a + weight of b - shared weight)
+
+The shared weights of a block of products against the whole catalog are one
+matrix product, so the job runs block by block in NumPy, keeping memory
+bounded, instead of comparing pairs in Python. Neighbors in the same
+category are "similar"; neighbors from other categories "complete the look".
+"""
+import numpy as np
+
+# How much a shared tag counts, per field. Category decides which list a
+# neighbor lands in rather than adding to the score.
+FIELD_WEIGHTS = {
+    'style': 3.0,
+    'lifestyle': 2.0,
+    'body_type': 1.0,
+    'utility': 1.0,
+    'color_family': 1.0,
+    'season': 1.0,
+}
+
+# Roughly how many similarity scores one block may hold at once
+BLOCK_CELLS = 1 << 24
+
+
+def tag_vectors(index):
+    """
+    Returns (vectors, weights): a (products x tag values) 0/1 float32 matrix
+    over FIELD_WEIGHTS and the weight of each column.
+    """
+    matrices, weights = [], []
+    for field, weight in FIELD_WEIGHTS.items():
+        _, matrix = index.tag_matrix(field)
+        matrices.append(matrix)
+        weights.append(np.full(matrix.shape[1], weight, dtype=np.float32))
+    return np.hstack(matrices), np.concatenate(weights)
+
+
+def _category_codes(index):
+    codes = np.full(index.size, -1, dtype=np.int32)
+    keys, matrix = index.tag_matrix('category')
+    for column in range(len(keys)):
+        codes[matrix[:, column] > 0] = column
+    return codes
+
+
+def _top(scores, k):
+    """
+    Per row, the positions of the k best positive scores, best first.
+    """
+    k = min(k, scores.shape[1])
+    best = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    best_scores = np.take_along_axis(scores, best, axis=1)
+    order = np.argsort(-best_scores, axis=1, kind='stable')
+    best = np.take_along_axis(best, order, axis=1)
+    best_scores = np.take_along_axis(best_scores, order, axis=1)
+    return [row[row_scores > 0] for row, row_scores in zip(best, best_scores)]
+
+
+def compute_neighbors(index, k=24, block_size=None):
+    """
+    Yields (position, similar positions, complement positions) for every
+    product in the catalog index, each list at most k long and best first.
+    """
+    size = index.size
+    if not size:
+        return
+    # Grouped by category, one block never spans two categories and a
+    # block's same-category products are one contiguous slice of columns.
+    categories = _category_codes(index)
+    order = np.argsort(categories, kind='stable')
+    vectors, weights = tag_vectors(index)
+    vectors = vectors[order]
+    weighted = vectors * weights
+    totals = vectors @ weights
+    bounds = np.flatnonzero(np.diff(categories[order])) + 1
+    block_size = block_size or max(1, min(1024, BLOCK_CELLS // size))
+
+    for lo, hi in zip([0, *bounds.tolist()], [*bounds.tolist(), size]):
+        for start in range(lo, hi, block_size):
+            stop = min(start + block_size, hi)
+            scores = weighted[start:stop] @ vectors.T  # shared weight
+            union = totals[start:stop, None] + totals[None, :] - scores
+            np.maximum(union, 1e-6, out=union)  # both empty means nothing shared either
+            scores /= union
+            scores[np.arange(stop - start), np.arange(start, stop)] = -1  # never your own neighbor
+
+            similar = _top(scores[:, lo:hi], k)
+            scores[:, lo:hi] = -1
+            complements = _top(scores, k)
+            for offset in range(stop - start):
+                yield (
+                    int(order[start + offset]),
+                    order[similar[offset] + lo],
+                    order[complements[offset]],
+                )
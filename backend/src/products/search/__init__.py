@@ -0,0 +1,40 @@
+# backend/src/products/search/__init__.py
+"""
+Full-text product search behind /api/products/search/.
+
+The backend is picked by the PRODUCT_SEARCH_BACKEND setting:
+
+- memory.InMemorySearchBackend (the default) ranks with BM25 over an
+  in-process inverted index. It needs no extra infrastructure, so it works
+  offline, in tests and on SQLite.
+- postgres.PostgresSearchBackend uses Postgres full-text search on a
+  GIN-indexed tsvector, so every process shares one index and no worker
+  has to build its own.
+
+Committed catalog changes are passed on to the backend (see
+products.signals.catalog_changed), so backends that keep their own index can
+update it without a full rebuild.
+"""
+from functools import lru_cache
+
+from django.conf import settings
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+from products.signals import catalog_changed
+from .base import SEARCH_FIELDS, SearchBackend, search_document
+
+
+@lru_cache(maxsize=None)
+def _load_backend(path):
+    return import_string(path)()
+
+
+def get_search_backend():
+    return _load_backend(settings.PRODUCT_SEARCH_BACKEND)
+
+
+@receiver(catalog_changed)
+def apply_catalog_change(sender, products, removed_ids, catalog_version, **kwargs):
+    documents = {product.item_id: search_document(product) for product in products}
+    get_search_backend().apply_changes(documents, removed_ids, catalog_version)
@@ -0,0 +1,32 @@
+# backend/src/products/search/base.py
+
+# The Product fields a search query is matched against.
+SEARCH_FIELDS = ('item_name', 'category', 'color_name', 'style')
+
+
+def search_document(product):
+    """
+    The searchable text of a product, as {field: text}.
+    """
+    return {field: getattr(product, field) or '' for field in SEARCH_FIELDS}
+
+
+class SearchBackend:
+    """
+    The interface every product search backend implements.
+    """
+
+    def search(self, query, limit=20, offset=0):
+        """
+        The item_ids of the products best matching `query`, best first.
+        """
+        raise NotImplementedError
+
+    def apply_changes(self, documents, removed_ids, catalog_version):
+        """
+        Called once a catalog change has committed, with the new search
+        documents ({item_id: search_document}) of every inserted or updated
+        product, the item_ids that were deleted, and the catalog version
+        the change produced. Backends whose index the database maintains
+        can ignore it.
+        """
@@ -0,0 +1,228 @@
+# backend/src/products/search/memory.py
+"""
+BM25 ranking over an in-process inverted index.
+
+Every term maps to two parallel NumPy arrays: the document slots it occurs
+in and its (field-weighted) frequency in each. A query scores only the
+postings of its own terms, so even terms that match most of a 100k catalog
+cost a few vectorized operations rather than a Python loop.
+
+An index is immutable once built: updated() returns a new index that shares
+the postings of every untouched term, and the backend swaps it in. Searches
+running in other threads keep the index they started with, so they never
+need a lock. Removed products leave a dead slot behind until more than half
+of the slots are dead, then the index is compacted.
+"""
+import math
+import re
+import threading
+from functools import cached_property
+
+import numpy as np
+
+from products.models import Product
+from recommender_project.routers import replica_reads
+from products.versioning import get_catalog_version
+from .base import SEARCH_FIELDS, SearchBackend
+
+# A term in the product name counts double
+FIELD_WEIGHTS = {'item_name': 2.0, 'category': 1.0, 'color_name': 1.0, 'style': 1.0}
+K1 = 1.2
+B = 0.75
+
+_TOKEN = re.compile(r'[^\W_]+')
+
+
+def tokenize(text):
+    return _TOKEN.findall(text.casefold())
+
+
+class BM25Index:
+    def __init__(self):
+        self.version = None
+        self.item_ids = []  # slot -> item_id, None for a dead slot
+        self.slots = {}  # item_id -> slot
+        self.postings = {}  # term -> (slots, frequencies)
+        self.lengths = np.zeros(0, dtype=np.float32)  # weighted document length per slot
+        self.alive = np.zeros(0, dtype=bool)
+        self.total_length = 0.0
+
+    @classmethod
+    def build(cls, documents):
+        """
+        An index over `documents`, {item_id: {field: text}}.
+        """
+        return cls().updated(documents, ())
+
+    @property
+    def size(self):
+        return len(self.slots)
+
+    def updated(self, documents, removed_ids):
+        """
+        A copy of this index with `documents` added (replacing any earlier
+        version of the same product) and `removed_ids` taken out.
+        """
+        index = BM25Index()
+        index.version = self.version
+        index.item_ids = list(self.item_ids)
+        index.slots = dict(self.slots)
+        index.postings = dict(self.postings)
+        index.total_length = self.total_length
+
+        # Replaced and removed products leave dead slots behind
+        dead = np.array(
+            [index.slots.pop(item_id) for item_id in (*removed_ids, *documents) if item_id in index.slots],
+            dtype=np.intp,
+        )
+        alive = np.concatenate([self.alive, np.ones(len(documents), dtype=bool)])
+        alive[dead] = False
+        for slot in dead.tolist():
+            index.item_ids[slot] = None
+        index.total_length -= float(self.lengths[dead].sum())
+
+        first_slot = len(index.item_ids)
+        new_postings = {}
+        lengths = np.zeros(len(documents), dtype=np.float32)
+        for offset, (item_id, document) in enumerate(documents.items()):
+            slot = first_slot + offset
+            index.item_ids.append(item_id)
+            index.slots[item_id] = slot
+            frequencies = {}
+            for field in SEARCH_FIELDS:
+                weight = FIELD_WEIGHTS[field]
+                for term in tokenize(document.get(field) or ''):
+                    frequencies[term] = frequencies.get(term, 0.0) + weight
+            lengths[offset] = sum(frequencies.values())
+            for term, frequency in frequencies.items():
+                slots, values = new_postings.setdefault(term, ([], []))
+                slots.append(slot)
+                values.append(frequency)
+
+        for term, (slots, values) in new_postings.items():
+            slots = np.array(slots, dtype=np.int32)
+            values = np.array(values, dtype=np.float32)
+            existing = index.postings.get(term)
+            if existing is not None:
+                slots = np.concatenate([existing[0], slots])
+                values = np.concatenate([existing[1], values])
+            index.postings[term] = (slots, values)
+
+        index.lengths = np.concatenate([self.lengths, lengths])
+        index.alive = alive
+        index.total_length += float(lengths.sum())
+
+        if len(index.item_ids) > 2 * max(index.size, 1):
+            index._compact()
+        return index
+
+    def _compact(self):
+        """
+        Drops the dead slots and renumbers the rest (in place; only called
+        on an index nobody else can see yet).
+        """
+        keep = self.alive
+        renumber = (np.cumsum(keep) - 1).astype(np.int32)
+        postings = {}
+        for term, (slots, values) in self.postings.items():
+            live = keep[slots]
+            if live.any():
+                postings[term] = (renumber[slots[live]], values[live])
+        self.postings = postings
+        self.item_ids = [item_id for item_id in self.item_ids if item_id is not None]
+        self.slots = {item_id: slot for slot, item_id in enumerate(self.item_ids)}
+        self.lengths = self.lengths[keep]
+        self.alive = np.ones(len(self.item_ids), dtype=bool)
+
+    @cached_property
+    def norms(self):
+        # The BM25 length normalization of every slot
+        average_length = self.total_length / max(self.size, 1)
+        return K1 * (1 - B + B * self.lengths / max(average_length, 1e-9))
+
+    def _idf(self, slots, count):
+        matched = len(slots) if self.size == len(self.item_ids) else int(self.alive[slots].sum())
+        return math.log(1 + (count - matched + 0.5) / (matched + 0.5))
+
+    def search(self, query, limit=20, offset=0):
+        """
+        The item_ids of the best `limit` matches for `query` after skipping
+        `offset`, best first (ties keep item_id order for a fresh index).
+        """
+        matches = [self.postings[term] for term in set(tokenize(query)) if term in self.postings]
+        wanted = offset + limit
+        if not matches or limit <= 0 or not self.size:
+            return []
+
+        count = self.size
+        norms = self.norms
+        if len(matches) == 1:
+            slots, frequencies = matches[0]
+            scores = self._idf(slots, count) * frequencies * (K1 + 1) / (frequencies + norms[slots])
+        else:
+            # Accumulate into a dense array: a slot occurs at most once per term
+            totals = np.zeros(len(self.item_ids), dtype=np.float32)
+            for slots, frequencies in matches:
+                totals[slots] += self._idf(slots, count) * frequencies * (K1 + 1) / (frequencies + norms[slots])
+            slots = np.flatnonzero(totals)
+            scores = totals[slots]
+
+        live = self.alive[slots]
+        if not live.all():
+            slots, scores = slots[live], scores[live]
+        if wanted < len(slots):
+            best = np.argpartition(-scores, wanted - 1)[:wanted]
+            slots, scores = slots[best], scores[best]
+        order = np.lexsort((slots, -scores))[offset:wanted]
+        return [self.item_ids[slot] for slot in slots[order].tolist()]
+
+
+def load_documents():
+    """
+    The search document of every product, in item_id order.
+    """
+    values = Product.objects.order_by('item_id').values_list('item_id', *SEARCH_FIELDS)
+    return {
+        item_id: dict(zip(SEARCH_FIELDS, texts))
+        for item_id, *texts in values.iterator(chunk_size=5000)
+    }
+
+
+class InMemorySearchBackend(SearchBackend):
+    """
+    Keeps one BM25Index per process, built on first use and rebuilt when
+    the catalog version moves on, like the catalog index. Changes reported
+    by this process's own imports are applied incrementally instead.
+    """
+
+    def __init__(self):
+        self._index = None
+        self._lock = threading.Lock()
+
+    def get_index(self):
+        version = get_catalog_version()
+        index = self._index
+        if index is None or index.version != version:
+            with self._lock:
+                if self._index is None or self._index.version != version:
+                    with replica_reads(catalog_version=version):
+                        documents = load_documents()
+                    index = BM25Index.build(documents)
+                    index.version = version
+                    self._index = index
+                index = self._index
+        return index
+
+    def search(self, query, limit=20, offset=0):
+        return self.get_index().search(query, limit, offset)
+
+    def apply_changes(self, documents, removed_ids, catalog_version):
+        with self._lock:
+            index = self._index
+            # Only when this change is the sole step between the two versions;
+            # otherwise the next search rebuilds from the database
+            if index is None or index.version != catalog_version - 1:
+                return
+            index = index.updated(documents, removed_ids)
+            index.version = catalog_version
+            self._index = index
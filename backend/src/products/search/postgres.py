@@ -0,0 +1,34 @@
+# backend/src/products/search/postgres.py
+from django.db import connections, router
+
+from products.models import Product
+from .base import SearchBackend
+
+# Must stay identical to the expression of the GIN index created by
+# products/migrations/0007_product_search_index.py, or Postgres won't use it.
+SEARCH_DOCUMENT = (
+    "to_tsvector('english'::regconfig, "
+    "item_name || ' ' || category || ' ' || color_name || ' ' || replace(style, ',', ' '))"
+)
+
+
+class PostgresSearchBackend(SearchBackend):
+    """
+    Postgres full-text search. Queries use websearch syntax ("black -leather",
+    "\"wide leg\""), matches come from the GIN index, and ts_rank_cd orders
+    them. The database keeps the index current, so catalog changes need no
+    work here.
+    """
+
+    def search(self, query, limit=20, offset=0):
+        connection = connections[router.db_for_read(Product)]  # A replica, inside replica_reads
+        table = connection.ops.quote_name(Product._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT item_id FROM {table}, websearch_to_tsquery('english'::regconfig, %s) query "
+                f"WHERE {SEARCH_DOCUMENT} @@ query "
+                f"ORDER BY ts_rank_cd({SEARCH_DOCUMENT}, query) DESC, item_id "
+                f"LIMIT %s OFFSET %s",
+                [query, limit, offset],
+            )
+            return [item_id for item_id, in cursor.fetchall()]
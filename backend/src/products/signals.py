@@ -0,0 +1,79 @@
+from threading import local
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+from .changes import record_changes
+from .models import Product
+from .tags import sync_product_tags
+from .versioning import bump_catalog_version
+
+# Sent once a catalog change has committed, with `products` (the inserted or
+# updated Product instances), `removed_ids` and the `catalog_version` the
+# change produced. In-process indexes (search, facets) use it to apply the
+# change incrementally instead of rebuilding.
+catalog_changed = Signal()
+
+# Inside products.editing.collect_saves, the saves of this thread are kept
+# here (`products`, keyed by item_id) and logged together when the block
+# exits; inside collect_deletes, so are the item_ids deleted (`deleted`).
+collected_saves = local()
+
+
+def announce_catalog_change(products, removed_ids, catalog_version):
+    """
+    Sends catalog_changed when the current transaction commits.
+    """
+    products, removed_ids = list(products), list(removed_ids)
+    transaction.on_commit(lambda: catalog_changed.send(
+        sender=Product, products=products, removed_ids=removed_ids, catalog_version=catalog_version,
+    ))
+
+
+# Bulk imports call sync_product_tags themselves; this covers single saves (e.g. the admin).
+@receiver(post_save, sender=Product)
+def sync_tags_on_save(sender, instance, created=False, raw=False, **kwargs):
+    """
+    Keep the normalized ProductTag rows in step with the comma-separated
+    fields, and log the change under a new catalog version.
+
+    Each save bumps the catalog version on its own, which locks the version
+    row until the transaction commits and makes every in-process index
+    catch up. Code that saves many products should do it inside
+    products.editing.collect_saves, which logs them under one version.
+    """
+    if raw:
+        return
+    saves = getattr(collected_saves, 'products', None)
+    if saves is not None:
+        # An insert stays an insert if it's saved again in the same block
+        created = created or saves.get(instance.item_id, (None, False))[1]
+        saves[instance.item_id] = (instance, created)
+        return
+    sync_product_tags([instance])
+    version = bump_catalog_version()
+    if created:
+        record_changes(version, inserted=[instance.item_id])
+    else:
+        record_changes(version, updated=[instance.item_id])
+    announce_catalog_change([instance], (), version)
+
+
+@receiver(post_delete, sender=Product)
+def log_delete(sender, instance, **kwargs):
+    """
+    Log a deleted product under a new catalog version, so delta-sync
+    clients drop it too. Like saves, deleting many should happen inside
+    products.editing.collect_saves (or go through delete_products).
+    """
+    saves = getattr(collected_saves, 'products', None)
+    # Inserted and deleted within one block: clients never saw it
+    created = saves is not None and saves.pop(instance.item_id, (None, False))[1]
+    deleted = getattr(collected_saves, 'deleted', None)
+    if deleted is not None:
+        if not created:
+            deleted.append(instance.item_id)
+        return
+    version = bump_catalog_version()
+    record_changes(version, deleted=[instance.item_id])
+    announce_catalog_change((), [instance.item_id], version)
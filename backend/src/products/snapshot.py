@@ -0,0 +1,207 @@
+# backend/src/products/snapshot.py
+"""
+A compiled, memory-mapped snapshot of the catalog index.
+
+`manage.py compile_catalog` writes the whole CatalogIndex into one binary
+file. Workers `mmap` it read-only, so every gunicorn/uvicorn worker on a
+machine shares the same physical pages, and loading it is just parsing a
+header: no queries, no Python objects per product.
+
+File layout (all integers little-endian, every section 8-byte aligned):
+
+    header        MAGIC, format version, catalog version, counts, section offsets
+    strings       uint32 offsets[n_strings + 1] + UTF-8 blob (interned strings)
+    columns       uint32 [n_products x len(PUBLIC_FIELDS)] string ids
+    tags          uint32 [n_tags] field ids, uint32 [n_tags] key ids, uint32 [n_tags] label ids
+    bitsets       uint8  [n_tags x ceil(n_products / 8)] packed bitsets
+
+New snapshots are written to a temporary file and renamed over the old one,
+so readers either see the old file or the new one, never a partial write.
+Processes that already mapped the old file keep using it until they notice
+the catalog version has moved on.
+"""
+import mmap
+import os
+import struct
+import tempfile
+
+import numpy as np
+
+from .catalog_index import PUBLIC_FIELDS, TAG_FIELDS, CatalogIndex
+
+MAGIC = b'CATSNAP\x00'
+FORMAT_VERSION = 2  # 2: is_neutral is indexed
+
+# magic, format version, catalog version, products, strings, tags,
+# then offsets of: string offsets, string blob, columns, tags, bitsets
+HEADER = struct.Struct('<8sIQIII5Q')
+
+
+class SnapshotError(Exception):
+    pass
+
+
+def _align(size):
+    return (size + 7) & ~7
+
+
+class _StringTable:
+    def __init__(self):
+        self.ids = {}
+        self.strings = []
+
+    def intern(self, value):
+        value = '' if value is None else str(value)
+        string_id = self.ids.get(value)
+        if string_id is None:
+            string_id = self.ids[value] = len(self.strings)
+            self.strings.append(value)
+        return string_id
+
+
+def write_snapshot(index, path):
+    """
+    Serializes `index` to `path` atomically (write to a temp file, then rename).
+    """
+    strings = _StringTable()
+
+    columns = np.zeros((index.size, len(PUBLIC_FIELDS)), dtype='<u4')
+    for position, row in enumerate(index.rows):
+        columns[position] = [strings.intern(row[field]) for field in PUBLIC_FIELDS]
+
+    tag_fields, tag_keys, tag_labels, bitsets = [], [], [], []
+    for field_id, field in enumerate(TAG_FIELDS):
+        for key, bits in index._bitsets[field].items():
+            tag_fields.append(field_id)
+            tag_keys.append(strings.intern(key))
+            tag_labels.append(strings.intern(index.labels[field][key]))
+            bitsets.append(bits)
+
+    encoded = [value.encode('utf-8') for value in strings.strings]
+    string_offsets = np.zeros(len(encoded) + 1, dtype='<u4')
+    np.cumsum([len(value) for value in encoded], out=string_offsets[1:])
+    sections = [
+        string_offsets.tobytes(),
+        b''.join(encoded),
+        columns.tobytes(),
+        np.array([tag_fields, tag_keys, tag_labels], dtype='<u4').reshape(3, -1).tobytes(),
+        np.concatenate(bitsets).tobytes() if bitsets else b'',
+    ]
+
+    offsets = []
+    position = _align(HEADER.size)
+    for section in sections:
+        offsets.append(position)
+        position = _align(position + len(section))
+
+    header = HEADER.pack(
+        MAGIC, FORMAT_VERSION, index.version or 0, index.size, len(encoded), len(tag_fields), *offsets
+    )
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.catalog-', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as file:
+            file.write(header)
+            for offset, section in zip(offsets, sections):
+                file.write(b'\0' * (offset - file.tell()))
+                file.write(section)
+            file.flush()
+            os.fsync(file.fileno())
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+class SnapshotRows:
+    """
+    A read-only sequence of product rows decoded lazily from the snapshot.
+    Only the rows a request actually touches are ever turned into dicts.
+    """
+
+    def __init__(self, snapshot, columns):
+        self._snapshot = snapshot
+        self._columns = columns
+
+    def __len__(self):
+        return len(self._columns)
+
+    def __getitem__(self, position):
+        string = self._snapshot.string
+        return {field: string(string_id) for field, string_id in zip(PUBLIC_FIELDS, self._columns[position].tolist())}
+
+    def __iter__(self):
+        for position in range(len(self)):
+            yield self[position]
+
+    @property
+    def item_ids(self):
+        return [self._snapshot.string(string_id) for string_id in self._columns[:, 0].tolist()]
+
+
+class CatalogSnapshot:
+    """
+    A memory-mapped snapshot file. Keep the object alive for as long as the
+    index built from it is in use; the arrays are views into the mapping.
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if len(self._mmap) < HEADER.size:
+            raise SnapshotError(f'{path} is too small to be a catalog snapshot')
+        (magic, format_version, self.catalog_version, self.size, n_strings, n_tags,
+         strings_at, blob_at, columns_at, tags_at, bitsets_at) = HEADER.unpack_from(self._mmap)
+        if magic != MAGIC or format_version != FORMAT_VERSION:
+            raise SnapshotError(f'{path} is not a version {FORMAT_VERSION} catalog snapshot')
+
+        buffer = memoryview(self._mmap)
+        self._string_offsets = np.frombuffer(buffer, dtype='<u4', count=n_strings + 1, offset=strings_at)
+        self._blob_at = blob_at
+        self._columns = np.frombuffer(
+            buffer, dtype='<u4', count=self.size * len(PUBLIC_FIELDS), offset=columns_at
+        ).reshape(self.size, len(PUBLIC_FIELDS))
+        self._tags = np.frombuffer(buffer, dtype='<u4', count=3 * n_tags, offset=tags_at).reshape(3, n_tags)
+        nbytes = (self.size + 7) // 8
+        self._bitsets = np.frombuffer(buffer, dtype=np.uint8, count=n_tags * nbytes, offset=bitsets_at).reshape(
+            n_tags, nbytes
+        )
+
+    def string(self, string_id):
+        start, end = self._string_offsets[string_id], self._string_offsets[string_id + 1]
+        return self._mmap[self._blob_at + int(start):self._blob_at + int(end)].decode('utf-8')
+
+    def to_index(self):
+        """
+        A CatalogIndex whose rows and bitsets are views into the mapping.
+        """
+        bitsets = {field: {} for field in TAG_FIELDS}
+        labels = {field: {} for field in TAG_FIELDS}
+        for tag, (field_id, key_id, label_id) in enumerate(self._tags.T.tolist()):
+            field = TAG_FIELDS[field_id]
+            key = self.string(key_id)
+            bitsets[field][key] = self._bitsets[tag]
+            labels[field][key] = self.string(label_id)
+
+        index = CatalogIndex(SnapshotRows(self, self._columns), bitsets, labels)
+        index.version = self.catalog_version
+        index.snapshot = self  # keeps the mapping alive alongside the index
+        return index
+
+
+def load_snapshot_index(path, expected_version):
+    """
+    Maps the snapshot at `path` and returns its index, or None when there is
+    no usable snapshot for `expected_version` (missing, stale or corrupt).
+    """
+    try:
+        snapshot = CatalogSnapshot(path)
+    except (OSError, ValueError, SnapshotError):
+        return None
+    if snapshot.catalog_version != expected_version:
+        return None
+    return snapshot.to_index()
@@ -0,0 +1,131 @@
+# backend/src/products/tags.py
+"""
+Helpers for the normalized tag tables (Tag / ProductTag).
+
+The comma-separated CharFields on Product stay the human-editable source of
+truth; these helpers keep the indexed tag rows in sync with them.
+"""
+from django.db.models import Case, CharField, F, Q, Value, When
+
+# The comma-separated Product fields that are normalized into Tag rows.
+MULTI_VALUE_TAG_FIELDS = ('style', 'body_type', 'lifestyle', 'utility')
+
+
+def normalize_tag(value):
+    """
+    Normalizes a single tag so lookups are case and whitespace insensitive,
+    e.g. " smart  casual" and "Smart Casual" resolve to the same tag.
+    """
+    return ' '.join(value.split()).casefold()
+
+
+def split_tags(value):
+    """
+    Splits one of our comma-separated tag strings into clean tag labels.
+    """
+    if not value:
+        return []
+    return [tag.strip() for tag in value.split(',') if tag.strip()]
+
+
+def with_tag(value, label):
+    """
+    A comma-separated tag string with `label` added, unless it already has it.
+    """
+    labels = split_tags(value)
+    if normalize_tag(label) in {normalize_tag(existing) for existing in labels}:
+        return ','.join(labels)
+    return ','.join([*labels, label.strip()])
+
+
+def without_tag(value, label):
+    """
+    A comma-separated tag string with every spelling of `label` taken out.
+    """
+    key = normalize_tag(label)
+    return ','.join(existing for existing in split_tags(value) if normalize_tag(existing) != key)
+
+
+def tag_rewrites(queryset, field, edit):
+    """
+    {old value: edit(old value)} for the distinct values of a comma-separated
+    tag `field` in `queryset` that `edit` changes. Tag combinations repeat a
+    lot, so this is one SELECT DISTINCT and a short dict even for a huge
+    queryset.
+    """
+    rewrites = {}
+    for old in queryset.order_by().values_list(field, flat=True).distinct():
+        new = edit(old)
+        if new != (old or ''):
+            rewrites[old] = new
+    return rewrites
+
+
+def rewritten_rows(queryset, field, rewrites):
+    """
+    The rows of `queryset` that `rewrites` (see tag_rewrites) changes.
+    """
+    rewritten = Q(**{f'{field}__in': [old for old in rewrites if old is not None]})
+    if None in rewrites:
+        rewritten |= Q(**{f'{field}__isnull': True})
+    return queryset.filter(rewritten)
+
+
+def rewrite_tags(queryset, field, rewrites, **also):
+    """
+    Applies `rewrites` (see tag_rewrites) to the rows of `queryset` as a
+    single UPDATE with one CASE branch per old value, setting the `also`
+    fields on the rewritten rows too. Returns the number of rows updated.
+    """
+    if not rewrites:
+        return 0
+    expression = Case(
+        *[When(**{field: old}, then=Value(new)) for old, new in rewrites.items()],
+        default=F(field), output_field=CharField(),
+    )
+    return rewritten_rows(queryset, field, rewrites).update(**{field: expression}, **also)
+
+
+def sync_product_tags(products, replace=True):
+    """
+    Writes the ProductTag rows for `products` from their comma-separated
+    fields, creating any missing Tag rows along the way.
+
+    Runs a fixed number of queries regardless of how many products are passed
+    in, so it is safe to call from bulk imports. With `replace=False` the
+    existing rows are assumed to be gone already (e.g. freshly created products).
+    """
+    from .models import ProductTag, Tag
+
+    products = list(products)
+    if not products:
+        return
+
+    wanted = {}  # (kind, key) -> label
+    for product in products:
+        for kind in MULTI_VALUE_TAG_FIELDS:
+            for label in split_tags(getattr(product, kind)):
+                wanted.setdefault((kind, normalize_tag(label)), label)
+
+    Tag.objects.bulk_create(
+        [Tag(kind=kind, key=key, name=label) for (kind, key), label in wanted.items()],
+        ignore_conflicts=True,
+    )
+    tag_ids = {
+        (kind, key): pk
+        for pk, kind, key in Tag.objects.filter(key__in={key for _, key in wanted}).values_list('pk', 'kind', 'key')
+    }
+
+    if replace:
+        ProductTag.objects.filter(product__in=[p.pk for p in products]).delete()
+
+    links = []
+    for product in products:
+        seen = set()
+        for kind in MULTI_VALUE_TAG_FIELDS:
+            for label in split_tags(getattr(product, kind)):
+                tag_id = tag_ids[(kind, normalize_tag(label))]
+                if tag_id not in seen:
+                    seen.add(tag_id)
+                    links.append(ProductTag(product_id=product.pk, tag_id=tag_id))
+    ProductTag.objects.bulk_create(links, batch_size=5000)
@@ -1,3 +1,429 @@
-from django.test import TestCase
+import csv
+import io
+import os
+import random
+import shutil
+import struct
+import tempfile
+from types import SimpleNamespace
 
-# Create your tests here.
+import numpy as np
+import orjson
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from .bitmaps import Bitmap
+from .catalog_index import TAG_FIELDS, CatalogIndex
+from .changes import net_changes, record_changes
+from .editing import collect_saves, delete_products
+from .facets import FacetIndex
+from .models import CatalogChange, Product
+from .neighbors import compute_neighbors, tag_vectors
+from .search.base import SEARCH_FIELDS
+from .search.memory import BM25Index
+from .snapshot import FORMAT_VERSION, load_snapshot_index, write_snapshot
+from .versioning import get_catalog_version
+
+
+def make_index():
+    rows = [{'item_id': f'P{i}', 'item_name': f'Item {i}', 'image_url': '', 'category': 'Top'} for i in range(10)]
+    postings = {
+        'body_type': {'Pear': [0, 1, 2, 3], 'Apple': [3, 4, 5]},
+        'lifestyle': {'Office': [1, 2, 4, 9], 'Smart Casual': [2, 3, 5]},
+        'style': {'Classic': [0, 2, 4], 'Boho': [1, 2]},
+    }
+    return CatalogIndex.from_postings(rows, postings)
+
+
+class CatalogIndexTests(SimpleTestCase):
+    def test_tags_are_case_and_whitespace_insensitive(self):
+        index = make_index()
+        self.assertEqual(index.positions(index.bitset('lifestyle', ' smart  CASUAL')).tolist(), [2, 3, 5])
+        self.assertEqual(index.count(index.bitset('lifestyle', 'Unknown')), 0)
+
+    def test_match_ands_and_any_of_ors(self):
+        index = make_index()
+        required = [index.any_of('body_type', ['Pear', 'Apple']), index.bitset('lifestyle', 'Office')]
+        self.assertEqual(np.flatnonzero(index.match(required)).tolist(), [1, 2, 4])
+
+    def test_rank_orders_by_weight_then_catalog_order(self):
+        index = make_index()
+        ranked = index.rank(
+            required=[index.any_of('body_type', ['Pear', 'Apple'])],
+            weighted=[(index.bitset('body_type', 'Apple'), 2.0), (index.bitset('lifestyle', 'Office'), 1.0)],
+        )
+        self.assertEqual(ranked.tolist(), [4, 3, 5, 1, 2, 0])
+        self.assertEqual(index.rank(limit=3).tolist(), [0, 1, 2])
+
+    def test_rank_for_profile_applies_body_type_and_lifestyle_filters(self):
+        index = make_index()
+        profile = SimpleNamespace(
+            primary_body_type='Pear', secondary_body_type='Apple',
+            weekday_lifestyle='Office', weekend_lifestyle='Smart Casual',
+        )
+        # Pear (2) beats Apple (1), and the weekday lifestyle (2) beats the weekend one (1)
+        self.assertEqual(index.rank_for_profile(profile).tolist(), [2, 1, 3, 4, 5])
+
+    def test_tags_at_reads_single_positions(self):
+        index = make_index()
+        self.assertEqual(index.tags_at('style', [2, 7, 1]), [{'classic', 'boho'}, set(), {'boho'}])
+        self.assertEqual(index.bits_at(index.bitset('style', 'Classic'), [4, 5]).tolist(), [True, False])
+
+
+WORDS = ('red', 'blue', 'linen', 'wool', 'shirt', 'dress', 'classic', 'boho', 'midi', 'cropped')
+
+
+def random_document(rng):
+    return {field: ' '.join(rng.choices(WORDS, k=rng.randint(0, 4))) for field in SEARCH_FIELDS}
+
+
+class SnapshotTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = os.path.join(directory, 'catalog.snap')
+        self.index = make_index()
+        self.index.version = 7
+        write_snapshot(self.index, self.path)
+
+    def test_round_trip(self):
+        loaded = load_snapshot_index(self.path, 7)
+        self.assertEqual((loaded.version, loaded.size), (7, self.index.size))
+        self.assertEqual(list(loaded.rows), list(self.index.rows))
+        self.assertEqual(loaded.item_ids, self.index.item_ids)
+        self.assertEqual(loaded.fragment(3), self.index.fragment(3))
+        self.assertEqual(loaded.labels, self.index.labels)
+        for field in TAG_FIELDS:
+            self.assertEqual(loaded._bitsets[field].keys(), self.index._bitsets[field].keys())
+            for key, bits in self.index._bitsets[field].items():
+                np.testing.assert_array_equal(loaded._bitsets[field][key], bits)
+        required = [loaded.bitset('body_type', 'Pear'), loaded.bitset('style', 'Boho')]
+        self.assertEqual(np.flatnonzero(loaded.match(required)).tolist(), [1, 2])
+
+    def test_unusable_snapshots_are_ignored(self):
+        self.assertIsNone(load_snapshot_index(self.path, 8))
+        self.assertIsNone(load_snapshot_index(self.path + '.missing', 7))
+        with open(self.path, 'rb') as file:
+            data = file.read()
+        for name, broken in [
+            ('magic', b'NOTASNAP' + data[8:]),
+            ('format', data[:8] + struct.pack('<I', FORMAT_VERSION + 1) + data[12:]),
+            ('truncated', data[:16]),
+        ]:
+            with self.subTest(name):
+                with open(self.path, 'wb') as file:
+                    file.write(broken)
+                self.assertIsNone(load_snapshot_index(self.path, 7))
+
+
+class NeighborsTests(SimpleTestCase):
+    def make_index(self):
+        rows = [{'item_id': f'P{i}', 'item_name': f'Item {i}', 'image_url': '', 'category': ''} for i in range(8)]
+        return CatalogIndex.from_postings(rows, {
+            'category': {'Top': [0, 2, 4, 6], 'Bottom': [1, 3, 5, 7]},
+            'style': {'Classic': [0, 1, 2, 3], 'Boho': [4, 5, 6, 7]},
+            'lifestyle': {'Office': [0, 1, 4, 5], 'Relaxed': [2, 3, 6, 7]},
+            'body_type': {'Pear': [0, 1, 2, 3, 4, 5], 'Apple': [6, 7]},
+        })
+
+    def similarity(self, vectors, weights, a, b):
+        shared = (vectors[a] * vectors[b]) @ weights
+        return shared / (vectors[a] @ weights + vectors[b] @ weights - shared)
+
+    def test_neighbors_are_best_first_and_split_by_category(self):
+        index = self.make_index()
+        vectors, weights = tag_vectors(index)
+        category = {position: 'Top' if position % 2 == 0 else 'Bottom' for position in range(index.size)}
+        neighbors = {position: (similar.tolist(), complements.tolist())
+                     for position, similar, complements in compute_neighbors(index, k=5, block_size=2)}
+        self.assertEqual(sorted(neighbors), list(range(index.size)))
+
+        for position, (similar, complements) in neighbors.items():
+            with self.subTest(position=position):
+                self.assertNotIn(position, similar + complements)
+                self.assertTrue(all(category[p] == category[position] for p in similar))
+                self.assertTrue(all(category[p] != category[position] for p in complements))
+                for found in (similar, complements):
+                    scores = [self.similarity(vectors, weights, position, p) for p in found]
+                    self.assertEqual(scores, sorted(scores, reverse=True))
+                    self.assertTrue(all(score > 0 for score in scores))
+
+        # Same style, lifestyle and body type first; nothing shared, not listed
+        self.assertEqual(neighbors[0], ([2, 4], [1, 3, 5]))
+        # Blocks only bound memory
+        for position, similar, complements in compute_neighbors(index, k=5):
+            self.assertEqual((similar.tolist(), complements.tolist()), neighbors[position])
+
+
+class SimilarViewTests(TestCase):
+    def setUp(self):
+        for item_id, category, style, lifestyle, body_type in [
+            ('T1', 'Top', 'Classic', 'Office', 'Pear'),
+            ('T2', 'Top', 'Classic', 'Office', 'Pear'),
+            ('T3', 'Top', 'Boho', 'Relaxed', 'Apple'),
+            ('B1', 'Bottom', 'Classic', 'Office', 'Pear'),
+            ('B2', 'Bottom', 'Classic', 'Relaxed', 'Apple'),
+        ]:
+            make_product(item_id, category=category, style=style, lifestyle=lifestyle, body_type=body_type).save()
+        call_command('compute_neighbors', stdout=io.StringIO())
+
+    def similar(self, item_id, **params):
+        response = self.client.get(f'/api/products/{item_id}/similar/', params)
+        if response.status_code != 200:
+            return response.status_code
+        return [product['item_id'] for product in response.json()]
+
+    def test_similar_items_and_complements(self):
+        self.assertEqual(self.similar('T1'), ['T2', 'T3'])
+        self.assertEqual(self.similar('T1', limit=1), ['T2'])
+        self.assertEqual(self.similar('T1', kind='complete'), ['B1', 'B2'])
+        self.assertEqual(self.similar('T1', body_type='Apple'), ['T3'])
+        self.assertEqual(self.similar('T1', kind='complete', body_type='apple, Hourglass'), ['B2'])
+
+    def test_bad_requests(self):
+        self.assertEqual(self.similar('T1', kind='other'), 400)
+        self.assertEqual(self.similar('T1', limit=0), 400)
+        self.assertEqual(self.similar('NOPE'), 404)
+        self.assertEqual(self.similar('T1', body_type='mine'), 401)
+
+
+class BM25IndexTests(SimpleTestCase):
+    def test_incremental_updates_match_a_rebuild(self):
+        rng = random.Random(7)
+        documents = {f'P{i:03}': random_document(rng) for i in range(200)}
+        index = BM25Index.build(documents)
+        for _ in range(30):
+            removed = rng.sample(sorted(documents), 10)
+            for item_id in removed:
+                del documents[item_id]
+            changed = {item_id: random_document(rng) for item_id in rng.sample(sorted(documents), 10)}
+            changed.update({f'N{rng.randrange(10 ** 6):06}': random_document(rng) for _ in range(5)})
+            documents.update(changed)
+            index = index.updated(changed, removed)
+
+        # Ties keep slot order, so rebuild in the incremental index's slot order
+        live = [item_id for item_id in index.item_ids if item_id is not None]
+        self.assertCountEqual(live, documents)
+        rebuilt = BM25Index.build({item_id: documents[item_id] for item_id in live})
+        for query in ('red', 'linen shirt', 'classic boho midi', 'wool dress'):
+            with self.subTest(query=query):
+                self.assertEqual(index.search(query, limit=1000), rebuilt.search(query, limit=1000))
+                self.assertEqual(index.search(query, limit=5, offset=5), rebuilt.search(query, limit=5, offset=5))
+
+    def test_removed_and_replaced_products_stop_matching(self):
+        index = BM25Index.build({'A': {'item_name': 'red shirt'}, 'B': {'item_name': 'blue shirt'}})
+        index = index.updated({'A': {'item_name': 'green dress'}}, ['B'])
+        self.assertEqual(index.search('shirt'), [])
+        self.assertEqual(index.search('dress'), ['A'])
+        self.assertEqual(index.size, 1)
+
+    def test_name_matches_rank_above_other_fields(self):
+        index = BM25Index.build({
+            'A': {'item_name': 'linen trousers', 'style': 'classic'},
+            'B': {'item_name': 'classic blazer', 'style': 'smart'},
+        })
+        self.assertEqual(index.search('classic'), ['B', 'A'])
+
+
+class BitmapTests(SimpleTestCase):
+    def test_operations_match_sets(self):
+        rng = np.random.default_rng(3)
+        # Sparse and dense chunks, and chunks only one side has
+        a = set(rng.choice(200_000, 9000, replace=False).tolist()) | set(range(70_000, 80_000))
+        b = set(rng.choice(200_000, 3000, replace=False).tolist()) | set(range(75_000, 76_000))
+        x, y = Bitmap.from_positions(sorted(a)), Bitmap.from_positions(sorted(b))
+        self.assertEqual(x.positions().tolist(), sorted(a))
+        self.assertEqual((x & y).positions().tolist(), sorted(a & b))
+        self.assertEqual((x | y).positions().tolist(), sorted(a | b))
+        self.assertEqual((x - y).positions().tolist(), sorted(a - b))
+        self.assertEqual((y - x).positions().tolist(), sorted(b - a))
+        self.assertEqual(x.intersection_count(y), len(a & b))
+        self.assertEqual(len(x), len(a))
+
+    def test_empty(self):
+        empty = Bitmap()
+        self.assertFalse(empty)
+        self.assertFalse(Bitmap.from_positions([5]) - Bitmap.from_positions([5]))
+        self.assertEqual((empty | Bitmap.from_positions([1, 2])).positions().tolist(), [1, 2])
+
+
+def random_record(rng):
+    return {
+        'category': rng.choice(['Top', 'Bottom', 'Dress', '']),
+        'color_family': rng.choice(['Black', 'Red', 'Navy']),
+        'season': rng.choice(['Summer', 'Winter', None]),
+        'fit': rng.choice(['Slim', 'Relaxed']),
+        'is_neutral': rng.random() < 0.4,
+        'style': ', '.join(rng.sample(['Classic', 'Boho', 'Edgy', 'Romantic'], rng.randint(0, 2))),
+    }
+
+
+class FacetIndexTests(SimpleTestCase):
+    FILTERS = (
+        {},
+        {'category': ['Top']},
+        {'category': ['top', 'Dress'], 'style': ['Boho']},
+        {'is_neutral': ['true'], 'season': ['Winter'], 'color_family': ['Black', 'Navy']},
+    )
+
+    def test_incremental_updates_match_a_rebuild(self):
+        rng = random.Random(11)
+        records = {f'P{i:03}': random_record(rng) for i in range(150)}
+        index = FacetIndex.build(records)
+        for step in range(25):
+            removed = rng.sample(sorted(records), 6)
+            for item_id in removed:
+                del records[item_id]
+            changed = {item_id: random_record(rng) for item_id in rng.sample(sorted(records), 8)}
+            changed.update({f'N{step:02}{i}': random_record(rng) for i in range(3)})
+            records.update(changed)
+            index = index.updated(changed, removed)
+
+            rebuilt = FacetIndex.build(records)
+            for filters in self.FILTERS:
+                with self.subTest(step=step, filters=filters):
+                    self.assertEqual(index.browse(filters, offset=3, limit=20), rebuilt.browse(filters, offset=3, limit=20))
+
+    def test_counts_are_disjunctive_within_a_facet(self):
+        index = FacetIndex.build({
+            'A': {**random_record(random.Random(1)), 'category': 'Top', 'color_family': 'Red'},
+            'B': {**random_record(random.Random(1)), 'category': 'Bottom', 'color_family': 'Red'},
+            'C': {**random_record(random.Random(1)), 'category': 'Top', 'color_family': 'Black'},
+        })
+        item_ids, total, counts = index.browse({'category': ['Top']})
+        self.assertEqual((item_ids, total), (['A', 'C'], 2))
+        # Picking a category leaves the other categories' counts alone...
+        self.assertEqual(counts['category'], [('Top', 2), ('Bottom', 1)])
+        # ...and narrows the other facets
+        self.assertEqual(counts['color_family'], [('Black', 1), ('Red', 1)])
+
+
+def make_product(item_id, **fields):
+    return Product(**{
+        'item_id': item_id, 'item_name': 'Shirt', 'image_url': 'https://example.com/a.jpg', 'category': 'Top',
+        'color_name': 'Red', 'color_family': 'Red', 'season': 'Summer', 'fit': 'Slim', 'style': 'Classic',
+        'body_type': 'Pear', 'lifestyle': 'Office', 'utility': '', **fields,
+    })
+
+
+class CatalogChangesTests(TestCase):
+    def test_net_changes(self):
+        record_changes(1, inserted=['A', 'B', 'C'], updated=['D'])
+        record_changes(2, updated=['A', 'D'], deleted=['B', 'E'])
+        record_changes(3, inserted=['E'])
+        self.assertEqual(list(net_changes(0, 3)), [('A', 'insert'), ('C', 'insert'), ('D', 'update'), ('E', 'update')])
+        self.assertEqual(list(net_changes(1, 3)), [('A', 'update'), ('B', 'delete'), ('D', 'update'), ('E', 'update')])
+        self.assertEqual(list(net_changes(1, 2)), [('A', 'update'), ('B', 'delete'), ('D', 'update'), ('E', 'delete')])
+        self.assertEqual(list(net_changes(2, 3)), [('E', 'insert')])
+        self.assertEqual(list(net_changes(3, 3)), [])
+
+    def sync(self, since=None):
+        response = self.client.get('/api/catalog/changes/', {} if since is None else {'since': since})
+        self.assertEqual(response.status_code, 200)
+        return orjson.loads(b''.join(response.streaming_content))
+
+    def test_endpoint_streams_what_changed_since(self):
+        make_product('A').save()  # v1
+        product = make_product('B')
+        product.save()  # v2
+        product.item_name = 'Blouse'
+        product.save()  # v3
+        with collect_saves():  # v4
+            make_product('C').save()
+            make_product('D').save()
+        delete_products(Product.objects.filter(pk__in=['A', 'D']))  # v5
+
+        body = self.sync(since=1)
+        self.assertEqual((body['version'], body['reset']), (5, False))
+        self.assertEqual(
+            [(change['op'], change['item_id']) for change in body['changes']],
+            [('delete', 'A'), ('insert', 'B'), ('insert', 'C')],
+        )
+        self.assertEqual(body['changes'][1]['product']['item_name'], 'Blouse')
+        self.assertEqual(self.sync(since=5)['changes'], [])
+
+        full = self.sync()
+        self.assertTrue(full['reset'])
+        self.assertEqual([change['item_id'] for change in full['changes']], ['B', 'C'])
+
+    def test_deletes_outside_the_admin_are_logged(self):
+        for item_id in 'ABCDEF':
+            make_product(item_id).save()  # v1-v6
+        Product.objects.get(pk='A').delete()  # v7
+        Product.objects.filter(pk__in=['B', 'C']).delete()  # v8, v9
+        with collect_saves():  # v10
+            make_product('G').save()
+            product = Product.objects.get(pk='D')
+            product.item_name = 'Blouse'
+            product.save()
+            Product.objects.filter(pk__in=['D', 'G']).delete()
+            make_product('H').save()
+        self.assertEqual(delete_products(Product.objects.filter(pk__in=['E', 'F', 'X'])), 2)  # v11
+        self.assertEqual(delete_products(Product.objects.none()), 0)
+
+        body = self.sync(since=6)
+        self.assertEqual(body['version'], 11)
+        self.assertEqual(
+            [(change['op'], change['item_id']) for change in body['changes']],
+            [('delete', 'A'), ('delete', 'B'), ('delete', 'C'), ('delete', 'D'), ('delete', 'E'), ('delete', 'F'),
+             ('insert', 'H')],
+        )
+        self.assertEqual(sorted(CatalogChange.objects.filter(version=10).values_list('item_id', 'op')),
+                         [('D', 'delete'), ('H', 'insert')])
+
+    @override_settings(CATALOG_CHANGE_LOG_VERSIONS=2)
+    def test_clients_behind_the_log_get_a_snapshot(self):
+        for item_id in 'ABCD':
+            make_product(item_id).save()
+        self.assertTrue(self.sync(since=1)['reset'])
+        body = self.sync(since=2)
+        self.assertFalse(body['reset'])
+        self.assertEqual([change['item_id'] for change in body['changes']], ['C', 'D'])
+
+
+CSV_HEADERS = ['ID', 'Item Name', 'Image', 'Category', 'Colour Name', 'Colour Family', 'Colour_is_neutral', 'Season',
+               'Fit', 'Style', 'BodyType', 'Lifestyle', 'Utility']
+
+
+def csv_row(item_id, name='Shirt'):
+    return [item_id, name, 'Shirt (https://example.com/a.jpg)', 'Top', 'Red', 'Red', 'False', 'Summer', 'Slim',
+            'Classic', 'Pear', 'Office', '']
+
+
+class ImportProductsTests(TestCase):
+    def import_csv(self, rows):
+        path = os.path.join(tempfile.mkdtemp(), 'products.csv')
+        with open(path, 'w', newline='', encoding='utf-8') as file:
+            writer = csv.writer(file)
+            writer.writerow(CSV_HEADERS)
+            writer.writerows(rows)
+        stdout = io.StringIO()
+        call_command('import_products', path, upsert=True, batch_size=2, stdout=stdout)
+        return stdout.getvalue()
+
+    def changes(self, version):
+        return sorted(CatalogChange.objects.filter(version=version).values_list('item_id', 'op'))
+
+    def test_upsert_writes_only_what_changed(self):
+        output = self.import_csv([csv_row('A'), csv_row('B'), csv_row('C')])
+        self.assertIn('3 inserted, 0 updated, 0 deleted, 0 unchanged', output)
+        first = get_catalog_version(fresh=True)
+        self.assertEqual(self.changes(first), [('A', 'insert'), ('B', 'insert'), ('C', 'insert')])
+
+        # One row changed, one gone and one new, spread over several batches
+        output = self.import_csv([csv_row('A'), csv_row('D'), csv_row('B', 'Blouse')])
+        self.assertIn('1 inserted, 1 updated, 1 deleted, 1 unchanged', output)
+        second = get_catalog_version(fresh=True)
+        self.assertEqual(second, first + 1)
+        self.assertEqual(self.changes(second), [('B', 'update'), ('C', 'delete'), ('D', 'insert')])
+        self.assertEqual(
+            list(Product.objects.order_by('pk').values_list('item_id', 'item_name', 'image_url')),
+            [('A', 'Shirt', 'https://example.com/a.jpg'), ('B', 'Blouse', 'https://example.com/a.jpg'),
+             ('D', 'Shirt', 'https://example.com/a.jpg')],
+        )
+        self.assertEqual(Product.objects.get(pk='B').tags.filter(kind='style').count(), 1)
+
+        # Nothing changed: no new version
+        output = self.import_csv([csv_row('A'), csv_row('B', 'Blouse'), csv_row('D')])
+        self.assertIn('0 inserted, 0 updated, 0 deleted, 3 unchanged', output)
+        self.assertEqual(get_catalog_version(fresh=True), second)
@@ -0,0 +1,9 @@
+# backend/src/products/urls.py
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path('', views.browse, name='product-browse'),
+    path('search/', views.search, name='product-search'),
+    path('<str:item_id>/similar/', views.similar, name='product-similar'),
+]
@@ -0,0 +1,57 @@
+# backend/src/products/versioning.py
+"""
+The catalog version: a counter bumped whenever products are (re)imported.
+
+The authoritative value lives in the CatalogVersion row; every process keeps
+a copy in the default cache for CATALOG_VERSION_TTL seconds, so the hot path
+doesn't hit the database. With a shared cache backend (Redis) a bump is seen
+everywhere immediately; with the local-memory default other processes pick
+it up within the TTL.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+
+from .models import CatalogVersion
+
+CACHE_KEY = 'catalog:version'
+
+
+def get_catalog_version(fresh=False):
+    """
+    The current catalog version. Pass `fresh=True` to skip the cached copy and
+    read the database (e.g. from management commands).
+    """
+    version = None if fresh else cache.get(CACHE_KEY)
+    if version is None:
+        row = CatalogVersion.objects.filter(pk=1).values_list('version', flat=True).first()
+        version = row or 0
+        cache.set(CACHE_KEY, version, settings.CATALOG_VERSION_TTL)
+    return version
+
+
+async def aget_catalog_version(fresh=False):
+    """
+    Async version of get_catalog_version for async views.
+    """
+    version = None if fresh else await cache.aget(CACHE_KEY)
+    if version is None:
+        row = await CatalogVersion.objects.filter(pk=1).values_list('version', flat=True).afirst()
+        version = row or 0
+        await cache.aset(CACHE_KEY, version, settings.CATALOG_VERSION_TTL)
+    return version
+
+
+def bump_catalog_version():
+    """
+    Moves the catalog to a new version and returns it. Call this after every
+    change to the products table.
+    """
+    with transaction.atomic():
+        CatalogVersion.objects.get_or_create(pk=1)
+        CatalogVersion.objects.filter(pk=1).update(version=F('version') + 1)
+        version = CatalogVersion.objects.values_list('version', flat=True).get(pk=1)
+        # Only publish the new version once the catalog changes are visible
+        transaction.on_commit(lambda: cache.set(CACHE_KEY, version, settings.CATALOG_VERSION_TTL))
+    return version
@@ -1,3 +1,209 @@
-from django.shortcuts import render
+# backend/src/products/views.py
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from rest_framework.decorators import api_view, authentication_classes, permission_classes
+from rest_framework.exceptions import NotAuthenticated
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
 
-# Create your views here.
+from api.metrics import stage
+from recommender_project.routers import replica_reads
+from users.authentication import CachedJWTAuthentication
+from users.models import UserProfile
+from .catalog_index import get_catalog_index
+from .changes import log_window, net_changes, render_change, snapshot, with_payloads
+from .facets import FACETS, get_facet_index
+from .models import ProductNeighbors
+from .search import get_search_backend
+
+# ?kind= -> ProductNeighbors column
+NEIGHBOR_KINDS = {'similar': 'similar', 'complete': 'complements'}
+
+
+def _int_param(request, name, default, minimum, maximum):
+    """
+    A bounded integer query parameter; raises ValueError if it isn't one.
+    """
+    try:
+        value = int(request.query_params.get(name, default))
+    except ValueError:
+        raise ValueError(f"{name} must be a whole number.") from None
+    if not minimum <= value <= maximum:
+        raise ValueError(f"{name} must be between {minimum} and {maximum}.")
+    return value
+
+
+@replica_reads()
+@api_view(['GET'])
+@authentication_classes([]) # The catalog is public, so skip token parsing entirely
+@permission_classes([AllowAny])
+def search(request):
+    """
+    Full-text search over the catalog: /api/products/search/?q=black+dress.
+    Returns the matching products, best first, in the same shape as the
+    recommendations. Page with `limit` and `offset`.
+    """
+    query = request.query_params.get('q', '').strip()
+    if not query:
+        return Response({"error": "Pass a search query as ?q=..."}, status=400)
+    try:
+        limit = _int_param(request, 'limit', 20, 1, settings.PRODUCT_SEARCH_MAX_LIMIT)
+        offset = _int_param(request, 'offset', 0, 0, settings.PRODUCT_SEARCH_MAX_OFFSET)
+    except ValueError as e:
+        return Response({"error": str(e)}, status=400)
+
+    with stage('search'):
+        item_ids = get_search_backend().search(query, limit=limit, offset=offset)
+    return Response(_fragments(item_ids))
+
+
+def _fragments(item_ids):
+    index = get_catalog_index()
+    positions = index.positions_by_id
+    # Skips anything newer than this process's copy of the catalog
+    return [index.fragment(positions[item_id]) for item_id in item_ids if item_id in positions]
+
+
+@replica_reads()
+@api_view(['GET'])
+@authentication_classes([])
+@permission_classes([AllowAny])
+def browse(request):
+    """
+    Browses the catalog by facet: /api/products/?category=Top&style=Classic,Edgy.
+    Values of one facet are ORed, facets are ANDed. Returns a page of the
+    matching products plus, for every facet, how many products each value
+    would match given the other facets' filters.
+    """
+    try:
+        limit = _int_param(request, 'limit', 40, 1, settings.PRODUCT_BROWSE_MAX_LIMIT)
+        offset = _int_param(request, 'offset', 0, 0, 10**9)
+    except ValueError as e:
+        return Response({"error": str(e)}, status=400)
+
+    filters = {}
+    for facet in FACETS:
+        values = [value.strip() for raw in request.query_params.getlist(facet) for value in raw.split(',')]
+        if any(values):
+            filters[facet] = [value for value in values if value]
+
+    with stage('facets'):
+        item_ids, count, facets = get_facet_index().browse(filters, offset=offset, limit=limit)
+    return Response({
+        "count": count,
+        "results": _fragments(item_ids),
+        "facets": {
+            facet: [{"value": value, "count": value_count} for value, value_count in values]
+            for facet, values in facets.items()
+        },
+    })
+
+
+@replica_reads()
+@api_view(['GET'])
+@authentication_classes([CachedJWTAuthentication]) # Only needed for body_type=mine
+@permission_classes([AllowAny])
+def similar(request, item_id):
+    """
+    Precomputed neighbors of a product (see products/neighbors.py):
+    /api/products/<item_id>/similar/ for similar items in the same category,
+    ?kind=complete for items from other categories that complete the look.
+    ?body_type=Hourglass,Pear keeps only items for those body types, and
+    body_type=mine uses the logged-in user's.
+    """
+    kind = request.query_params.get('kind', 'similar')
+    if kind not in NEIGHBOR_KINDS:
+        return Response({"error": f"kind must be one of: {', '.join(NEIGHBOR_KINDS)}."}, status=400)
+    try:
+        limit = _int_param(request, 'limit', 12, 1, settings.PRODUCT_NEIGHBORS)
+    except ValueError as e:
+        return Response({"error": str(e)}, status=400)
+
+    body_type = request.query_params.get('body_type', '').strip()
+    if body_type == 'mine':
+        if not request.user.is_authenticated:
+            raise NotAuthenticated()
+        try:
+            profile = request.user.profile
+        except UserProfile.DoesNotExist:
+            return Response({"error": "User profile not found. Please complete the quiz first."}, status=404)
+        body_types = [t for t in (profile.primary_body_type, profile.secondary_body_type) if t]
+    else:
+        body_types = [value.strip() for value in body_type.split(',') if value.strip()]
+
+    index = get_catalog_index()
+    positions = index.positions_by_id
+    if item_id not in positions:
+        return Response({"error": "Product not found."}, status=404)
+
+    with stage('neighbors'):
+        neighbor_ids = (
+            ProductNeighbors.objects.filter(product_id=item_id)
+            .values_list(NEIGHBOR_KINDS[kind], flat=True).first()
+        ) or []  # Not computed yet for a brand new product
+    if body_types:
+        allowed = index.to_mask(index.any_of('body_type', body_types))
+        neighbor_ids = [i for i in neighbor_ids if i in positions and allowed[positions[i]]]
+    return Response(_fragments(neighbor_ids[:limit]))
+
+
+@api_view(['GET'])
+@authentication_classes([])
+@permission_classes([AllowAny])
+def catalog_changes(request):
+    """
+    Delta sync for local copies of the catalog: /api/catalog/changes/?since=<version>.
+    Streams {"version": ..., "since": ..., "reset": false, "changes": [...]}
+    with one {"op": "insert" | "update" | "delete", "item_id": ...,
+    "product": {...}} entry per product changed after `since`. When the
+    change log doesn't reach back that far (or `since` is left out) the
+    response is the whole catalog as inserts with "reset": true, and the
+    client should replace its copy. Either way, store "version" and pass it
+    as `since` next time.
+    """
+    since = None
+    if 'since' in request.query_params:
+        try:
+            since = _int_param(request, 'since', 0, 0, 2**63 - 1)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=400)
+
+    version, changes_since = log_window()
+    if since is not None and since > version:
+        return Response({"error": f"since is ahead of the catalog, which is at version {version}."}, status=400)
+
+    reset = since is None or since < changes_since
+    entries = snapshot() if reset else with_payloads(net_changes(since, version))
+    body = _stream_changes(version, since, reset, entries)
+    if isinstance(request._request, ASGIRequest):
+        # Under ASGI, Django reads a sync iterator into a list before sending anything
+        body = _in_thread(body)
+    return StreamingHttpResponse(body, content_type='application/json')
+
+
+def _stream_changes(version, since, reset, entries, chunk_size=500):
+    yield b'{"version":%d,"since":%s,"reset":%s,"changes":[' % (
+        version, b'null' if since is None else b'%d' % since, b'true' if reset else b'false',
+    )
+    separator = b''
+    chunk = []
+    for entry in entries:
+        chunk.append(render_change(*entry))
+        if len(chunk) == chunk_size:
+            yield separator + b','.join(chunk)
+            separator, chunk = b',', []
+    if chunk:
+        yield separator + b','.join(chunk)
+    yield b']}'
+
+
+async def _in_thread(chunks):
+    """
+    Async iterator over a sync generator of chunks, each one produced in the
+    sync thread, so its queries stay on one connection.
+    """
+    next_chunk = sync_to_async(next)
+    while (chunk := await next_chunk(chunks, None)) is not None:
+        yield chunk
\ No newline at end of file
@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class QuizConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'quiz'
+
+    def ready(self):
+        # Compile the scoring rules at startup, so a broken rule file fails fast
+        from .rules import get_rules
+        get_rules()
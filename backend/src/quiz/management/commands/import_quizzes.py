@@ -0,0 +1,56 @@
+# backend/src/quiz/management/commands/import_quizzes.py
+import json
+import time
+from itertools import islice
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from quiz.services import process_quiz_batch
+
+class Command(BaseCommand):
+    help = 'Import completed quizzes from a JSON Lines file of {"email": ..., "quiz": {...}} objects'
+
+    def add_arguments(self, parser):
+        parser.add_argument('jsonl_file', type=str, help='The JSON Lines file to import.')
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Quizzes saved per batch.')
+        parser.add_argument(
+            '--recompute', action='store_true',
+            help='Regenerate the capsules of every updated profile afterwards (runs generate_recommendations).',
+        )
+
+    def handle(self, *args, **options):
+        started_at = timezone.now()
+        started = time.perf_counter()
+        counts = {'updated': 0, 'unchanged': 0, 'error': 0}
+
+        with open(options['jsonl_file'], 'r', encoding='utf-8') as file:
+            lines = ((number, line) for number, line in enumerate(file, start=1) if line.strip())
+            while True:
+                chunk = list(islice(lines, options['chunk_size']))
+                if not chunk:
+                    break
+
+                items = []
+                for number, line in chunk:
+                    try:
+                        items.append(json.loads(line))
+                    except ValueError as e:
+                        # Keep the slot so result indexes still line up with the chunk
+                        items.append(None)
+                        self.stderr.write(f'Line {number}: invalid JSON ({e}).')
+
+                for (number, _), item, result in zip(chunk, items, process_quiz_batch(items)):
+                    counts[result['status']] += 1
+                    if result['status'] == 'error' and item is not None:
+                        self.stderr.write(f"Line {number}: {'; '.join(result['errors'])}")
+                self.stdout.write(f"{sum(counts.values())} quizzes processed.")
+
+        self.stdout.write(self.style.SUCCESS(
+            'Imported quizzes in {elapsed:.1f}s: {updated} updated, {unchanged} unchanged, {error} errors.'.format(
+                elapsed=time.perf_counter() - started, **counts
+            )
+        ))
+        if options['recompute'] and counts['updated']:
+            call_command('generate_recommendations', since=started_at.isoformat(), stdout=self.stdout)
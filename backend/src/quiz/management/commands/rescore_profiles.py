@@ -0,0 +1,159 @@
+# backend/src/quiz/management/commands/rescore_profiles.py
+import os
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from products.versioning import get_catalog_version
+from quiz import rescoring
+from quiz.rules import get_rules
+from recommendations.cache import discard_many_recommendations, version_from_timestamp
+from recommender_project.db import close_pools
+from recommender_project.routers import replica_reads
+from users.cache import forget_users
+from users.models import UserProfile
+
+class Command(BaseCommand):
+    help = ('Re-score the stored quiz answers of every profile scored with older rules than the current ones, '
+            'using a process pool')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Worker processes (0 scores in this process).')
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Profiles per worker task.')
+        parser.add_argument('--max-rate', type=float, default=2000,
+                            help='Most profiles written per second, to spare the primary (0 for no limit).')
+        parser.add_argument(
+            '--recompute', action='store_true',
+            help='Regenerate the capsules of every updated profile afterwards (runs generate_recommendations).',
+        )
+
+    def handle(self, *args, **options):
+        # One set of rules for the whole run, even if the file changes meanwhile
+        rules = get_rules()
+        started_at = timezone.now()
+        started = time.perf_counter()
+        counts = {'updated': 0, 'unchanged': 0, 'skipped': 0, 'error': 0}
+
+        # Every profile written is marked with the rules version, so an
+        # interrupted run picks up where it stopped when started again
+        chunks = self._profile_chunks(rules.version, options['chunk_size'])
+        next_chunk_at = time.monotonic()
+        for chunk, results in self._rescore(chunks, rules, options['workers']):
+            self._write(chunk, results, rules.version, counts)
+            self.stdout.write(f'{sum(counts.values())} profiles done (up to user {chunk[-1][0]}).')
+            if options['max_rate'] > 0:
+                next_chunk_at += len(chunk) / options['max_rate']
+                time.sleep(max(0.0, next_chunk_at - time.monotonic()))
+                next_chunk_at = max(next_chunk_at, time.monotonic())
+
+        self.stdout.write(self.style.SUCCESS(
+            'Re-scored profiles with rules v{version} in {elapsed:.1f}s: {updated} updated, {unchanged} unchanged, '
+            '{skipped} retaken meanwhile, {error} unscorable.'.format(
+                version=rules.version, elapsed=time.perf_counter() - started, **counts
+            )
+        ))
+        without_answers = UserProfile.objects.filter(quiz_answers__isnull=True, top_three_styles__isnull=False).count()
+        if without_answers:
+            self.stdout.write(f'{without_answers} profiles were scored before answers were stored and kept their scores.')
+        if options['recompute'] and counts['updated']:
+            call_command('generate_recommendations', since=started_at.isoformat(), stdout=self.stdout)
+
+    def _profile_chunks(self, version, chunk_size):
+        """
+        Streams the profiles still to re-score in id order with keyset
+        pagination, read from a replica when there is one: _write checks
+        each row against the primary before using it.
+        """
+        queryset = (
+            UserProfile.objects.filter(quiz_answers__isnull=False)
+            .filter(Q(scoring_version__isnull=True) | Q(scoring_version__lt=version))
+            .order_by('user_id')
+        )
+        last_user_id = 0
+        while True:
+            with replica_reads():
+                chunk = list(queryset.filter(user_id__gt=last_user_id).values_list(*rescoring.PROFILE_FIELDS)[:chunk_size])
+            if not chunk:
+                return
+            last_user_id = chunk[-1][0]
+            yield chunk
+
+    def _rescore(self, chunks, rules, workers):
+        """
+        Yields (chunk, results) per chunk, in order.
+        """
+        # Workers get the answers and current scores, not the row's updated_at
+        tasks = ((chunk, [(row[0], bytes(row[2]), *row[3:]) for row in chunk]) for chunk in chunks)
+        if workers <= 0:
+            rescoring.use_rules(rules)
+            for chunk, rows in tasks:
+                yield chunk, rescoring.rescore(rows)
+            return
+
+        # Forked workers must not share the parent's database connections or pools
+        close_pools()
+        with ProcessPoolExecutor(max_workers=workers, initializer=rescoring.init_worker,
+                                 initargs=(rules,)) as executor:
+            in_flight = deque()
+            for chunk, rows in tasks:
+                in_flight.append((chunk, executor.submit(rescoring.rescore, rows)))
+                # Keep a bounded number of chunks queued so memory stays flat
+                if len(in_flight) >= workers * 2:
+                    chunk, future = in_flight.popleft()
+                    yield chunk, future.result()
+            while in_flight:
+                chunk, future = in_flight.popleft()
+                yield chunk, future.result()
+
+    def _write(self, chunk, results, version, counts):
+        """
+        Saves a chunk's new scores, only the fields that changed, and marks
+        every re-scored profile with the rules version.
+        """
+        scored_answers = {row[0]: bytes(row[2]) for row in chunk}
+        now = timezone.now()
+        by_fields = defaultdict(list)
+        unchanged = []
+        superseded = []
+        with transaction.atomic():
+            # Lock the rows; anyone who retook the quiz since the chunk was read keeps their new scores
+            current = {
+                user_id: (answers, updated_at)
+                for user_id, answers, updated_at in UserProfile.objects.select_for_update()
+                .filter(pk__in=list(scored_answers)).values_list('user_id', 'quiz_answers', 'updated_at')
+            }
+            for user_id, changed in results:
+                if changed is None:
+                    counts['error'] += 1
+                    continue
+                answers, updated_at = current.get(user_id, (None, None))
+                if answers is None or bytes(answers) != scored_answers[user_id]:
+                    counts['skipped'] += 1
+                    continue
+                if not changed:
+                    unchanged.append(user_id)
+                    continue
+                # Unlike a quiz batch, these instances only hold the changed fields, so never write the union
+                profile = UserProfile(user_id=user_id, updated_at=now, scoring_version=version, **changed)
+                by_fields[tuple(sorted(changed))].append(profile)
+                superseded.append((user_id, version_from_timestamp(updated_at)))
+
+            for fields, group in by_fields.items():
+                UserProfile.objects.bulk_update(group, [*fields, 'updated_at', 'scoring_version'], batch_size=1000)
+            if unchanged:
+                UserProfile.objects.filter(pk__in=unchanged).update(scoring_version=version)
+            # bulk_update sends no post_save, so drop the cached copies ourselves
+            written = unchanged + [user_id for user_id, _ in superseded]
+            transaction.on_commit(lambda: forget_users(written))
+
+        if superseded:
+            discard_many_recommendations(superseded, get_catalog_version())
+        counts['updated'] += len(superseded)
+        counts['unchanged'] += len(unchanged)
@@ -0,0 +1,62 @@
+# backend/src/quiz/rescoring.py
+"""
+Process-pool helpers for re-scoring stored quiz answers in bulk
+(see `manage.py rescore_profiles`).
+
+Like recommendations/bulk.py, workers never touch the database: the parent
+streams (user_id, stored answers, current scored values) rows and writes the
+results, and each worker scores with the one set of rules it was started
+with, so a rules file edited mid-run can't mix two versions.
+"""
+from .answers import decode_answers
+from .services import QUIZ_PROFILE_FIELDS, QuizValidationError, score_quiz
+
+# What the parent reads per profile: the row, its answers and what they scored last time
+PROFILE_FIELDS = ('user_id', 'updated_at', 'quiz_answers', *QUIZ_PROFILE_FIELDS)
+
+_worker_rules = None
+
+
+def use_rules(rules):
+    """
+    Sets the compiled rules rescore scores with.
+    """
+    global _worker_rules
+    _worker_rules = rules
+
+
+def init_worker(rules):
+    """
+    Pool initializer: sets Django up (for spawn-based pools), drops the
+    database connections a forked worker inherits, and keeps the compiled
+    rules for the lifetime of the worker.
+    """
+    import django
+    from django.apps import apps
+    if not apps.ready:
+        django.setup()
+
+    from recommender_project.db import drop_inherited_connections
+
+    drop_inherited_connections()
+    use_rules(rules)
+
+
+def rescore(rows):
+    """
+    Re-scores a chunk of (user_id, answers, *current QUIZ_PROFILE_FIELDS)
+    tuples. Returns a list of (user_id, changed) per row, where changed is
+    {field: new value} for the scored fields that differ (empty when none
+    do), or None when the stored answers can't be scored any more.
+    """
+    results = []
+    for user_id, answers, *current in rows:
+        try:
+            values = score_quiz(decode_answers(answers), _worker_rules)
+        except (ValueError, QuizValidationError):
+            results.append((user_id, None))
+            continue
+        results.append((user_id, {
+            field: values[field] for field, old in zip(QUIZ_PROFILE_FIELDS, current) if values[field] != old
+        }))
+    return results
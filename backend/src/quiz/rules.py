@@ -0,0 +1,194 @@
+# backend/src/quiz/rules.py
+"""
+The quiz scoring rules: how answers turn into wardrobe percentages and
+style scores, read from a versioned JSON file (settings.QUIZ_RULES_PATH,
+quiz/scoring_rules.json by default) so a new question is a data change:
+
+    {
+      "version": 2,
+      "percentages": {"workwear": 0.7},     # what every profile starts with
+      "questions": {                        # quiz key -> answer -> effects
+        "seasonality_answer": {
+          "always": {"percentages": {"winter_wear": 0.75}, "scores": {"Classic": 0.5}}
+        }
+      },
+      "style_selections": {"weights": [1.0, 0.5]},
+      "top_styles": 3
+    }
+
+An answer sets the percentages it lists (over the starting ones) and adds
+its score deltas to those styles. Every entry of the quiz's
+`style_selections` is a list of style names, one per weight, and each pick
+adds its position's weight. Questions apply in file order, then the
+selections; the `top_styles` best scores, earliest first on ties, become
+top_three_styles.
+
+Compiling the file flattens every question into one dict of answer ->
+(percentages, score deltas) tuples, so scoring a quiz is a lookup per
+question plus the selections, with no branching on the answers.
+
+get_rules() compiles the file on first use and again whenever it changes
+on disk (checked at most every QUIZ_RULES_CHECK_INTERVAL seconds). A
+changed file that doesn't compile is logged and the rules in force stay.
+"""
+import json
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class RulesError(ValueError):
+    pass
+
+
+def _number_map(value, where):
+    if not isinstance(value, dict) or not all(
+        isinstance(key, str) and isinstance(number, (int, float)) and not isinstance(number, bool)
+        for key, number in value.items()
+    ):
+        raise RulesError(f'{where} must map names to numbers.')
+    return {key: float(number) for key, number in value.items()}
+
+
+class ScoringRules:
+    def __init__(self, spec):
+        """
+        Compiles a parsed rule file; raises RulesError if it is malformed.
+        """
+        if not isinstance(spec, dict):
+            raise RulesError('The rules must be an object.')
+        self.version = spec.get('version')
+        if not isinstance(self.version, int) or isinstance(self.version, bool) or self.version < 1:
+            raise RulesError('version must be a positive integer.')
+
+        self.percentages = _number_map(spec.get('percentages', {}), 'percentages')
+        questions = spec.get('questions', {})
+        if not isinstance(questions, dict) or not all(isinstance(answers, dict) for answers in questions.values()):
+            raise RulesError('questions must map quiz keys to {answer: effects} objects.')
+
+        # answer -> (percentage items, score items), per question
+        self.questions = {}
+        for question, answers in questions.items():
+            table = {}
+            for answer, effects in answers.items():
+                where = f'questions.{question}.{answer}'
+                if not isinstance(effects, dict) or set(effects) - {'percentages', 'scores'}:
+                    raise RulesError(f'{where} may only set "percentages" and "scores".')
+                table[answer] = (
+                    tuple(_number_map(effects.get('percentages', {}), f'{where}.percentages').items()),
+                    tuple(_number_map(effects.get('scores', {}), f'{where}.scores').items()),
+                )
+            self.questions[question] = table
+
+        selections = spec.get('style_selections', {})
+        weights = selections.get('weights') if isinstance(selections, dict) else None
+        if not isinstance(weights, list) or not weights or not all(
+            isinstance(weight, (int, float)) and not isinstance(weight, bool) for weight in weights
+        ):
+            raise RulesError('style_selections.weights must be a non-empty list of numbers.')
+        self.selection_weights = tuple(float(weight) for weight in weights)
+
+        self.top_styles = spec.get('top_styles', 3)
+        if not isinstance(self.top_styles, int) or isinstance(self.top_styles, bool) or self.top_styles < 0:
+            raise RulesError('top_styles must be a non-negative integer.')
+
+
+    def answer_errors(self, quiz_data):
+        """
+        The validation problems with the answers to the rules' questions.
+        """
+        return [
+            f'{question} must be a string.'
+            for question in self.questions
+            if quiz_data.get(question) is not None and not isinstance(quiz_data[question], str)
+        ]
+
+    def score(self, quiz_data):
+        """
+        (wardrobe percentages, style scores) for one validated quiz.
+        """
+        percentages = dict(self.percentages)
+        scores = {}
+        for question, table in self.questions.items():
+            effects = table.get(quiz_data.get(question))
+            if effects is None:
+                continue
+            percentages.update(effects[0])
+            for style, delta in effects[1]:
+                scores[style] = scores.get(style, 0.0) + delta
+
+        size = len(self.selection_weights)
+        for selection in quiz_data.get('style_selections', []):
+            if isinstance(selection, list) and len(selection) == size:
+                for style, weight in zip(selection, self.selection_weights):
+                    if style:
+                        scores[style] = scores.get(style, 0.0) + weight
+        return percentages, scores
+
+    def top(self, scores):
+        """
+        The `top_styles` best styles of a score dict, earliest first on ties.
+        """
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        return [style for style, _ in ranked[:self.top_styles]]
+
+
+def load_rules(path):
+    with open(path, 'rb') as file:
+        try:
+            spec = json.loads(file.read())
+        except ValueError as e:
+            raise RulesError(f'Not valid JSON: {e}') from e
+    return ScoringRules(spec)
+
+
+_rules = None
+_signature = None  # (path, mtime_ns, size) of the file _rules came from
+_checked_at = 0.0
+_lock = threading.Lock()
+
+
+def _file_signature(path):
+    stat = os.stat(path)
+    return path, stat.st_mtime_ns, stat.st_size
+
+
+def get_rules():
+    """
+    The compiled scoring rules, recompiled when the file has changed.
+    """
+    global _rules, _signature, _checked_at
+    now = time.monotonic()
+    if _rules is not None and now - _checked_at < settings.QUIZ_RULES_CHECK_INTERVAL:
+        return _rules
+    with _lock:
+        if _rules is not None and now - _checked_at < settings.QUIZ_RULES_CHECK_INTERVAL:
+            return _rules
+        path = str(settings.QUIZ_RULES_PATH)
+        try:
+            signature = _file_signature(path)
+        except OSError:
+            if _rules is None:
+                raise
+            logger.error("Keeping quiz scoring rules v%s: %s is gone.", _rules.version, path)
+            signature = _signature
+        if signature != _signature:
+            try:
+                rules = load_rules(path)
+            except (OSError, RulesError) as e:
+                if _rules is None:
+                    raise
+                # Logged once per change of the file, not on every check
+                logger.error("Keeping quiz scoring rules v%s: %s does not load (%s).", _rules.version, path, e)
+            else:
+                if _rules is not None:
+                    logger.info("Reloaded quiz scoring rules v%s from %s.", rules.version, path)
+                _rules = rules
+            _signature = signature
+        _checked_at = now
+        return _rules
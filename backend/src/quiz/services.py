@@ -1,7 +1,136 @@
 # backend/src/quiz/services.py
-from users.models import UserProfile
+import logging
 from collections import defaultdict
-import json
+
+from django.db import transaction
+from django.utils import timezone
+
+from users.cache import forget_users
+from users.models import UserAccount, UserProfile
+from products.versioning import aget_catalog_version, get_catalog_version
+from recommendations.cache import (
+    adiscard_recommendations, discard_many_recommendations, discard_recommendations, profile_version,
+)
+from recommender_project.routers import apin_to_primary, pin_to_primary
+from .answers import encode_answers
+from .rules import get_rules
+
+logger = logging.getLogger(__name__)
+
+# The UserProfile fields a quiz fills in
+QUIZ_PROFILE_FIELDS = (
+    'primary_body_type', 'secondary_body_type', 'weekday_lifestyle', 'weekend_lifestyle',
+    'wardrobe_percentages', 'style_scores', 'top_three_styles',
+)
+
+
+class QuizValidationError(ValueError):
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__('; '.join(errors))
+
+
+def validate_quiz(quiz_data, rules=None):
+    """
+    Checks a quiz payload is shaped the way the scoring expects and returns a
+    list of problems (empty when it's fine). Malformed style selections are
+    skipped by the scoring, as before, so they aren't an error here.
+    """
+    if not isinstance(quiz_data, dict):
+        return ['Quiz data must be an object.']
+    rules = rules or get_rules()
+
+    errors = []
+    for key in ('primary_body_type', 'secondary_body_type', 'weekday_lifestyle'):
+        value = quiz_data.get(key)
+        if value is not None and not isinstance(value, str):
+            errors.append(f'{key} must be a string.')
+        elif value and len(value) > UserProfile._meta.get_field(key).max_length:
+            errors.append(f'{key} is too long.')
+
+    weekend = quiz_data.get('weekend_lifestyle', [])
+    if not isinstance(weekend, list) or not all(isinstance(style, str) for style in weekend):
+        errors.append('weekend_lifestyle must be a list of strings.')
+    elif len(','.join(weekend)) > UserProfile._meta.get_field('weekend_lifestyle').max_length:
+        errors.append('weekend_lifestyle is too long.')
+
+    selections = quiz_data.get('style_selections', [])
+    if not isinstance(selections, list):
+        errors.append('style_selections must be a list.')
+    elif any(
+        isinstance(selection, list) and len(selection) == 2
+        and not all(style is None or isinstance(style, str) for style in selection)
+        for selection in selections
+    ):
+        errors.append('style_selections must contain pairs of style names.')
+    errors.extend(rules.answer_errors(quiz_data))
+    return errors
+
+
+def score_quiz(quiz_data, rules=None):
+    """
+    Turns a quiz payload into the UserProfile field values it implies, using
+    the scoring rules (see quiz/rules.py). Pure: no database access, so it
+    can score any number of quizzes in memory. Raises QuizValidationError
+    for payloads we can't score.
+    """
+    rules = rules or get_rules()
+    errors = validate_quiz(quiz_data, rules)
+    if errors:
+        raise QuizValidationError(errors)
+
+    values = {}
+    _score_body_and_lifestyle(quiz_data, values)
+    _set_scores(values, *rules.score(quiz_data), rules)
+    return values
+
+
+def _score_body_and_lifestyle(quiz_data, values):
+    # Assumes quiz_data contains keys like 'primary_body_type', 'weekday_lifestyle', etc.
+    values['primary_body_type'] = quiz_data.get('primary_body_type')
+    values['secondary_body_type'] = quiz_data.get('secondary_body_type')
+    values['weekday_lifestyle'] = quiz_data.get('weekday_lifestyle')
+
+    # Assuming weekend lifestyle is a list of strings in the quiz data
+    weekend_styles = quiz_data.get('weekend_lifestyle', [])
+    values['weekend_lifestyle'] = ",".join(weekend_styles)
+
+
+def _set_scores(values, percentages, scores, rules):
+    values['wardrobe_percentages'] = percentages
+    values['style_scores'] = scores
+    values['top_three_styles'] = ",".join(rules.top(scores))
+
+
+def apply_scores(profile, values):
+    """
+    Sets the scored values on `profile` and returns the names of the fields
+    that actually changed.
+    """
+    changed = []
+    for field, value in values.items():
+        if getattr(profile, field) != value:
+            setattr(profile, field, value)
+            changed.append(field)
+    return changed
+
+
+def store_answers(profile, quiz_data, rules):
+    """
+    Keeps the raw answers and the rules version on `profile` for re-scoring
+    and returns the names of the fields that changed. These don't move the
+    profile version: the capsule only depends on the scored fields.
+    """
+    stored = []
+    answers = encode_answers(quiz_data)
+    if profile.quiz_answers is None or bytes(profile.quiz_answers) != answers:
+        profile.quiz_answers = answers
+        stored.append('quiz_answers')
+    if profile.scoring_version != rules.version:
+        profile.scoring_version = rules.version
+        stored.append('scoring_version')
+    return stored
+
 
 class QuizProcessor:
     def __init__(self, user, quiz_data):
@@ -11,61 +140,137 @@ class QuizProcessor:
         self.profile, _ = UserProfile.objects.get_or_create(user=self.user)
 
     def process_and_save(self):
-        self._process_body_and_lifestyle()
-        self._calculate_wardrobe_percentages()
-        self._calculate_style_scores()
-        self.profile.save()
-        print(f"Profile for {self.user.email} has been updated successfully.")
-
-
-    def _process_body_and_lifestyle(self):
-        # Assumes quiz_data contains keys like 'primary_body_type', 'weekday_lifestyle', etc.
-        self.profile.primary_body_type = self.quiz_data.get('primary_body_type')
-        self.profile.secondary_body_type = self.quiz_data.get('secondary_body_type')
-        self.profile.weekday_lifestyle = self.quiz_data.get('weekday_lifestyle')
-        
-        # Assuming weekend lifestyle is a list of strings in the quiz data
-        weekend_styles = self.quiz_data.get('weekend_lifestyle', [])
-        self.profile.weekend_lifestyle = ",".join(weekend_styles)
-
-
-    def _calculate_wardrobe_percentages(self):
-        # This will map the answers from the flowchart to percentages.
-        # This is a placeholder; we'll need the exact question/answer format from the frontend.
-        percentages = {}
-        
-        # Example logic based on the flowchart
-        season_answer = self.quiz_data.get('seasonality_answer') # e.g., '3-months'
-        if season_answer == 'always':
-            percentages['winter_wear'] = 0.75
-        elif season_answer == '3-months':
-            percentages['winter_wear'] = 0.5
-        # ... and so on for all options
-
-        # We would repeat this for workwear, dresses, and utility
-        percentages['workwear'] = 0.7 # Placeholder
-        percentages['dresses'] = 0.5 # Placeholder
-        percentages['statement'] = 0.3 # Placeholder
-
-        self.profile.wardrobe_percentages = percentages
-
-
-    def _calculate_style_scores(self):
-        scores = defaultdict(float)
-        style_selections = self.quiz_data.get('style_selections', [])
-        
-        for selection in style_selections:
-            # Ensure the selection is a list/tuple with exactly two items
-            if isinstance(selection, list) and len(selection) == 2:
-                primary_style, secondary_style = selection
-                if primary_style:
-                    scores[primary_style] += 1.0
-                if secondary_style:
-                    scores[secondary_style] += 0.5
-
-        self.profile.style_scores = dict(scores)
-        
-        sorted_styles = sorted(scores.items(), key=lambda item: item[1], reverse=True)
-        top_styles = [style for style, score in sorted_styles[:3]]
-        
-        self.profile.top_three_styles = ",".join(top_styles)
\ No newline at end of file
+        rules = get_rules()
+        values = score_quiz(self.quiz_data, rules)
+        previous_version = profile_version(self.profile)
+        changed = apply_scores(self.profile, values)
+        stored = store_answers(self.profile, self.quiz_data, rules)
+        if not changed:
+            # Same scores as last time: the profile and its capsule are still current
+            if stored:
+                self.profile.save(update_fields=stored)
+            logger.info("Profile for %s is unchanged.", self.user.email)
+            return changed
+
+        # auto_now bumps updated_at, i.e. the profile version
+        self.profile.save(update_fields=changed + stored + ['updated_at'])
+        # Until the replicas have this profile, the user's reads stay on the primary
+        pin_to_primary([self.user.pk])
+        # The old capsule can never be served again; free its cache slot now
+        discard_recommendations(self.user.pk, previous_version, get_catalog_version())
+        logger.info("Profile for %s has been updated successfully.", self.user.email)
+        return changed
+
+
+async def aprocess_quiz(user, quiz_data):
+    """
+    Async version of QuizProcessor.process_and_save for async views. Returns
+    the names of the profile fields that changed.
+    """
+    rules = get_rules()
+    values = score_quiz(quiz_data, rules)
+    profile, _ = await UserProfile.objects.aget_or_create(user=user)
+    previous_version = profile_version(profile)
+    changed = apply_scores(profile, values)
+    stored = store_answers(profile, quiz_data, rules)
+    if not changed:
+        if stored:
+            await profile.asave(update_fields=stored)
+        logger.info("Profile for %s is unchanged.", user.email)
+        return changed
+
+    await profile.asave(update_fields=changed + stored + ['updated_at'])
+    await apin_to_primary([user.pk])
+    await adiscard_recommendations(user.pk, previous_version, await aget_catalog_version())
+    logger.info("Profile for %s has been updated successfully.", user.email)
+    return changed
+
+
+def process_quiz_batch(items):
+    """
+    Scores and saves many completed quizzes at once. `items` is a list of
+    {"email": ..., "quiz": {...}} dicts; returns one result dict per item, in
+    order, with a status of "updated", "unchanged" or "error".
+
+    Validation and scoring happen in memory; the users and their profiles are
+    each fetched with a single query, and the changed profiles are written with
+    bulk_update grouped by which fields changed, so only those columns are
+    touched. Every quiz's raw answers are stored with it, for re-scoring.
+    The batch is saved in one transaction. Capsules are not rebuilt here:
+    they are generated on the user's next visit, or ahead of time with
+    `manage.py generate_recommendations --since`.
+    """
+    rules = get_rules()  # One set of rules for the whole batch, even if the file changes meanwhile
+    results = []
+    scored = {}  # email -> (index, quiz, values); later items for the same email win
+    for index, item in enumerate(items):
+        email = item.get('email') if isinstance(item, dict) else None
+        result = {'index': index, 'email': email}
+        results.append(result)
+        if not isinstance(email, str) or not email:
+            result.update(status='error', errors=['email is required.'])
+            continue
+        try:
+            values = score_quiz(item.get('quiz'), rules)
+        except QuizValidationError as e:
+            result.update(status='error', errors=e.errors)
+            continue
+        email = UserAccount.objects.normalize_email(email)
+        if email in scored:
+            previous = results[scored[email][0]]
+            previous.update(status='error', errors=['Superseded by a later item for the same user.'])
+        scored[email] = (index, item['quiz'], values)
+
+    if not scored:
+        return results
+
+    user_ids = dict(UserAccount.objects.filter(email__in=list(scored)).values_list('email', 'pk'))
+    for email, (index, _, _) in scored.items():
+        if email not in user_ids:
+            results[index].update(status='error', errors=['No user with this email.'])
+
+    with transaction.atomic():
+        profiles = UserProfile.objects.in_bulk(list(user_ids.values()))
+        missing = [UserProfile(user_id=pk) for pk in user_ids.values() if pk not in profiles]
+        if missing:
+            # Users created before profiles were auto-created by the signal
+            UserProfile.objects.bulk_create(missing, ignore_conflicts=True)
+            profiles.update(UserProfile.objects.in_bulk([profile.user_id for profile in missing]))
+
+        now = timezone.now()
+        by_fields = defaultdict(list)
+        superseded = []
+        for email, user_id in user_ids.items():
+            index, quiz_data, values = scored[email]
+            profile = profiles[user_id]
+            previous_version = profile_version(profile)
+            changed = apply_scores(profile, values)
+            stored = store_answers(profile, quiz_data, rules)
+            if not changed:
+                if stored:
+                    by_fields[tuple(sorted(stored))].append(profile)
+                results[index]['status'] = 'unchanged'
+                continue
+            profile.updated_at = now  # bulk_update skips auto_now
+            by_fields[tuple(sorted(changed + stored + ['updated_at']))].append(profile)
+            superseded.append((user_id, previous_version))
+            results[index]['status'] = 'updated'
+
+        if len(by_fields) > len(QUIZ_PROFILE_FIELDS):
+            # Too many different combinations to write separately; one pass over the union is cheaper
+            by_fields = {
+                tuple(sorted(set().union(*by_fields))): [profile for group in by_fields.values() for profile in group]
+            }
+        for fields, group in by_fields.items():
+            UserProfile.objects.bulk_update(group, list(fields), batch_size=1000)
+        # bulk_update sends no post_save, so drop the cached copies ourselves
+        transaction.on_commit(lambda: forget_users([user_id for user_id, _ in superseded]))
+        transaction.on_commit(lambda: pin_to_primary([user_id for user_id, _ in superseded]))
+
+    if superseded:
+        discard_many_recommendations(superseded, get_catalog_version())
+    logger.info(
+        "Quiz batch: %d updated, %d unchanged, %d errors.",
+        *(sum(1 for result in results if result['status'] == status) for status in ('updated', 'unchanged', 'error')),
+    )
+    return results
@@ -1,3 +1,155 @@
-from django.test import TestCase
+import io
+import json
+import os
+import tempfile
 
-# Create your tests here.
+import orjson
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from users.models import UserAccount, UserProfile
+from . import rules as rules_module
+from .answers import decode_answers, encode_answers
+from .rules import RulesError, ScoringRules, get_rules
+from .services import QuizProcessor, QuizValidationError, score_quiz
+
+SPEC = {
+    'version': 3,
+    'percentages': {'workwear': 0.7, 'dresses': 0.5},
+    'questions': {
+        'seasonality_answer': {
+            'always': {'percentages': {'winter_wear': 0.75}, 'scores': {'Classic': 0.5}},
+            'never': {'percentages': {'workwear': 0.2}},
+        },
+    },
+    'style_selections': {'weights': [1.0, 0.5]},
+    'top_styles': 2,
+}
+
+
+class ScoringRulesTests(SimpleTestCase):
+    def test_scoring(self):
+        rules = ScoringRules(SPEC)
+        percentages, scores = rules.score({
+            'seasonality_answer': 'always',
+            'style_selections': [['Boho', 'Classic'], ['Classic', None], ['Edgy'], 'junk'],
+        })
+        self.assertEqual(percentages, {'workwear': 0.7, 'dresses': 0.5, 'winter_wear': 0.75})
+        self.assertEqual(scores, {'Classic': 2.0, 'Boho': 1.0})
+        self.assertEqual(rules.score({'seasonality_answer': 'never'})[0], {'workwear': 0.2, 'dresses': 0.5})
+        self.assertEqual(rules.score({'seasonality_answer': 'unknown'}), ({'workwear': 0.7, 'dresses': 0.5}, {}))
+
+    def test_top_styles_keep_the_earliest_on_ties(self):
+        rules = ScoringRules(SPEC)
+        self.assertEqual(rules.top({'Boho': 1.0, 'Edgy': 2.0, 'Classic': 1.0}), ['Edgy', 'Boho'])
+
+    def test_malformed_rules_are_rejected(self):
+        for change in (
+            {'version': 0},
+            {'version': True},
+            {'percentages': {'workwear': 'high'}},
+            {'questions': {'seasonality_answer': ['always']}},
+            {'questions': {'seasonality_answer': {'always': {'points': {}}}}},
+            {'style_selections': {'weights': []}},
+            {'top_styles': -1},
+        ):
+            with self.subTest(change=change), self.assertRaises(RulesError):
+                ScoringRules({**SPEC, **change})
+
+    def test_answers_to_rule_questions_must_be_strings(self):
+        with self.assertRaises(QuizValidationError) as raised:
+            score_quiz({'seasonality_answer': ['always']}, ScoringRules(SPEC))
+        self.assertEqual(raised.exception.errors, ['seasonality_answer must be a string.'])
+
+    def test_score_quiz(self):
+        values = score_quiz({
+            'primary_body_type': 'Pear', 'weekday_lifestyle': 'Office', 'weekend_lifestyle': ['Relaxed', 'Active'],
+            'seasonality_answer': 'always', 'style_selections': [['Boho', 'Classic']],
+        }, ScoringRules(SPEC))
+        self.assertEqual(values['weekend_lifestyle'], 'Relaxed,Active')
+        self.assertEqual(values['style_scores'], {'Classic': 1.0, 'Boho': 1.0})
+        self.assertEqual(values['top_three_styles'], 'Classic,Boho')
+
+    def test_shipped_rules_compile(self):
+        rules_module.load_rules(os.path.join(os.path.dirname(rules_module.__file__), 'scoring_rules.json'))
+
+
+class RulesFileMixin:
+    """
+    Points get_rules() at a temporary rule file for the test, and restores
+    the rules in force afterwards.
+    """
+    def setUp(self):
+        super().setUp()
+        saved = (rules_module._rules, rules_module._signature, rules_module._checked_at)
+        self.addCleanup(lambda: setattr(rules_module, '_rules', saved[0]))
+        self.addCleanup(lambda: setattr(rules_module, '_signature', saved[1]))
+        self.addCleanup(lambda: setattr(rules_module, '_checked_at', saved[2]))
+        rules_module._rules, rules_module._signature = None, None
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'rules.json')
+
+    def write(self, spec, mtime):
+        with open(self.path, 'w') as file:
+            file.write(spec if isinstance(spec, str) else json.dumps(spec))
+        os.utime(self.path, ns=(mtime, mtime))
+
+
+class RulesReloadTests(RulesFileMixin, SimpleTestCase):
+    def test_changed_files_are_reloaded_and_broken_ones_ignored(self):
+        with override_settings(QUIZ_RULES_PATH=self.path, QUIZ_RULES_CHECK_INTERVAL=0):
+            self.write(SPEC, 1_000_000_000)
+            self.assertEqual(get_rules().version, 3)
+
+            self.write({**SPEC, 'version': 4}, 2_000_000_000)
+            with self.assertLogs('quiz.rules', 'INFO'):
+                self.assertEqual(get_rules().version, 4)
+
+            self.write('{"version": ', 3_000_000_000)
+            with self.assertLogs('quiz.rules', 'ERROR'):
+                self.assertEqual(get_rules().version, 4)
+            # Logged once per change, not on every check
+            with self.assertNoLogs('quiz.rules'):
+                self.assertEqual(get_rules().version, 4)
+
+
+QUIZ = {
+    'primary_body_type': 'Pear', 'secondary_body_type': 'Apple', 'weekday_lifestyle': 'Office',
+    'weekend_lifestyle': ['Relaxed'], 'seasonality_answer': 'always',
+    'style_selections': [['Boho', 'Classic'], ['Classic', 'Edgy']],
+}
+
+
+class AnswersTests(SimpleTestCase):
+    def test_round_trip(self):
+        encoded = encode_answers(QUIZ)
+        self.assertEqual(decode_answers(encoded), QUIZ)
+        self.assertEqual(decode_answers(memoryview(encoded)), QUIZ)
+        self.assertLess(len(encoded), len(orjson.dumps(QUIZ)) * 2 // 3)
+
+    def test_anything_else_is_rejected(self):
+        encoded = encode_answers(QUIZ)
+        for data in (b'', b'\x00' + encoded[1:], encoded[:1] + b'garbage'):
+            with self.subTest(data=data), self.assertRaises(ValueError):
+                decode_answers(data)
+
+
+class RescoreTests(RulesFileMixin, TestCase):
+    def test_profiles_are_rescored_from_their_stored_answers(self):
+        with override_settings(QUIZ_RULES_PATH=self.path, QUIZ_RULES_CHECK_INTERVAL=0):
+            self.write(SPEC, 1_000_000_000)
+            user = UserAccount.objects.create(email='quiz@example.com', first_name='A', last_name='B', password='!')
+            QuizProcessor(user=user, quiz_data=QUIZ).process_and_save()
+            profile = UserProfile.objects.get(user=user)
+            self.assertEqual((decode_answers(profile.quiz_answers), profile.scoring_version), (QUIZ, 3))
+            self.assertEqual(profile.wardrobe_percentages['winter_wear'], 0.75)
+
+            changed = {**SPEC['questions']['seasonality_answer'], 'always': {'percentages': {'winter_wear': 0.9}}}
+            self.write({**SPEC, 'version': 4, 'questions': {'seasonality_answer': changed}}, 2_000_000_000)
+            with self.assertLogs('quiz.rules', 'INFO'):
+                call_command('rescore_profiles', workers=0, max_rate=0, stdout=io.StringIO())
+
+        profile.refresh_from_db()
+        self.assertEqual((profile.scoring_version, profile.wardrobe_percentages['winter_wear']), (4, 0.9))
+        self.assertEqual(profile.style_scores, {'Classic': 1.5, 'Boho': 1.0, 'Edgy': 0.5})
@@ -0,0 +1,9 @@
+from django.contrib import admin
+from .models import RecommendationJob
+
+
+@admin.register(RecommendationJob)
+class RecommendationJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'user', 'status', 'attempts', 'created_at', 'finished_at')
+    list_filter = ('status',)
+    raw_id_fields = ('user',)
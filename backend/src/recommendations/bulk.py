@@ -0,0 +1,64 @@
+# backend/src/recommendations/bulk.py
+"""
+Process-pool helpers for regenerating capsules in bulk
+(see `manage.py generate_recommendations`).
+
+Workers never touch the users tables: the parent process streams profiles
+and writes results, and each worker only loads the catalog index once (from
+the compiled snapshot when there is one) and ranks the profiles it is sent
+with the configured engine (see engines/). With no workers, the parent
+calls load_index itself and scores in-process.
+"""
+from types import SimpleNamespace
+
+from .engine import CAPSULE_SIZE, RANKING_SIZE
+from .engines import PROFILE_FEATURES, rank_profiles
+
+# The UserProfile fields the engines read, plus what the results are stored under
+PROFILE_FIELDS = ('user_id', *PROFILE_FEATURES, 'updated_at')
+
+_worker_index = None
+
+
+def load_index(catalog_version):
+    """
+    Loads the catalog index score_profiles ranks against.
+    """
+    global _worker_index
+    from products.catalog_index import get_catalog_index
+
+    _worker_index = get_catalog_index(catalog_version)
+
+
+def init_worker(catalog_version):
+    """
+    Pool initializer: sets Django up (for spawn-based pools), drops the
+    database connections a forked worker inherits, and loads the catalog
+    index once for the lifetime of the worker.
+    """
+    import django
+    from django.apps import apps
+    if not apps.ready:
+        django.setup()
+
+    from recommender_project.db import close_pools, drop_inherited_connections
+
+    drop_inherited_connections()
+    load_index(catalog_version)
+    # The worker only needs the database to load the catalog
+    close_pools()
+
+
+def score_profiles(profiles):
+    """
+    Ranks a chunk of profile dicts. Returns a list of (user_id,
+    profile_version, [capsule item_id, ...], ranking), the ranking being
+    the full one later pages are cut from (see pagination.py).
+    """
+    index = _worker_index
+    rankings = rank_profiles([SimpleNamespace(**profile) for profile in profiles], index, size=RANKING_SIZE)
+    results = []
+    for profile, ranking in zip(profiles, rankings):
+        capsule = [index.item_ids[p] for p in ranking[:CAPSULE_SIZE].tolist()]
+        results.append((profile['user_id'], profile['profile_version'], capsule, ranking))
+    return results
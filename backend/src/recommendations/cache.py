@@ -0,0 +1,128 @@
+# backend/src/recommendations/cache.py
+"""
+Per-profile recommendation cache.
+
+Entries are keyed on (user id, profile version, catalog version). The
+profile version is the profile's `updated_at`, which moves on every quiz
+submission, and the catalog version is bumped by every import, so a stale
+capsule can never be served - old entries simply stop being looked up and
+fall out of the bounded cache.
+
+The full ranking behind the paginated endpoint is cached next to it, as the
+raw bytes of a uint32 array of catalog positions (1.6 KB for 400 items).
+"""
+import numpy as np
+from django.conf import settings
+from django.core.cache import caches
+
+
+def _cache():
+    return caches[settings.RECOMMENDATION_CACHE_ALIAS]
+
+
+def profile_version(profile):
+    """
+    A compact, monotonically increasing version for a UserProfile.
+    """
+    return version_from_timestamp(profile.updated_at)
+
+
+def version_from_timestamp(updated_at):
+    if updated_at is None:
+        return 0
+    return int(updated_at.timestamp() * 1_000_000)
+
+
+def cache_key(user_id, profile_version, catalog_version):
+    return f'recommendations:{user_id}:{profile_version}:{catalog_version}'
+
+
+def get_cached_recommendations(user_id, profile, catalog_version):
+    return _cache().get(cache_key(user_id, profile_version(profile), catalog_version))
+
+
+async def aget_cached_recommendations(user_id, profile, catalog_version):
+    return await _cache().aget(cache_key(user_id, profile_version(profile), catalog_version))
+
+
+def cache_recommendations(user_id, profile, catalog_version, data):
+    _cache().set(
+        cache_key(user_id, profile_version(profile), catalog_version),
+        data,
+        settings.RECOMMENDATION_CACHE_TIMEOUT,
+    )
+
+
+async def acache_recommendations(user_id, profile, catalog_version, data):
+    await _cache().aset(
+        cache_key(user_id, profile_version(profile), catalog_version),
+        data,
+        settings.RECOMMENDATION_CACHE_TIMEOUT,
+    )
+
+
+def discard_recommendations(user_id, old_profile_version, catalog_version):
+    """
+    Drops the entry for a profile version that has just been superseded, so it
+    doesn't sit in the cache until it gets evicted.
+    """
+    _cache().delete(cache_key(user_id, old_profile_version, catalog_version))
+
+
+async def adiscard_recommendations(user_id, old_profile_version, catalog_version):
+    await _cache().adelete(cache_key(user_id, old_profile_version, catalog_version))
+
+
+def discard_many_recommendations(superseded, catalog_version):
+    """
+    Bulk version of discard_recommendations for (user id, old profile version) pairs.
+    """
+    _cache().delete_many([cache_key(user_id, version, catalog_version) for user_id, version in superseded])
+
+
+def ranking_key(user_id, profile_version, catalog_version):
+    return f'ranking:{user_id}:{profile_version}:{catalog_version}'
+
+
+def get_cached_ranking(user_id, profile_version, catalog_version):
+    data = _cache().get(ranking_key(user_id, profile_version, catalog_version))
+    return None if data is None else np.frombuffer(data, dtype=np.uint32)
+
+
+async def aget_cached_ranking(user_id, profile_version, catalog_version):
+    data = await _cache().aget(ranking_key(user_id, profile_version, catalog_version))
+    return None if data is None else np.frombuffer(data, dtype=np.uint32)
+
+
+def cache_ranking(user_id, profile_version, catalog_version, ranking):
+    _cache().set(
+        ranking_key(user_id, profile_version, catalog_version),
+        np.asarray(ranking, dtype=np.uint32).tobytes(),
+        settings.RECOMMENDATION_CACHE_TIMEOUT,
+    )
+
+
+def cache_rankings(catalog_version, rankings):
+    """
+    cache_ranking for many (user_id, profile_version, ranking) at once.
+    """
+    _cache().set_many({
+        ranking_key(user_id, profile_version, catalog_version): np.asarray(ranking, dtype=np.uint32).tobytes()
+        for user_id, profile_version, ranking in rankings
+    }, settings.RECOMMENDATION_CACHE_TIMEOUT)
+
+
+def outfits_key(user_id, profile_version, catalog_version):
+    return f'outfits:{user_id}:{profile_version}:{catalog_version}'
+
+
+def get_cached_outfits(user_id, profile_version, catalog_version):
+    return _cache().get(outfits_key(user_id, profile_version, catalog_version))
+
+
+def cache_outfits(user_id, profile_version, catalog_version, outfits):
+    _cache().set(
+        outfits_key(user_id, profile_version, catalog_version),
+        outfits,
+        settings.RECOMMENDATION_CACHE_TIMEOUT,
+    )
\ No newline at end of file
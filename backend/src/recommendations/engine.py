@@ -0,0 +1,183 @@
+# backend/src/recommendations/engine.py
+"""
+The rule-based capsule builder.
+
+Scoring runs over the whole catalog at once: the catalog index holds a
+(products x styles) matrix, so a profile's style scores become a single
+matrix-vector product. The 40-item capsule is then filled bucket by bucket
+(winter wear, workwear, dresses, statement pieces) using the quotas from the
+profile's wardrobe_percentages, with a small heap per bucket instead of
+sorting the catalog.
+
+Past the capsule, the ranking continues with the best of the rest of the
+catalog (up to RANKING_SIZE items), which is what later pages of
+/api/recommendations/ are cut from.
+"""
+import heapq
+
+import numpy as np
+
+from products.catalog_index import get_catalog_index
+from products.tags import normalize_tag
+
+CAPSULE_SIZE = 40
+RANKING_SIZE = 400
+
+# Which slice of the catalog each wardrobe percentage from the quiz controls.
+# A product counts towards a bucket when it carries any of the listed tags.
+CAPSULE_BUCKETS = {
+    'winter_wear': ('season', ['Winter']),
+    'workwear': ('lifestyle', ['Business Casual', 'Business Formal']),
+    'dresses': ('category', ['Dress/ Jumpsuit']),
+    'statement': ('utility', ['Statement']),
+}
+
+# The quiz and the catalog don't always agree on style names.
+STYLE_ALIASES = {
+    'street': 'streetstyle',
+}
+
+# How much the body type / lifestyle match weights count next to the style
+# affinity (which is normalized to 0..1). They mostly act as tie-breakers.
+FILTER_WEIGHT = 0.1
+
+
+def style_vector(index, style_scores):
+    """
+    Turns a profile's {'Classic': 2.0, ...} scores into a vector aligned with
+    the columns of the index's style matrix, normalized to sum to 1.
+    """
+    keys, _ = index.tag_matrix('style')
+    columns = {key: column for column, key in enumerate(keys)}
+    vector = np.zeros(len(keys), dtype=np.float32)
+    for style, score in (style_scores or {}).items():
+        key = normalize_tag(style)
+        key = STYLE_ALIASES.get(key, key)
+        if key in columns:
+            vector[columns[key]] += float(score)
+    total = vector.sum()
+    return vector / total if total > 0 else vector
+
+
+def score_catalog(index, profile):
+    """
+    Scores every product for `profile` in one shot.
+    Returns (scores, eligible) where `eligible` masks out products that fail
+    the body type / lifestyle filters.
+    """
+    required, weighted = index.profile_criteria(profile)
+    eligible = index.match(required)
+
+    _, matrix = index.tag_matrix('style')
+    scores = matrix @ style_vector(index, profile.style_scores)
+    scores += FILTER_WEIGHT * index.weigh(weighted)
+    return scores, eligible
+
+
+def score_positions(index, profile, positions):
+    """
+    score_catalog's scores for just the products at `positions`, for callers
+    that only need a small pool of them.
+    """
+    _, weighted = index.profile_criteria(profile)
+    _, matrix = index.tag_matrix('style')
+    scores = matrix[positions] @ style_vector(index, profile.style_scores)
+    weights = np.zeros(len(positions), dtype=np.float32)
+    for bits, weight in weighted:
+        weights += index.bits_at(bits, positions) * np.float32(weight)
+    scores += FILTER_WEIGHT * weights
+    return scores
+
+
+def bucket_quotas(wardrobe_percentages, size=CAPSULE_SIZE):
+    """
+    Splits the capsule between the buckets in CAPSULE_BUCKETS.
+
+    Percentages are treated as shares of the capsule; when the quiz answers
+    add up to more than 100% they are scaled down proportionally. Whatever
+    is left over is filled with the best remaining items.
+    """
+    shares = {
+        bucket: max(0.0, float((wardrobe_percentages or {}).get(bucket) or 0.0))
+        for bucket in CAPSULE_BUCKETS
+    }
+    total = sum(shares.values())
+    scale = 1.0 / total if total > 1.0 else 1.0
+    return {bucket: int(round(share * scale * size)) for bucket, share in shares.items()}
+
+
+def _top_k(scores, mask, k, taken):
+    """
+    The k best positions under `mask`, skipping anything already `taken`.
+
+    argpartition narrows the catalog down to a small candidate pool in O(n);
+    a heap then pops candidates best-first (ties keep catalog order).
+    """
+    if k <= 0:
+        return []
+    positions = np.flatnonzero(mask)
+    if not len(positions):
+        return []
+
+    # Grab a few extra candidates so items already used by another bucket
+    # don't starve this one.
+    pool = min(len(positions), k + len(taken))
+    if pool < len(positions):
+        best = np.argpartition(-scores[positions], pool - 1)[:pool]
+        positions = positions[best]
+
+    heap = [(-float(scores[p]), int(p)) for p in positions]
+    heapq.heapify(heap)
+    picked = []
+    while heap and len(picked) < k:
+        _, position = heapq.heappop(heap)
+        if position not in taken:
+            picked.append(position)
+    return picked
+
+
+def build_capsule(profile, index=None, size=CAPSULE_SIZE):
+    """
+    Builds the capsule for `profile` and returns catalog positions in
+    display order (bucket picks first, then the best of the rest).
+    """
+    if index is None:
+        index = get_catalog_index()
+    if not index.size:
+        return []
+
+    scores, eligible = score_catalog(index, profile)
+    return _fill_capsule(index, profile, scores, eligible, size)
+
+
+def _fill_capsule(index, profile, scores, eligible, size):
+    quotas = bucket_quotas(profile.wardrobe_percentages, size)
+
+    taken = set()
+    capsule = []
+    for bucket, quota in sorted(quotas.items(), key=lambda item: -item[1]):
+        field, values = CAPSULE_BUCKETS[bucket]
+        mask = eligible & index.to_mask(index.any_of(field, values))
+        picks = _top_k(scores, mask, min(quota, size - len(capsule)), taken)
+        taken.update(picks)
+        capsule.extend(picks)
+
+    capsule.extend(_top_k(scores, eligible, size - len(capsule), taken))
+    return capsule
+
+
+def build_ranking(profile, index=None, size=RANKING_SIZE, capsule_size=CAPSULE_SIZE):
+    """
+    The capsule followed by the best of the rest, as a compact uint32 array
+    of catalog positions. Its first `capsule_size` entries are exactly what
+    build_capsule returns.
+    """
+    if index is None:
+        index = get_catalog_index()
+    if not index.size:
+        return np.zeros(0, dtype=np.uint32)
+
+    scores, eligible = score_catalog(index, profile)
+    ranking = _fill_capsule(index, profile, scores, eligible, min(capsule_size, size))
+    ranking.extend(_top_k(scores, eligible, size - len(ranking), set(ranking)))
+    return np.array(ranking, dtype=np.uint32)
@@ -0,0 +1,93 @@
+# backend/src/recommendations/engines/__init__.py
+"""
+Pluggable recommendation engines.
+
+settings.RECOMMENDATION_ENGINE picks the class that ranks the catalog for a
+profile: the rule engine (engines.rules.RuleEngine, the default) or a model
+served over HTTP (engines.model.ModelEngine). Everything that needs a
+ranking goes through rank_profiles, which adds, whatever the engine:
+
+- a result cache keyed on (engine, profile features, catalog version,
+  size), so identical quiz answers are only ranked once per catalog;
+- a deadline of RECOMMENDATION_ENGINE_TIMEOUT seconds per call;
+- the rule engine as the fallback for every profile the configured engine
+  doesn't answer in time. Fallback results aren't cached, so the next call
+  gives the engine another chance.
+
+`manage.py run_stub_model_server` serves the model protocol locally.
+"""
+import logging
+from functools import lru_cache
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.module_loading import import_string
+
+from recommendations.engine import RANKING_SIZE
+from .base import PROFILE_FEATURES, EngineUnavailable, RecommendationEngine, features_digest, profile_features
+from .rules import RuleEngine
+
+logger = logging.getLogger(__name__)
+
+_rules = RuleEngine()
+
+
+@lru_cache(maxsize=None)
+def _load_engine(path):
+    return import_string(path)()
+
+
+def get_engine():
+    return _load_engine(settings.RECOMMENDATION_ENGINE)
+
+
+def _cache():
+    return caches[settings.RECOMMENDATION_CACHE_ALIAS]
+
+
+def result_key(engine, profile, catalog_version, size):
+    return f'engine:{engine.name}:{catalog_version}:{size}:{features_digest(profile_features(profile))}'
+
+
+def rank_profiles(profiles, index, size=RANKING_SIZE):
+    """
+    One ranking (a uint32 array of catalog positions, best first) per
+    profile, from the cache, the configured engine or, failing that, the
+    rule engine.
+    """
+    engine = get_engine()
+    keys = [result_key(engine, profile, index.version, size) for profile in profiles]
+    cached = _cache().get_many(keys)
+    rankings = [np.frombuffer(cached[key], dtype=np.uint32) if key in cached else None for key in keys]
+
+    missing = [i for i, ranking in enumerate(rankings) if ranking is None]
+    if not missing:
+        return rankings
+    try:
+        answers = engine.rank_many(
+            [profiles[i] for i in missing], index, size, timeout=settings.RECOMMENDATION_ENGINE_TIMEOUT,
+        )
+    except EngineUnavailable as e:
+        logger.warning("%s engine unavailable: %s", engine.name, e)
+        answers = [None] * len(missing)
+
+    fresh = {}
+    fallback = []
+    for i, ranking in zip(missing, answers):
+        if ranking is None:
+            fallback.append(i)
+        else:
+            rankings[i] = np.asarray(ranking, dtype=np.uint32)
+            fresh[keys[i]] = rankings[i].tobytes()
+    if fresh:
+        _cache().set_many(fresh, settings.RECOMMENDATION_CACHE_TIMEOUT)
+    if fallback:
+        logger.warning("%s engine missed %d of %d profiles; ranking them with the rules", engine.name, len(fallback), len(missing))
+        for i, ranking in zip(fallback, _rules.rank_many([profiles[i] for i in fallback], index, size)):
+            rankings[i] = ranking
+    return rankings
+
+
+def rank_profile(profile, index, size=RANKING_SIZE):
+    return rank_profiles([profile], index, size)[0]
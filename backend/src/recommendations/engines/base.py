@@ -0,0 +1,44 @@
+# backend/src/recommendations/engines/base.py
+import hashlib
+
+import orjson
+
+# The UserProfile fields an engine may look at. Two profiles that agree on
+# all of them get the same ranking, which is what the result cache keys on.
+PROFILE_FEATURES = (
+    'primary_body_type', 'secondary_body_type', 'weekday_lifestyle',
+    'weekend_lifestyle', 'wardrobe_percentages', 'style_scores',
+)
+
+
+def profile_features(profile):
+    return {field: getattr(profile, field) for field in PROFILE_FEATURES}
+
+
+def features_digest(features):
+    """
+    A short stable hash of a profile's features.
+    """
+    return hashlib.blake2b(orjson.dumps(features, option=orjson.OPT_SORT_KEYS), digest_size=16).hexdigest()
+
+
+class EngineUnavailable(Exception):
+    """
+    The engine can't answer right now (unreachable, erroring or out of time).
+    """
+
+
+class RecommendationEngine:
+    """
+    Ranks the catalog for user profiles.
+
+    `rank_many` returns, for each profile, a uint32 array of catalog
+    positions (best first, at most `size` long), or None for a profile the
+    engine couldn't rank within `timeout` seconds. It may also raise
+    EngineUnavailable for the whole call. Either way the rule engine steps
+    in (see engines/__init__.py).
+    """
+    name = None
+
+    def rank_many(self, profiles, index, size, timeout=None):
+        raise NotImplementedError
@@ -0,0 +1,66 @@
+# backend/src/recommendations/engines/batching.py
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher:
+    """
+    Groups calls from many threads into batches for one `handler` call.
+
+    `submit` queues an item and returns a Future. A background thread takes
+    the first waiting item, collects whatever else arrives within `max_wait`
+    seconds (up to `max_size` items), and calls handler(items), which must
+    return one result per item. Callers that gave up and cancelled their
+    future before the batch went out are left out of it.
+    """
+
+    def __init__(self, handler, max_size, max_wait):
+        self.handler = handler
+        self.max_size = max_size
+        self.max_wait = max_wait
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, item):
+        future = Future()
+        self._queue.put((item, future))
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+                    self._thread.start()
+        return future
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = [(item, future) for item, future in self._collect() if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            try:
+                results = self.handler([item for item, _ in batch])
+            except Exception as e:
+                logger.warning("Batch of %d failed: %s", len(batch), e)
+                for _, future in batch:
+                    future.set_exception(e)
+            else:
+                for (_, future), result in zip(batch, results):
+                    future.set_result(result)
@@ -0,0 +1,93 @@
+# backend/src/recommendations/engines/model.py
+import time
+import urllib.request
+
+import numpy as np
+import orjson
+from django.conf import settings
+
+from .base import EngineUnavailable, RecommendationEngine, profile_features
+from .batching import MicroBatcher
+
+
+class ModelEngine(RecommendationEngine):
+    """
+    Ranks through a model server (an LLM curator, a learned ranker, ...)
+    over HTTP:
+
+        POST RECOMMENDATION_MODEL_URL
+        {"catalog_version": 12, "size": 400, "profiles": [{features}, ...]}
+        -> {"rankings": [[item_id, ...], ...]}
+
+    with one ranking per profile, best first. Item ids the catalog doesn't
+    know are dropped. Calls from all threads of the process are
+    micro-batched: a call waits up to RECOMMENDATION_MODEL_BATCH_WAIT
+    seconds for others to join, so up to RECOMMENDATION_MODEL_BATCH_SIZE
+    profiles share one inference request.
+    """
+    name = 'model'
+
+    def __init__(self, url=None, batch_size=None, batch_wait=None):
+        self.url = url or settings.RECOMMENDATION_MODEL_URL
+        self.batcher = MicroBatcher(
+            self._infer,
+            batch_size or settings.RECOMMENDATION_MODEL_BATCH_SIZE,
+            settings.RECOMMENDATION_MODEL_BATCH_WAIT if batch_wait is None else batch_wait,
+        )
+
+    def rank_many(self, profiles, index, size, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        futures = [self.batcher.submit((profile_features(profile), index.version, size)) for profile in profiles]
+        rankings = []
+        for future in futures:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                item_ids = future.result(timeout=remaining)
+            except TimeoutError:
+                future.cancel()  # Leaves it out of the next batch if it hasn't gone yet
+                rankings.append(None)
+            except EngineUnavailable:
+                rankings.append(None)
+            else:
+                rankings.append(self._positions(item_ids, index, size))
+        return rankings
+
+    def _infer(self, requests):
+        """
+        Batch handler: one POST per (catalog version, size) in the batch,
+        which in practice is one.
+        """
+        groups = {}
+        for i, (_, catalog_version, size) in enumerate(requests):
+            groups.setdefault((catalog_version, size), []).append(i)
+
+        results = [None] * len(requests)
+        for (catalog_version, size), members in groups.items():
+            rankings = self._post({
+                "catalog_version": catalog_version,
+                "size": size,
+                "profiles": [requests[i][0] for i in members],
+            })
+            for i, ranking in zip(members, rankings):
+                results[i] = ranking
+        return results
+
+    def _post(self, payload):
+        request = urllib.request.Request(
+            self.url, data=orjson.dumps(payload), headers={'Content-Type': 'application/json'},
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=settings.RECOMMENDATION_ENGINE_TIMEOUT) as response:
+                rankings = orjson.loads(response.read())['rankings']
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            raise EngineUnavailable(f"Model server at {self.url} failed: {e}") from e
+        if not isinstance(rankings, list) or len(rankings) != len(payload['profiles']) \
+                or not all(isinstance(ranking, list) for ranking in rankings):
+            raise EngineUnavailable(f"Model server at {self.url} sent a malformed response.")
+        return rankings
+
+    def _positions(self, item_ids, index, size):
+        positions = index.positions_by_id
+        # dict.fromkeys drops repeats and keeps the model's order
+        ranked = dict.fromkeys(positions[item_id] for item_id in item_ids if isinstance(item_id, str) and item_id in positions)
+        return np.fromiter(ranked, dtype=np.uint32, count=len(ranked))[:size]
@@ -0,0 +1,14 @@
+# backend/src/recommendations/engines/rules.py
+from recommendations.engine import build_ranking
+from .base import RecommendationEngine
+
+
+class RuleEngine(RecommendationEngine):
+    """
+    The rule-based capsule builder from recommendations/engine.py. It runs
+    in-process in a few milliseconds, so it never needs a deadline.
+    """
+    name = 'rules'
+
+    def rank_many(self, profiles, index, size, timeout=None):
+        return [build_ranking(profile, index=index, size=size) for profile in profiles]
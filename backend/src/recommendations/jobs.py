@@ -0,0 +1,213 @@
+# backend/src/recommendations/jobs.py
+"""
+Background recompute of materialized capsules.
+
+Quiz submissions enqueue a RecommendationJob row and hand it to a small
+in-process thread pool, so the heavy scoring never runs on a user-facing
+request. Because the queue lives in the database, jobs that were pending (or
+running) when a process died are picked up again by the next process that
+starts the pool, or by `manage.py run_recommendation_jobs`.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from products.catalog_index import get_catalog_index
+from products.versioning import get_catalog_version
+from users.models import UserProfile
+from .cache import cache_ranking, profile_version
+from .engine import CAPSULE_SIZE
+from .engines import rank_profile
+from .models import Recommendation, RecommendationJob
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    """
+    Starts this process's worker pool on first use and re-queues any jobs
+    left behind by a previous process.
+    """
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.RECOMMENDATION_WORKERS,
+                    thread_name_prefix='recommendations',
+                )
+                for job_id in _recoverable_job_ids():
+                    _executor.submit(run_job, job_id)
+    return _executor
+
+
+def _recoverable_job_ids():
+    stale = timezone.now() - timedelta(seconds=settings.RECOMMENDATION_JOB_STALE_AFTER)
+    return list(
+        RecommendationJob.objects.filter(
+            Q(status=RecommendationJob.PENDING)
+            | Q(status=RecommendationJob.RUNNING, started_at__lt=stale)
+        ).order_by('created_at').values_list('pk', flat=True)
+    )
+
+
+def enqueue_recompute(user_id):
+    """
+    Queues a capsule recompute for `user_id` and returns the job. If the user
+    already has a job waiting, that one is reused (it will read the latest
+    profile when it runs).
+    """
+    job = RecommendationJob.objects.filter(user_id=user_id, status=RecommendationJob.PENDING).first()
+    if job is not None:
+        return job
+    try:
+        with transaction.atomic():
+            job = RecommendationJob.objects.create(user_id=user_id)
+    except IntegrityError:
+        # A concurrent request queued one first (one pending job per user)
+        return RecommendationJob.objects.filter(user_id=user_id).order_by('-created_at').first()
+    transaction.on_commit(lambda: _get_executor().submit(run_job, job.pk))
+    return job
+
+
+# Starting the pool may recover old jobs, so async callers go through a thread
+aenqueue_recompute = sync_to_async(enqueue_recompute)
+
+
+def _recent_jobs(user_id):
+    retry_after = timezone.now() - timedelta(seconds=settings.RECOMMENDATION_JOB_RETRY_AFTER)
+    return RecommendationJob.objects.filter(
+        Q(status__in=[RecommendationJob.PENDING, RecommendationJob.RUNNING])
+        | Q(status=RecommendationJob.FAILED, finished_at__gte=retry_after),
+        user_id=user_id,
+    )
+
+
+def has_recent_job(user_id):
+    """
+    Whether a recompute for `user_id` is queued or running, or failed less
+    than RECOMMENDATION_JOB_RETRY_AFTER seconds ago, so reads shouldn't
+    queue another. Without the backoff, a capsule that fails to build would
+    be rebuilt (and fail again) on every request.
+    """
+    return _recent_jobs(user_id).exists()
+
+
+async def ahas_recent_job(user_id):
+    return await _recent_jobs(user_id).aexists()
+
+
+def _empty_capsules(user_id, profile_version):
+    return RecommendationJob.objects.filter(
+        user_id=user_id, status=RecommendationJob.DONE, profile_version=profile_version, capsule_size=0,
+    ).order_by('-finished_at').values_list('catalog_version', flat=True)
+
+
+def empty_capsule_version(user_id, profile_version):
+    """
+    The catalog version a finished job built an empty capsule for, from this
+    profile version, or None. A profile whose filters match no products has
+    no rows to read back, and without this the views would wait for a
+    capsule that never comes.
+    """
+    return _empty_capsules(user_id, profile_version).first()
+
+
+async def aempty_capsule_version(user_id, profile_version):
+    return await _empty_capsules(user_id, profile_version).afirst()
+
+
+def run_job(job_id):
+    """
+    Claims and runs a single job. Safe to call from several processes at
+    once: only the caller whose UPDATE flips the row out of its queued state
+    does the work.
+    """
+    close_old_connections()
+    try:
+        stale = timezone.now() - timedelta(seconds=settings.RECOMMENDATION_JOB_STALE_AFTER)
+        claimed = RecommendationJob.objects.filter(
+            Q(status=RecommendationJob.PENDING)
+            | Q(status=RecommendationJob.RUNNING, started_at__lt=stale),
+            pk=job_id,
+        ).update(status=RecommendationJob.RUNNING, started_at=timezone.now(), attempts=F('attempts') + 1)
+        if not claimed:
+            return
+
+        job = RecommendationJob.objects.get(pk=job_id)
+        try:
+            materialize_recommendations(job.user_id, job_id=job_id)
+        except Exception as e:
+            logger.exception("Recommendation job %s failed", job_id)
+            RecommendationJob.objects.filter(pk=job_id).update(
+                status=RecommendationJob.FAILED, error=str(e), finished_at=timezone.now()
+            )
+        else:
+            RecommendationJob.objects.filter(pk=job_id).update(
+                status=RecommendationJob.DONE, error='', finished_at=timezone.now()
+            )
+    finally:
+        close_old_connections()
+
+
+def materialize_recommendations(user_id, job_id=None):
+    """
+    Builds the user's capsule and replaces their Recommendation rows with it.
+    The longer ranking behind the later pages is cached alongside. With
+    `job_id`, the job records what it built, in the same transaction.
+    """
+    profile = UserProfile.objects.get(user_id=user_id)
+    catalog_version = get_catalog_version()
+    index = get_catalog_index(catalog_version)
+    ranking = rank_profile(profile, index)
+    positions = ranking[:CAPSULE_SIZE].tolist()
+
+    version = profile_version(profile)
+    rows = [
+        Recommendation(
+            user_id=user_id,
+            rank=rank,
+            product_id=index.item_ids[position],
+            profile_version=version,
+            catalog_version=catalog_version,
+        )
+        for rank, position in enumerate(positions)
+    ]
+    with transaction.atomic():
+        Recommendation.objects.filter(user_id=user_id).delete()
+        Recommendation.objects.bulk_create(rows)
+        if job_id is not None:
+            RecommendationJob.objects.filter(pk=job_id).update(
+                profile_version=version, catalog_version=catalog_version, capsule_size=len(rows),
+            )
+    cache_ranking(user_id, version, catalog_version, ranking)
+    return rows
+
+
+# Loading the catalog index and scoring are synchronous; async views run them in a worker thread
+amaterialize_recommendations = sync_to_async(materialize_recommendations)
+
+
+def run_pending_jobs(limit=None):
+    """
+    Runs queued jobs in the current thread until the queue is empty (or
+    `limit` jobs have run). Returns how many jobs were processed.
+    """
+    processed = 0
+    while limit is None or processed < limit:
+        job_ids = _recoverable_job_ids()[:1]
+        if not job_ids:
+            break
+        run_job(job_ids[0])
+        processed += 1
+    return processed
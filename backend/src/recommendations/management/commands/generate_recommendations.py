@@ -0,0 +1,142 @@
+# backend/src/recommendations/management/commands/generate_recommendations.py
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from products.versioning import get_catalog_version
+from recommendations import bulk
+from recommendations.cache import cache_rankings, version_from_timestamp
+from recommendations.models import Recommendation
+from recommender_project.db import close_pools
+from users.models import UserProfile
+
+class Command(BaseCommand):
+    help = 'Regenerate the materialized capsule for every user profile using a process pool'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Worker processes (0 scores in this process).')
+        parser.add_argument('--since', type=str, default=None,
+                            help='Only profiles updated after this ISO timestamp.')
+        parser.add_argument('--chunk-size', type=int, default=500, help='Profiles per worker task.')
+        parser.add_argument('--checkpoint', type=str, default=None,
+                            help='JSON file recording progress; an interrupted run resumes from it.')
+
+    def handle(self, *args, **options):
+        since = None
+        if options['since']:
+            since = parse_datetime(options['since'])
+            if since is None:
+                raise CommandError(f"Could not parse --since {options['since']!r}.")
+            if timezone.is_naive(since):
+                since = timezone.make_aware(since)
+
+        checkpoint_path = options['checkpoint']
+        last_user_id = self._load_checkpoint(checkpoint_path, options['since'])
+        if last_user_id:
+            self.stdout.write(f'Resuming after user {last_user_id}.')
+
+        catalog_version = get_catalog_version(fresh=True)
+        started = time.perf_counter()
+        users = rows = 0
+
+        chunks = self._profile_chunks(since, last_user_id, options['chunk_size'])
+        for chunk_last_id, results in self._score(chunks, catalog_version, options['workers']):
+            rows += self._write(results, catalog_version)
+            users += len(results)
+            self._save_checkpoint(checkpoint_path, options['since'], chunk_last_id)
+            self.stdout.write(f'{users} profiles done (up to user {chunk_last_id}).')
+
+        if checkpoint_path and os.path.exists(checkpoint_path):
+            os.unlink(checkpoint_path)
+        self.stdout.write(self.style.SUCCESS(
+            f'Generated {rows} recommendations for {users} profiles in {time.perf_counter() - started:.1f}s.'
+        ))
+
+    def _profile_chunks(self, since, last_user_id, chunk_size):
+        """
+        Streams profiles in id order with keyset pagination, as lists of plain
+        dicts the workers can score without touching the database.
+        """
+        queryset = UserProfile.objects.order_by('user_id')
+        if since is not None:
+            queryset = queryset.filter(updated_at__gt=since)
+
+        while True:
+            chunk = list(queryset.filter(user_id__gt=last_user_id).values(*bulk.PROFILE_FIELDS)[:chunk_size])
+            if not chunk:
+                return
+            for profile in chunk:
+                profile['profile_version'] = version_from_timestamp(profile.pop('updated_at'))
+            last_user_id = chunk[-1]['user_id']
+            yield last_user_id, chunk
+
+    def _score(self, chunks, catalog_version, workers):
+        """
+        Yields (last user id, results) per chunk, in order, so the checkpoint
+        only ever moves past chunks that have been written.
+        """
+        if workers <= 0:
+            bulk.load_index(catalog_version)
+            for last_id, chunk in chunks:
+                yield last_id, bulk.score_profiles(chunk)
+            return
+
+        # Forked workers must not share the parent's database connections or pools
+        close_pools()
+        with ProcessPoolExecutor(max_workers=workers, initializer=bulk.init_worker,
+                                 initargs=(catalog_version,)) as executor:
+            in_flight = deque()
+            for last_id, chunk in chunks:
+                in_flight.append((last_id, executor.submit(bulk.score_profiles, chunk)))
+                # Keep a bounded number of chunks queued so memory stays flat
+                if len(in_flight) >= workers * 2:
+                    last_id, future = in_flight.popleft()
+                    yield last_id, future.result()
+            while in_flight:
+                last_id, future = in_flight.popleft()
+                yield last_id, future.result()
+
+    def _write(self, results, catalog_version):
+        rows = [
+            Recommendation(
+                user_id=user_id,
+                rank=rank,
+                product_id=item_id,
+                profile_version=version,
+                catalog_version=catalog_version,
+            )
+            for user_id, version, item_ids, _ in results
+            for rank, item_id in enumerate(item_ids)
+        ]
+        with transaction.atomic():
+            Recommendation.objects.filter(user_id__in=[user_id for user_id, *_ in results]).delete()
+            Recommendation.objects.bulk_create(rows, batch_size=5000)
+        # As materialize_recommendations does, so the first cursor page needn't rebuild the ranking
+        cache_rankings(catalog_version, [(user_id, version, ranking) for user_id, version, _, ranking in results])
+        return len(rows)
+
+    def _load_checkpoint(self, path, since):
+        if not path or not os.path.exists(path):
+            return 0
+        with open(path) as file:
+            checkpoint = json.load(file)
+        if checkpoint.get('since') != since:
+            raise CommandError(f'{path} was written for a different --since; delete it to start over.')
+        return checkpoint['last_user_id']
+
+    def _save_checkpoint(self, path, since, last_user_id):
+        if not path:
+            return
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w') as file:
+            json.dump({'since': since, 'last_user_id': last_user_id}, file)
+        os.replace(tmp_path, path)
+
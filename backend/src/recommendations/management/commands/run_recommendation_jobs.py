@@ -0,0 +1,13 @@
+# backend/src/recommendations/management/commands/run_recommendation_jobs.py
+from django.core.management.base import BaseCommand
+from recommendations.jobs import run_pending_jobs
+
+class Command(BaseCommand):
+    help = 'Run queued recommendation recompute jobs (e.g. ones left behind by a restart)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=None, help='Stop after this many jobs.')
+
+    def handle(self, *args, **options):
+        processed = run_pending_jobs(limit=options['limit'])
+        self.stdout.write(self.style.SUCCESS(f'Processed {processed} recommendation jobs.'))
@@ -0,0 +1,61 @@
+# backend/src/recommendations/management/commands/run_stub_model_server.py
+import random
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+import orjson
+from django.core.management.base import BaseCommand
+
+from products.catalog_index import get_catalog_index
+from recommendations.engine import build_ranking
+
+class Command(BaseCommand):
+    help = ('Serve the model engine protocol locally (see recommendations/engines/model.py), '
+            'ranking with the rule engine, optionally slow or flaky to exercise the fallback')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--latency', type=float, default=0.0, help='Seconds to sleep per inference request.')
+        parser.add_argument('--failure-rate', type=float, default=0.0,
+                            help='Fraction of requests answered with a 503.')
+
+    def handle(self, *args, **options):
+        command = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                payload = orjson.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+                time.sleep(options['latency'])
+                if random.random() < options['failure_rate']:
+                    self.send_error(503)
+                    return
+
+                index = get_catalog_index()
+                rankings = [
+                    [index.item_ids[p] for p in build_ranking(SimpleNamespace(**features), index, payload['size']).tolist()]
+                    for features in payload['profiles']
+                ]
+                body = orjson.dumps({"rankings": rankings})
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                command.stdout.write(f"Ranked a batch of {len(rankings)} profiles.")
+
+            def log_message(self, format, *args):
+                if options['verbosity'] > 1:
+                    super().log_message(format, *args)
+
+        server = ThreadingHTTPServer((options['host'], options['port']), Handler)
+        self.stdout.write(self.style.SUCCESS(
+            f"Stub model server on http://{options['host']}:{options['port']}/ (Ctrl+C to stop)."
+        ))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
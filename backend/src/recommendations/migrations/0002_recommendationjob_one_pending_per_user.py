@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:41
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def drop_duplicate_pending_jobs(apps, schema_editor):
+    """
+    Keeps only the oldest pending job of each user; any of them would have
+    read the same, latest profile.
+    """
+    RecommendationJob = apps.get_model('recommendations', 'RecommendationJob')
+    kept = set()
+    duplicates = []
+    for pk, user_id in RecommendationJob.objects.filter(status='pending').order_by('created_at', 'pk').values_list('pk', 'user_id'):
+        if user_id in kept:
+            duplicates.append(pk)
+        kept.add(user_id)
+    RecommendationJob.objects.filter(pk__in=duplicates).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recommendations', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_duplicate_pending_jobs, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='recommendationjob',
+            constraint=models.UniqueConstraint(condition=models.Q(('status', 'pending')), fields=('user',), name='recs_job_one_pending_per_user'),
+        ),
+    ]
@@ -0,0 +1,73 @@
+# backend/src/recommendations/models.py
+from django.db import models
+from django.conf import settings
+from products.models import Product
+
+
+class Recommendation(models.Model):
+    """
+    One slot of a user's materialized capsule. The whole capsule is rewritten
+    by a RecommendationJob, so reading it back is a single indexed query.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='recommendations')
+    rank = models.PositiveSmallIntegerField()
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='+')
+
+    # The profile / catalog versions this capsule was computed from
+    profile_version = models.PositiveBigIntegerField()
+    catalog_version = models.PositiveBigIntegerField()
+
+    class Meta:
+        constraints = [
+            # Also serves as the (user, rank) index for reading a capsule back in order
+            models.UniqueConstraint(fields=['user', 'rank'], name='recommendations_user_rank_uniq'),
+        ]
+
+    def __str__(self):
+        return f"#{self.rank} for user {self.user_id}: {self.product_id}"
+
+
+class RecommendationJob(models.Model):
+    """
+    A queued capsule recompute. Jobs live in the database so pending work
+    survives a restart; see recommendations/jobs.py for the worker pool.
+    """
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='recommendation_jobs')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True)
+
+    # What a finished job built: an empty capsule has no Recommendation rows to tell the views about it
+    profile_version = models.PositiveBigIntegerField(blank=True, null=True)
+    catalog_version = models.PositiveBigIntegerField(blank=True, null=True)
+    capsule_size = models.PositiveSmallIntegerField(blank=True, null=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='recs_job_status_created_idx'),
+            models.Index(fields=['user', 'status'], name='recs_job_user_status_idx'),
+        ]
+        constraints = [
+            # Concurrent requests for the same user share one queued job
+            models.UniqueConstraint(
+                fields=['user'], condition=models.Q(status='pending'), name='recs_job_one_pending_per_user',
+            ),
+        ]
+
+    def __str__(self):
+        return f"Recommendation job {self.pk} for user {self.user_id} ({self.status})"
@@ -0,0 +1,196 @@
+# backend/src/recommendations/outfits.py
+"""
+Outfits assembled from a user's capsule.
+
+An outfit fills the slots of a template - top, bottom, outerwear, shoes, or
+a dress in place of the top and bottom - with one capsule item each.
+Outerwear and shoes may be left out. Its score is the sum of its items'
+profile scores plus, for every pair of items, how well they go together:
+
+- color: two neutrals always work, a neutral goes with anything, two
+  pieces of the same color family are tonal, and two different statement
+  colors clash;
+- season: a summer piece and a winter piece clash;
+- style: the overlap of their style tags.
+
+All pairwise scores for the pool are computed up front as one matrix, and
+the templates are filled slot by slot with a beam search that keeps only
+the BEAM_WIDTH best partial outfits, so a 200-item pool costs a few small
+array operations per slot instead of millions of combinations.
+"""
+import numpy as np
+from django.conf import settings
+
+from products.catalog_index import get_catalog_index
+from products.tags import normalize_tag, split_tags
+from .cache import cache_outfits, get_cached_outfits
+from .engine import score_positions
+from .pagination import get_ranking
+
+TEMPLATES = (
+    ('top', 'bottom', 'outerwear', 'shoes'),
+    ('dress', 'outerwear', 'shoes'),
+)
+SLOT_CATEGORIES = {
+    'top': 'Top',
+    'bottom': 'Bottom',
+    'dress': 'Dress/ Jumpsuit',
+    'outerwear': 'Outerwear',
+    'shoes': 'Shoe',
+}
+OPTIONAL_SLOTS = ('outerwear', 'shoes')
+
+# Pairwise color scores, from best to worst
+BOTH_NEUTRAL = 1.0
+ONE_NEUTRAL = 0.75
+TONAL = 0.5
+COLOR_CLASH = -0.5
+SEASON_CLASH = -1.0
+STYLE_WEIGHT = 1.0
+
+CLASHING_SEASONS = (('summer', 'winter'),)
+
+BEAM_WIDTH = 128
+MAX_ITEM_REUSE = 2  # How many of the returned outfits one item may appear in
+
+OUTFIT_FIELDS = ('category', 'color_family', 'is_neutral', 'season', 'style')
+
+
+def compatibility_matrix(items):
+    """
+    The (n x n) pairwise compatibility scores of `items`, dicts with the
+    OUTFIT_FIELDS. The diagonal is meaningless and left at zero.
+    """
+    n = len(items)
+    neutral = np.array([bool(item['is_neutral']) for item in items])
+    families = [normalize_tag(item['color_family'] or '') for item in items]
+    family_codes = np.unique(families, return_inverse=True)[1].reshape(n)
+    same_family = (family_codes[:, None] == family_codes[None, :]) & np.array([bool(f) for f in families])[:, None]
+    color = np.where(
+        neutral[:, None] & neutral[None, :], BOTH_NEUTRAL,
+        np.where(neutral[:, None] | neutral[None, :], ONE_NEUTRAL, np.where(same_family, TONAL, COLOR_CLASH)),
+    )
+
+    seasons = np.array([normalize_tag(item['season'] or '') for item in items])
+    season = np.zeros((n, n), dtype=np.float32)
+    for a, b in CLASHING_SEASONS:
+        clash = (seasons == a)[:, None] & (seasons == b)[None, :]
+        season[clash | clash.T] = SEASON_CLASH
+
+    styles = [{normalize_tag(style) for style in split_tags(item['style'])} for item in items]
+    columns = {key: column for column, key in enumerate(sorted(set().union(*styles)))}
+    vectors = np.zeros((n, len(columns)), dtype=np.float32)
+    for row, keys in enumerate(styles):
+        vectors[row, [columns[key] for key in keys]] = 1.0
+    shared = vectors @ vectors.T
+    sizes = vectors.sum(axis=1)
+    union = sizes[:, None] + sizes[None, :] - shared
+    style = np.divide(shared, union, out=np.zeros_like(shared), where=union > 0)
+
+    matrix = (color + season + STYLE_WEIGHT * style).astype(np.float32)
+    np.fill_diagonal(matrix, 0.0)
+    return matrix
+
+
+def _beam_search(slots, candidates, item_scores, compatibility, beam_width):
+    """
+    Fills `slots` in order and returns (members, totals) for the best
+    complete outfits found: members is a (outfits x slots) array of item
+    indices, with the sentinel index len(item_scores) - 1 for an empty slot.
+    """
+    empty = len(item_scores) - 1
+    members = np.zeros((1, 0), dtype=np.intp)
+    totals = np.zeros(1, dtype=np.float32)
+    for slot in slots:
+        options = candidates[slot]
+        # Item score plus its compatibility with everything already chosen
+        gains = item_scores[options][None, :] + compatibility[members[:, :, None], options[None, None, :]].sum(axis=1)
+        grown_totals = (totals[:, None] + gains).ravel()
+        grown = np.hstack([np.repeat(members, len(options), axis=0), np.tile(options, len(members))[:, None]])
+        if slot in OPTIONAL_SLOTS:
+            grown_totals = np.concatenate([grown_totals, totals])
+            grown = np.vstack([grown, np.hstack([members, np.full((len(members), 1), empty, dtype=np.intp)])])
+        if not len(grown):
+            return grown, grown_totals
+        if len(grown) > beam_width:
+            keep = np.argpartition(-grown_totals, beam_width - 1)[:beam_width]
+            grown, grown_totals = grown[keep], grown_totals[keep]
+        members, totals = grown, grown_totals
+    return members, totals
+
+
+def build_outfits(items, item_scores, count=10, beam_width=BEAM_WIDTH):
+    """
+    The best `count` outfits from `items` (dicts with the OUTFIT_FIELDS)
+    whose profile scores are `item_scores`. Returns [(score, [item
+    indices])], best first, with no item in more than MAX_ITEM_REUSE of them.
+    """
+    n = len(items)
+    if not n:
+        return []
+    # One extra all-zero row and column stand for an empty slot
+    compatibility = np.zeros((n + 1, n + 1), dtype=np.float32)
+    compatibility[:n, :n] = compatibility_matrix(items)
+    scores = np.zeros(n + 1, dtype=np.float32)
+    scores[:n] = item_scores
+
+    categories = np.array([normalize_tag(item['category'] or '') for item in items])
+    candidates = {
+        slot: np.flatnonzero(categories == normalize_tag(category))
+        for slot, category in SLOT_CATEGORIES.items()
+    }
+
+    found = []
+    for slots in TEMPLATES:
+        members, totals = _beam_search(slots, candidates, scores, compatibility, beam_width)
+        found.extend(
+            (float(total), [i for i in outfit if i != n])
+            for outfit, total in zip(members.tolist(), totals.tolist())
+        )
+    found.sort(key=lambda outfit: -outfit[0])
+
+    # Beams are full of near-duplicates (the same look with other shoes),
+    # so cap how often each item may come back.
+    uses = np.zeros(n, dtype=np.int32)
+    outfits = []
+    for score, outfit in found:
+        if len(outfits) == count:
+            break
+        if uses[outfit].max() < MAX_ITEM_REUSE:
+            uses[outfit] += 1
+            outfits.append((score, outfit))
+    return outfits
+
+
+def pool_items(index, positions):
+    """
+    The OUTFIT_FIELDS of the products at `positions`, in the same order,
+    read off the catalog index's bitsets instead of the database. Values are
+    the comma-separated tag keys, so is_neutral is "true" or empty.
+    """
+    tags = {field: index.tags_at(field, positions) for field in OUTFIT_FIELDS}
+    return [
+        {field: ','.join(sorted(tags[field][i])) for field in OUTFIT_FIELDS}
+        for i in range(len(positions))
+    ]
+
+
+def get_outfits(user_id, profile, version, catalog_version):
+    """
+    The user's outfits as [(score, [catalog positions])], cached next to
+    their ranking. The pool is the first OUTFIT_POOL_SIZE items of the
+    ranking, i.e. the capsule unless the setting enlarges it.
+    """
+    outfits = get_cached_outfits(user_id, version, catalog_version)
+    if outfits is not None:
+        return outfits
+
+    # The ranking was built from this catalog version, so its positions are all current
+    index = get_catalog_index(catalog_version)
+    pool = get_ranking(user_id, profile, version, catalog_version)[:settings.OUTFIT_POOL_SIZE].astype(np.intp)
+    picked = build_outfits(
+        pool_items(index, pool), score_positions(index, profile, pool), count=settings.OUTFIT_COUNT,
+    )
+    outfits = [(score, [int(pool[i]) for i in outfit]) for score, outfit in picked]
+    cache_outfits(user_id, version, catalog_version, outfits)
+    return outfits
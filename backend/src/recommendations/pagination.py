@@ -0,0 +1,116 @@
+# backend/src/recommendations/pagination.py
+"""
+ETags and cursors for /api/recommendations/.
+
+The first page is the 40-item capsule; later pages walk the rest of the
+user's ranking (see engines.rank_profile), which is cached as a compact
+array, so paging never re-runs the scoring pipeline.
+
+A user's page is fully determined by (profile version, catalog version,
+offset), so that triple is the cursor and, with the user id, the strong
+ETag. A client holding the current ETag gets a 304 before we touch the
+cache or the database, and a cursor taken from an older profile or catalog
+answers 410 Gone rather than silently mixing two rankings.
+"""
+import base64
+import binascii
+
+from asgiref.sync import sync_to_async
+
+from products.catalog_index import get_catalog_index
+from .cache import aget_cached_ranking, cache_ranking, get_cached_ranking
+from .engine import CAPSULE_SIZE
+from .engines import rank_profile
+
+PAGE_SIZE = CAPSULE_SIZE
+
+
+def make_etag(user_id, profile_version, catalog_version, offset=0):
+    # Two users' versions can coincide, and a shared cache must not mix them up
+    return f'"{user_id}.{profile_version:x}.{catalog_version:x}.{offset}"'
+
+
+def etag_matches(request, etag, exists=False):
+    """
+    True if the request's If-None-Match covers `etag`. Weak tags match too,
+    as RFC 9110 asks for GET. `*` only matches when `exists`, i.e. the
+    caller has a page to send; a 202 or an error is not a representation.
+    """
+    header = request.headers.get('If-None-Match')
+    if not header:
+        return False
+    if header.strip() == '*':
+        return exists
+    return any(tag.strip().removeprefix('W/') == etag for tag in header.split(','))
+
+
+def encode_cursor(profile_version, catalog_version, offset):
+    raw = f'{profile_version}:{catalog_version}:{offset}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Returns (profile version, catalog version, offset); raises ValueError for
+    anything we didn't hand out.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        profile_version, catalog_version, offset = (int(part) for part in raw.split(':'))
+    except (binascii.Error, UnicodeDecodeError, ValueError) as e:
+        raise ValueError("Invalid cursor.") from e
+    if offset < 0 or offset % PAGE_SIZE:
+        raise ValueError("Invalid cursor.")
+    return profile_version, catalog_version, offset
+
+
+def next_link(request, profile_version, catalog_version, offset):
+    url = request.build_absolute_uri(request.path)
+    return f'<{url}?cursor={encode_cursor(profile_version, catalog_version, offset)}>; rel="next"'
+
+
+def get_ranking(user_id, profile, version, catalog_version):
+    """
+    The user's cached ranking, rebuilt (and re-cached) if it has been
+    evicted. The capsule job caches it when it runs, so this is rare.
+    """
+    ranking = get_cached_ranking(user_id, version, catalog_version)
+    if ranking is None:
+        ranking = rank_profile(profile, get_catalog_index(catalog_version))
+        cache_ranking(user_id, version, catalog_version, ranking)
+    return ranking
+
+
+def has_next_page(user_id, profile, version, catalog_version):
+    """
+    Whether the ranking runs past the capsule, i.e. whether the first page
+    gets a next link.
+    """
+    return PAGE_SIZE < len(get_ranking(user_id, profile, version, catalog_version))
+
+
+async def ahas_next_page(user_id, profile, version, catalog_version):
+    """
+    Async version of has_next_page; only rebuilding an evicted ranking
+    leaves the event loop.
+    """
+    ranking = await aget_cached_ranking(user_id, version, catalog_version)
+    if ranking is None:
+        ranking = await sync_to_async(get_ranking)(user_id, profile, version, catalog_version)
+    return PAGE_SIZE < len(ranking)
+
+
+def ranking_page(ranking, catalog_version, offset, size=PAGE_SIZE):
+    """
+    The products at ranking[offset:offset + size], as the JSON fragments the
+    catalog index holds (no query), and whether more pages follow.
+    """
+    index = get_catalog_index(catalog_version)
+    return [index.fragment(int(position)) for position in ranking[offset:offset + size]], offset + size < len(ranking)
+
+
+def load_page(user_id, profile, version, catalog_version, offset):
+    """
+    The page at `offset` of the user's ranking, and whether more follow.
+    """
+    return ranking_page(get_ranking(user_id, profile, version, catalog_version), catalog_version, offset)
@@ -0,0 +1,410 @@
+import base64
+import io
+import itertools
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest import mock
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, connection, transaction
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import AccessToken
+
+from products.catalog_index import CatalogIndex, get_catalog_index
+from products.tests import make_product
+from products.versioning import get_catalog_version
+from users import cache as user_cache
+from users.models import UserAccount, UserProfile
+from .cache import cache_ranking, get_cached_ranking, profile_version
+from .engines import rank_profiles
+from .engines.base import EngineUnavailable, RecommendationEngine
+from .engines.batching import MicroBatcher
+from .engines.model import ModelEngine
+from .engine import CAPSULE_SIZE
+from .engines.rules import RuleEngine
+from .jobs import enqueue_recompute, has_recent_job, run_job
+from .models import Recommendation, RecommendationJob
+from .outfits import MAX_ITEM_REUSE, build_outfits, compatibility_matrix
+from .pagination import PAGE_SIZE, decode_cursor, encode_cursor, etag_matches, has_next_page, make_etag
+
+
+class PaginationTests(SimpleTestCase):
+    def request(self, if_none_match=None):
+        headers = {} if if_none_match is None else {'HTTP_IF_NONE_MATCH': if_none_match}
+        return RequestFactory().get('/api/recommendations/', **headers)
+
+    def test_etag_matches(self):
+        etag = make_etag(7, 123, 45)
+        self.assertFalse(etag_matches(self.request(), etag))
+        self.assertTrue(etag_matches(self.request(etag), etag))
+        self.assertTrue(etag_matches(self.request(f'"x", W/{etag}'), etag))
+        self.assertFalse(etag_matches(self.request(make_etag(8, 123, 45)), etag))
+        self.assertFalse(etag_matches(self.request(make_etag(7, 123, 45, PAGE_SIZE)), etag))
+
+    def test_star_only_matches_an_existing_page(self):
+        etag = make_etag(7, 123, 45)
+        self.assertFalse(etag_matches(self.request('*'), etag))
+        self.assertTrue(etag_matches(self.request(' * '), etag, exists=True))
+
+    def test_cursor_round_trip(self):
+        cursor = encode_cursor(123, 45, 2 * PAGE_SIZE)
+        self.assertNotIn('=', cursor)
+        self.assertEqual(decode_cursor(cursor), (123, 45, 2 * PAGE_SIZE))
+
+    def test_decode_cursor_rejects_anything_we_did_not_hand_out(self):
+        def encode(raw):
+            return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+        for cursor in (
+            '', '!!!', 'a', encode(b'1:2'), encode(b'1:2:3:4'), encode(b'1:x:0'), encode(b'\xff\xfe'),
+            encode(f'1:2:{PAGE_SIZE + 1}'.encode()), encode(f'1:2:{-PAGE_SIZE}'.encode()),
+        ):
+            with self.subTest(cursor=cursor), self.assertRaises(ValueError):
+                decode_cursor(cursor)
+
+    def test_next_page_follows_the_ranking_length(self):
+        cache_ranking(7, 123, 45, np.arange(PAGE_SIZE))
+        self.assertFalse(has_next_page(7, None, 123, 45))
+        cache_ranking(7, 123, 45, np.arange(PAGE_SIZE + 1))
+        self.assertTrue(has_next_page(7, None, 123, 45))
+
+
+def make_index():
+    rows = [{'item_id': f'P{i}', 'item_name': '', 'image_url': '', 'category': 'Top'} for i in range(12)]
+    index = CatalogIndex.from_postings(rows, {
+        'body_type': {'Pear': list(range(12))},
+        'lifestyle': {'Office': list(range(0, 12, 2)), 'Weekend': list(range(1, 12, 2))},
+        'style': {'Classic': [0, 1, 2, 3], 'Boho': [4, 5, 6]},
+        'category': {'Top': list(range(12))},
+    })
+    index.version = 1
+    return index
+
+
+def make_profile(lifestyle):
+    return SimpleNamespace(
+        primary_body_type='Pear', secondary_body_type=None, weekday_lifestyle=lifestyle,
+        weekend_lifestyle='', wardrobe_percentages={}, style_scores={'Classic': 1.0},
+    )
+
+
+class PartialEngine(RecommendationEngine):
+    """
+    Answers "Office" profiles and runs out of time on the rest.
+    """
+    name = 'partial'
+    calls = 0
+
+    def rank_many(self, profiles, index, size, timeout=None):
+        PartialEngine.calls += 1
+        return [np.array([11, 10]) if profile.weekday_lifestyle == 'Office' else None for profile in profiles]
+
+
+class DownEngine(RecommendationEngine):
+    name = 'down'
+
+    def rank_many(self, profiles, index, size, timeout=None):
+        raise EngineUnavailable("down for maintenance")
+
+
+class SlowModelEngine(ModelEngine):
+    def _infer(self, requests):
+        time.sleep(0.5)
+        return [['P1'] for _ in requests]
+
+
+class EngineTests(SimpleTestCase):
+    def setUp(self):
+        caches[settings.RECOMMENDATION_CACHE_ALIAS].clear()
+
+    @override_settings(RECOMMENDATION_ENGINE='recommendations.tests.PartialEngine')
+    def test_profiles_the_engine_misses_fall_back_to_the_rules(self):
+        index = make_index()
+        office, weekend = make_profile('Office'), make_profile('Weekend')
+        with self.assertLogs('recommendations.engines', 'WARNING'):
+            rankings = rank_profiles([office, weekend], index, size=5)
+        self.assertEqual(rankings[0].tolist(), [11, 10])
+        self.assertEqual(rankings[1].tolist(), RuleEngine().rank_many([weekend], index, 5)[0].tolist())
+
+        # Only the engine's own answers are cached; the miss gets another try
+        PartialEngine.calls = 0
+        self.assertEqual(rank_profiles([office], index, size=5)[0].tolist(), [11, 10])
+        self.assertEqual(PartialEngine.calls, 0)
+        with self.assertLogs('recommendations.engines', 'WARNING'):
+            rank_profiles([weekend], index, size=5)
+        self.assertEqual(PartialEngine.calls, 1)
+
+    @override_settings(RECOMMENDATION_ENGINE='recommendations.tests.DownEngine')
+    def test_an_unavailable_engine_falls_back_to_the_rules(self):
+        index = make_index()
+        profile = make_profile('Office')
+        with self.assertLogs('recommendations.engines', 'WARNING') as logs:
+            ranking = rank_profiles([profile], index, size=5)[0]
+        self.assertIn('down for maintenance', logs.output[0])
+        self.assertEqual(ranking.tolist(), RuleEngine().rank_many([profile], index, 5)[0].tolist())
+
+    def test_model_engine_gives_up_at_the_deadline(self):
+        engine = SlowModelEngine(url='http://127.0.0.1:1/rank', batch_wait=0)
+        started = time.monotonic()
+        self.assertEqual(engine.rank_many([make_profile('Office')], make_index(), 5, timeout=0.05), [None])
+        self.assertLess(time.monotonic() - started, 0.4)
+
+    def test_model_engine_drops_unknown_and_repeated_items(self):
+        engine = ModelEngine(url='http://127.0.0.1:1/rank', batch_wait=0)
+        positions = engine._positions(['P3', 'nope', 'P1', 'P3', 7, 'P2'], make_index(), 2)
+        self.assertEqual(positions.tolist(), [3, 1])
+
+
+class MicroBatcherTests(SimpleTestCase):
+    def test_concurrent_calls_share_a_batch(self):
+        batches = []
+
+        def handler(items):
+            batches.append(list(items))
+            return [item * 2 for item in items]
+
+        batcher = MicroBatcher(handler, max_size=3, max_wait=0.2)
+        futures = [batcher.submit(i) for i in range(5)]
+        self.assertEqual([future.result(timeout=2) for future in futures], [0, 2, 4, 6, 8])
+        self.assertEqual(batches, [[0, 1, 2], [3, 4]])
+
+    def test_a_failed_batch_fails_its_callers_only(self):
+        def handler(items):
+            if 'bad' in items:
+                raise ValueError('bad batch')
+            return items
+
+        batcher = MicroBatcher(handler, max_size=10, max_wait=0)
+        with self.assertLogs('recommendations.engines.batching', 'WARNING'), self.assertRaises(ValueError):
+            batcher.submit('bad').result(timeout=2)
+        self.assertEqual(batcher.submit('good').result(timeout=2), 'good')
+
+    def test_cancelled_calls_are_left_out(self):
+        release = threading.Event()
+        batches = []
+
+        def handler(items):
+            release.wait(2)
+            batches.append(list(items))
+            return items
+
+        batcher = MicroBatcher(handler, max_size=10, max_wait=0)
+        first = batcher.submit('first')  # Holds the worker thread
+        time.sleep(0.05)
+        cancelled, kept = batcher.submit('cancelled'), batcher.submit('kept')
+        self.assertTrue(cancelled.cancel())
+        release.set()
+        self.assertEqual(kept.result(timeout=2), 'kept')
+        self.assertEqual(first.result(timeout=2), 'first')
+        self.assertEqual(batches, [['first'], ['kept']])
+
+
+class JobQueueTests(TestCase):
+    def setUp(self):
+        self.user = UserAccount.objects.create(email='jobs@example.com', first_name='A', last_name='B', password='!')
+
+    def enqueue(self):
+        # Keeps the worker pool out of it; the tests run the jobs themselves
+        with self.captureOnCommitCallbacks() as callbacks:
+            job = enqueue_recompute(self.user.pk)
+        return job, callbacks
+
+    def test_one_pending_job_per_user(self):
+        job, callbacks = self.enqueue()
+        self.assertEqual(len(callbacks), 1)
+        again, callbacks = self.enqueue()
+        self.assertEqual((again.pk, callbacks), (job.pk, []))
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            RecommendationJob.objects.create(user=self.user)
+
+    def test_a_job_runs_once(self):
+        job, _ = self.enqueue()
+        with mock.patch('recommendations.jobs.materialize_recommendations') as materialize:
+            run_job(job.pk)
+            run_job(job.pk)
+        materialize.assert_called_once_with(self.user.pk, job_id=job.pk)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (RecommendationJob.DONE, 1))
+        self.assertFalse(has_recent_job(self.user.pk))
+
+    @override_settings(RECOMMENDATION_JOB_RETRY_AFTER=300)
+    def test_failed_jobs_back_off(self):
+        job, _ = self.enqueue()
+        with mock.patch('recommendations.jobs.materialize_recommendations', side_effect=RuntimeError('boom')), \
+                self.assertLogs('recommendations.jobs', 'ERROR'):
+            run_job(job.pk)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.error), (RecommendationJob.FAILED, 'boom'))
+        self.assertTrue(has_recent_job(self.user.pk))
+
+        RecommendationJob.objects.filter(pk=job.pk).update(finished_at=timezone.now() - timedelta(seconds=301))
+        self.assertFalse(has_recent_job(self.user.pk))
+        # A fresh job can be queued while the failed one stays on record
+        self.assertNotEqual(self.enqueue()[0].pk, job.pk)
+
+    def test_stale_running_jobs_are_reclaimed(self):
+        job, _ = self.enqueue()
+        RecommendationJob.objects.filter(pk=job.pk).update(
+            status=RecommendationJob.RUNNING, started_at=timezone.now() - timedelta(days=1), attempts=1,
+        )
+        with mock.patch('recommendations.jobs.materialize_recommendations'):
+            run_job(job.pk)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (RecommendationJob.DONE, 2))
+
+    def test_a_profile_matching_no_products_gets_an_empty_capsule(self):
+        make_product('PEAR-1').save()
+        UserProfile.objects.filter(user=self.user).update(primary_body_type='Apple', weekday_lifestyle='Office')
+        job, _ = self.enqueue()
+        run_job(job.pk)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.capsule_size), (RecommendationJob.DONE, 0))
+
+        user_cache.clear()
+        self.addCleanup(user_cache.clear)
+        headers = {'Authorization': f'JWT {AccessToken.for_user(self.user)}'}
+        for name in ('get-recommendations', 'get-recommendations-async'):
+            with self.subTest(view=name):
+                response = self.client.get(reverse(name), headers=headers)
+                self.assertEqual((response.status_code, response.json()), (200, []))
+                response = self.client.get(reverse(name), headers={**headers, 'If-None-Match': response['ETag']})
+                self.assertEqual(response.status_code, 304)
+        # Nothing else was queued for the empty capsule
+        self.assertEqual(RecommendationJob.objects.filter(user=self.user).count(), 1)
+
+
+class GenerateRecommendationsTests(TestCase):
+    def setUp(self):
+        for number in range(CAPSULE_SIZE + 5):
+            make_product(f'PEAR-{number}').save()
+        self.users = [
+            UserAccount.objects.create(email=f'bulk{number}@example.com', first_name='A', last_name='B', password='!')
+            for number in range(5)
+        ]
+        UserProfile.objects.update(primary_body_type='Pear', weekday_lifestyle='Office')
+        self.checkpoint = os.path.join(tempfile.mkdtemp(), 'checkpoint.json')
+
+    def generate(self, **options):
+        stdout = io.StringIO()
+        call_command('generate_recommendations', workers=0, chunk_size=2, checkpoint=self.checkpoint,
+                     stdout=stdout, **options)
+        return stdout.getvalue()
+
+    def test_capsules_are_written_and_rankings_cached(self):
+        opened = connection.connection
+        output = self.generate()
+        # Scoring in-process leaves this process's connection alone
+        self.assertIs(connection.connection, opened)
+        self.assertIn('5 profiles done', output)
+        self.assertFalse(os.path.exists(self.checkpoint))
+
+        catalog_version = get_catalog_version()
+        index = get_catalog_index(catalog_version)
+        for profile in UserProfile.objects.all():
+            version = profile_version(profile)
+            rows = list(Recommendation.objects.filter(user_id=profile.user_id).order_by('rank').values_list(
+                'product_id', 'profile_version', 'catalog_version',
+            ))
+            self.assertEqual({row[1:] for row in rows}, {(version, catalog_version)})
+            # The capsule heads the cached ranking behind the later pages
+            ranking = get_cached_ranking(profile.user_id, version, catalog_version)
+            self.assertEqual(len(ranking), CAPSULE_SIZE + 5)
+            self.assertEqual([row[0] for row in rows], [index.item_ids[p] for p in ranking[:CAPSULE_SIZE].tolist()])
+
+    def test_an_interrupted_run_resumes_after_its_checkpoint(self):
+        with open(self.checkpoint, 'w') as file:
+            json.dump({'since': None, 'last_user_id': self.users[2].pk}, file)
+        output = self.generate()
+        self.assertIn(f'Resuming after user {self.users[2].pk}.', output)
+        self.assertEqual(
+            set(Recommendation.objects.values_list('user_id', flat=True)), {user.pk for user in self.users[3:]},
+        )
+
+        with open(self.checkpoint, 'w') as file:
+            json.dump({'since': '2020-01-01', 'last_user_id': self.users[2].pk}, file)
+        with self.assertRaises(CommandError):
+            self.generate()
+
+
+def outfit_item(category, color_family='Red', is_neutral=False, season='Summer', style='Classic'):
+    return {'category': category, 'color_family': color_family, 'is_neutral': is_neutral, 'season': season,
+            'style': style}
+
+
+class OutfitTests(SimpleTestCase):
+    def make_pool(self, size):
+        rng = random.Random(7)
+        items = [
+            outfit_item(
+                rng.choice(['Top', 'Bottom', 'Dress/ Jumpsuit', 'Outerwear', 'Shoe']),
+                color_family=rng.choice(['Red', 'Blue', 'Black']),
+                is_neutral=rng.random() < 0.3,
+                season=rng.choice(['Summer', 'Winter', 'All Season']),
+                style=rng.choice(['Classic', 'Boho', 'Classic,Edgy']),
+            )
+            for _ in range(size)
+        ]
+        return items, np.array([rng.random() for _ in items], dtype=np.float32)
+
+    def score(self, items, item_scores, outfit):
+        compatibility = compatibility_matrix(items)
+        pairs = sum(float(compatibility[a, b]) for a, b in itertools.combinations(outfit, 2))
+        return float(item_scores[outfit].sum()) + pairs
+
+    def is_valid(self, items, outfit):
+        categories = sorted(items[i]['category'] for i in outfit)
+        extras = [category for category in categories if category in ('Outerwear', 'Shoe')]
+        core = [category for category in categories if category not in ('Outerwear', 'Shoe')]
+        return core in (['Bottom', 'Top'], ['Dress/ Jumpsuit']) and len(set(extras)) == len(extras)
+
+    def test_compatibility(self):
+        matrix = compatibility_matrix([
+            outfit_item('Top', 'Black', True), outfit_item('Bottom', 'White', True), outfit_item('Shoe', 'Red'),
+            outfit_item('Top', 'Blue'), outfit_item('Outerwear', 'Red', season='Winter'),
+        ])
+        np.testing.assert_array_equal(matrix, matrix.T)
+        self.assertEqual(matrix[0, 1], 1.0 + 1.0)  # Both neutral, same style
+        self.assertEqual(matrix[0, 2], 0.75 + 1.0)
+        self.assertEqual(matrix[2, 3], -0.5 + 1.0)  # Two statement colors
+        self.assertEqual(matrix[2, 4], 0.5 - 1.0 + 1.0)  # Tonal, but summer with winter
+
+    def test_outfits_are_valid_best_first_and_varied(self):
+        items, item_scores = self.make_pool(60)
+        outfits = build_outfits(items, item_scores, count=10)
+        self.assertEqual(len(outfits), 10)
+        scores = [score for score, _ in outfits]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+        uses = {}
+        for score, outfit in outfits:
+            self.assertTrue(self.is_valid(items, outfit), [items[i]['category'] for i in outfit])
+            self.assertEqual(len(set(outfit)), len(outfit))
+            self.assertAlmostEqual(score, self.score(items, item_scores, outfit), places=4)
+            for i in outfit:
+                uses[i] = uses.get(i, 0) + 1
+        self.assertLessEqual(max(uses.values()), MAX_ITEM_REUSE)
+
+    def test_a_wide_beam_finds_the_best_outfit(self):
+        items, item_scores = self.make_pool(16)
+        best = max(
+            (outfit for size in range(1, 5) for outfit in itertools.combinations(range(len(items)), size)
+             if self.is_valid(items, outfit)),
+            key=lambda outfit: self.score(items, item_scores, list(outfit)),
+        )
+        score, outfit = build_outfits(items, item_scores, count=1, beam_width=10_000)[0]
+        self.assertEqual(sorted(outfit), list(best))
+
+    def test_no_outfit_without_its_required_pieces(self):
+        items = [outfit_item('Top'), outfit_item('Shoe'), outfit_item('Outerwear')]
+        self.assertEqual(build_outfits(items, np.ones(3, dtype=np.float32)), [])
+        self.assertEqual(build_outfits([], np.zeros(0, dtype=np.float32)), [])
@@ -0,0 +1,39 @@
+# backend/src/recommender_project/db.py
+"""
+Connection handling around forked worker processes.
+
+Every alias runs on a psycopg connection pool (see settings.DATABASES), and
+connections.close_all() only hands connections back to their pool: a child
+forked after it would inherit the pool object with its open sockets, but not
+the threads that run it, and would share those sockets with the parent and
+its siblings. So the parent closes the pools themselves before forking
+(close_pools), and the child forgets whatever it inherited anyway without
+closing it (drop_inherited_connections), since closing an inherited
+connection would end the parent's session too.
+"""
+from django.db import connections
+
+
+def close_pools():
+    """
+    Closes every connection and connection pool of this process. The pools
+    are recreated on the next query.
+    """
+    for alias in connections:
+        connection = connections[alias]
+        connection.close()
+        # Only the postgresql backend pools
+        if hasattr(connection, 'close_pool'):
+            connection.close_pool()
+
+
+def drop_inherited_connections():
+    """
+    For a forked child: forgets the parent's connections and pools, so this
+    process opens its own on its first query.
+    """
+    for connection in connections.all(initialized_only=True):
+        connection.connection = None
+        pools = getattr(connection, '_connection_pools', None)
+        if pools:
+            pools.clear()
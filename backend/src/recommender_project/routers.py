@@ -0,0 +1,202 @@
+# backend/src/recommender_project/routers.py
+"""
+Read-replica routing.
+
+Writes always go to the primary ('default'), and so do reads unless the code
+doing them opts in with `replica_reads`: the read-only paths (catalog index
+loads, recommendations, search, browse) run inside it, and their queries go
+to one of settings.DATABASE_REPLICAS instead.
+
+- Each replica_reads block picks one replica, round-robin, and keeps it for
+  all of its queries, so they see one consistent point in the replication
+  stream. Nested blocks share the outer block's choice.
+- A replica that fails a query (an OperationalError) is skipped for
+  DATABASE_REPLICA_RETRY_SECONDS; used as a decorator, replica_reads then
+  runs the function again on the primary, since it only reads.
+- Read-after-write: a quiz submission pins its user to the primary for
+  DATABASE_REPLICA_STICKY_SECONDS (see pin_to_primary). Authentication
+  calls note_user as soon as it knows who is asking, and a pinned user's
+  reads, their profile included, stay on the primary. Pins live in the
+  default cache: with the local-memory default they only hold within the
+  process that saved the quiz, so use Redis when running replicas.
+- `replica_reads(catalog_version=v)` only uses a replica that has already
+  replayed catalog version v. The per-process catalog indexes are labelled
+  with the version they were built for, so a replica lagging behind it
+  must not build them.
+
+Without replicas all of this is a no-op.
+"""
+import contextlib
+import contextvars
+import functools
+import itertools
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, OperationalError
+
+# These are read to decide what to write next, so never from a replica
+PRIMARY_ONLY_MODELS = {'products.catalogversion', 'products.catalogchange', 'recommendations.recommendationjob'}
+
+# (replica alias or None for the primary, whether the user is pinned to the primary)
+_state = contextvars.ContextVar('replica_state', default=(None, False))
+
+_down_until = {}  # alias -> time.monotonic() it may be tried again
+_turns = itertools.count()
+_lock = threading.Lock()
+
+
+def pin_key(user_id):
+    return f'db:pinned:{user_id}'
+
+
+def pin_to_primary(user_ids):
+    """
+    Keeps the reads of `user_ids` on the primary for the next
+    DATABASE_REPLICA_STICKY_SECONDS, until the replicas have their writes.
+    """
+    if settings.DATABASE_REPLICAS and user_ids:
+        cache.set_many(dict.fromkeys(map(pin_key, user_ids), True), settings.DATABASE_REPLICA_STICKY_SECONDS)
+
+
+async def apin_to_primary(user_ids):
+    if settings.DATABASE_REPLICAS and user_ids:
+        await cache.aset_many(dict.fromkeys(map(pin_key, user_ids), True), settings.DATABASE_REPLICA_STICKY_SECONDS)
+
+
+def note_user(user_id):
+    """
+    Tells the router whose request this is: a user pinned by a recent write
+    has the rest of the request read from the primary.
+    """
+    if reading_replica() and cache.get(pin_key(user_id)):
+        _state.set((None, True))
+
+
+async def anote_user(user_id):
+    if reading_replica() and await cache.aget(pin_key(user_id)):
+        _state.set((None, True))
+
+
+def reading_replica():
+    return _state.get()[0] is not None
+
+
+def mark_down(alias):
+    with _lock:
+        _down_until[alias] = time.monotonic() + settings.DATABASE_REPLICA_RETRY_SECONDS
+
+
+def healthy_replicas():
+    now = time.monotonic()
+    return [alias for alias in settings.DATABASE_REPLICAS if _down_until.get(alias, 0) <= now]
+
+
+def choose_replica(catalog_version=None):
+    """
+    The next healthy replica in turn (one that has reached `catalog_version`,
+    if given), or None to use the primary.
+    """
+    replicas = healthy_replicas()
+    if not replicas:
+        return None
+    start = next(_turns)
+    for offset in range(len(replicas)):
+        alias = replicas[(start + offset) % len(replicas)]
+        if catalog_version is None:
+            return alias
+        try:
+            if _replayed_version(alias) >= catalog_version:
+                return alias
+        except OperationalError:
+            mark_down(alias)
+    return None
+
+
+def _replayed_version(alias):
+    from products.models import CatalogVersion
+
+    return CatalogVersion.objects.using(alias).filter(pk=1).values_list('version', flat=True).first() or 0
+
+
+class replica_reads:
+    """
+    Context manager and decorator (for sync and async functions) that sends
+    the reads inside it to a replica; see the module docstring.
+    """
+
+    def __init__(self, catalog_version=None):
+        self.catalog_version = catalog_version
+        self._tokens = []
+
+    def __enter__(self):
+        alias, pinned = _state.get()
+        if self.catalog_version is not None:
+            # Catalog data isn't the user's, so even a pinned user may read it from a replica
+            alias = choose_replica(self.catalog_version) if settings.DATABASE_REPLICAS else None
+        elif alias is None and not pinned:
+            alias = choose_replica() if settings.DATABASE_REPLICAS else None
+        self._tokens.append(_state.set((alias, pinned)))
+        return alias
+
+    def __exit__(self, exc_type, exc, tb):
+        alias, _ = _state.get()
+        _state.reset(self._tokens.pop())
+        if alias is not None and isinstance(exc, OperationalError):
+            mark_down(alias)
+
+    def __call__(self, func):
+        if iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                alias = None
+                try:
+                    with replica_reads(self.catalog_version) as alias:
+                        return await func(*args, **kwargs)
+                except OperationalError:
+                    if alias is None:
+                        raise
+                with on_primary():
+                    return await func(*args, **kwargs)
+        else:
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                alias = None
+                try:
+                    with replica_reads(self.catalog_version) as alias:
+                        return func(*args, **kwargs)
+                except OperationalError:
+                    if alias is None:
+                        raise
+                with on_primary():
+                    return func(*args, **kwargs)
+        return wrapper
+
+
+@contextlib.contextmanager
+def on_primary():
+    """
+    Sends the reads inside it to the primary, even within replica_reads.
+    """
+    token = _state.set((None, True))
+    try:
+        yield
+    finally:
+        _state.reset(token)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if model._meta.label_lower in PRIMARY_ONLY_MODELS:
+            return DEFAULT_DB_ALIAS
+        return _state.get()[0] or DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Every alias holds the same data
+        return True
@@ -56,9 +56,12 @@ INSTALLED_APPS = [
     'products',
     'api',
     'quiz',
+    'recommendations',
+    'benchmarks',
 ]
 
 MIDDLEWARE = [
+    'api.middleware.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -100,9 +103,33 @@ DATABASES = {
         'HOST': os.environ.get('DATABASE_HOST'), # This will be 'db' from our .env
         'PASSWORD': os.environ.get('POSTGRES_PASSWORD'),
         'PORT': 5432,
+        'OPTIONS': {
+            # Each process keeps a pool of open connections per alias (psycopg 3)
+            'pool': {
+                'min_size': int(os.environ.get('DATABASE_POOL_MIN_SIZE', 2)),
+                'max_size': int(os.environ.get('DATABASE_POOL_MAX_SIZE', 10)),
+                'timeout': 10,
+            },
+        },
     }
 }
 
+# Read replicas of 'default', e.g. DATABASE_REPLICA_HOSTS=db-replica-1,db-replica-2.
+# Read-only paths (catalog index loads, recommendations, search, browse) read
+# from them; see recommender_project/routers.py.
+for number, host in enumerate(filter(None, os.environ.get('DATABASE_REPLICA_HOSTS', '').split(',')), start=1):
+    DATABASES[f'replica{number}'] = {
+        **DATABASES['default'],
+        'HOST': host.strip(),
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['recommender_project.routers.ReplicaRouter']
+# How long after a quiz submission the user's reads stay on the primary; cover the replication lag
+DATABASE_REPLICA_STICKY_SECONDS = int(os.environ.get('DATABASE_REPLICA_STICKY_SECONDS', 10))
+# How long a replica that failed a query is skipped before it is tried again
+DATABASE_REPLICA_RETRY_SECONDS = 30
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -151,12 +178,21 @@ REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework_simplejwt.authentication.JWTAuthentication',
     ),
+    # orjson, plus pass-through for pre-serialized product JSON (see api/renderers.py)
+    'DEFAULT_RENDERER_CLASSES': (
+        'api.renderers.FragmentJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
 }
 
 SIMPLE_JWT = {
     'AUTH_HEADER_TYPES': ('JWT',), # We will use "JWT <token>" in our headers
 }
 
+# Per-process cache behind users.authentication.CachedJWTAuthentication (see users/cache.py)
+USER_CACHE_TTL = 5 # Seconds other processes may keep serving a user/profile after it changes, without a shared default cache
+USER_CACHE_MAX_ENTRIES = 10000
+
 DJOSER = {
     'USER_ID_FIELD': 'id',
     'LOGIN_FIELD': 'email',
@@ -179,4 +215,107 @@ CORS_ALLOWED_ORIGINS = [
 # In production, you would change this to your actual frontend domain, e.g.:
 # CORS_ALLOWED_ORIGINS = [
 #     "https://www.your-style-engine.com",
-# ]
\ No newline at end of file
+# ]
+
+# --- CACHING ---
+
+# By default every worker gets bounded, LRU-evicting local-memory caches.
+# Set REDIS_URL to share them between workers and servers instead
+# (needs the `redis` package).
+REDIS_URL = os.environ.get('REDIS_URL')
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+            'KEY_PREFIX': 'default',
+        },
+        'recommendations': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+            'KEY_PREFIX': 'recommendations',
+        },
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'default',
+        },
+        'recommendations': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'recommendations',
+            'OPTIONS': {
+                'MAX_ENTRIES': int(os.environ.get('RECOMMENDATION_CACHE_MAX_ENTRIES', 10000)),
+            },
+        },
+    }
+
+# --- RECOMMENDATION ENGINE ---
+
+RECOMMENDATION_CACHE_ALIAS = 'recommendations'
+RECOMMENDATION_CACHE_TIMEOUT = 60 * 60 * 24 # Entries are versioned, so this only bounds memory
+
+# How long a process may keep using its cached copy of the catalog version
+CATALOG_VERSION_TTL = 5
+
+# Background capsule recomputes (see recommendations/jobs.py)
+RECOMMENDATION_WORKERS = int(os.environ.get('RECOMMENDATION_WORKERS', 2))
+RECOMMENDATION_JOB_STALE_AFTER = 300 # Seconds before a "running" job is assumed dead and retried
+RECOMMENDATION_JOB_RETRY_AFTER = 300 # Seconds after a failed job before a read may queue another
+
+# Which engine ranks the catalog for a profile (see recommendations/engines/). Rankings
+# that don't arrive within RECOMMENDATION_ENGINE_TIMEOUT seconds come from the rule engine.
+RECOMMENDATION_ENGINE = os.environ.get('RECOMMENDATION_ENGINE', 'recommendations.engines.rules.RuleEngine')
+RECOMMENDATION_ENGINE_TIMEOUT = float(os.environ.get('RECOMMENDATION_ENGINE_TIMEOUT', 2.0))
+# Model server behind recommendations.engines.model.ModelEngine (`manage.py run_stub_model_server` fakes one)
+RECOMMENDATION_MODEL_URL = os.environ.get('RECOMMENDATION_MODEL_URL', 'http://127.0.0.1:8765/rank')
+RECOMMENDATION_MODEL_BATCH_SIZE = 32 # Profiles per inference request
+RECOMMENDATION_MODEL_BATCH_WAIT = 0.01 # Seconds a call waits for others to share its request
+
+# Outfits served by /api/recommendations/outfits/ (see recommendations/outfits.py).
+# They are assembled from the first OUTFIT_POOL_SIZE items of the user's ranking
+# (40 = the capsule itself; up to 400).
+OUTFIT_POOL_SIZE = int(os.environ.get('OUTFIT_POOL_SIZE', 40))
+OUTFIT_COUNT = 10
+
+# Largest upload accepted by /api/quiz/batch/; use `manage.py import_quizzes` for bigger files
+QUIZ_BATCH_MAX_ITEMS = 1000
+
+# How quiz answers are scored (see quiz/rules.py); edits are picked up without a restart,
+# within QUIZ_RULES_CHECK_INTERVAL seconds
+QUIZ_RULES_PATH = os.environ.get('QUIZ_RULES_PATH', BASE_DIR / 'quiz' / 'scoring_rules.json')
+QUIZ_RULES_CHECK_INTERVAL = 2.0
+
+# Compiled catalog snapshot shared by all workers on a machine (see products/snapshot.py).
+# Written by `manage.py compile_catalog`; leave unset to build the index from the database.
+CATALOG_SNAPSHOT_PATH = os.environ.get('CATALOG_SNAPSHOT_PATH')
+
+# --- PRODUCT SEARCH ---
+# Where /api/products/search/ looks things up (see products/search/). The in-memory
+# BM25 index needs nothing else; on Postgres, 'products.search.postgres.PostgresSearchBackend'
+# shares one GIN index between all processes instead.
+PRODUCT_SEARCH_BACKEND = os.environ.get('PRODUCT_SEARCH_BACKEND', 'products.search.memory.InMemorySearchBackend')
+PRODUCT_SEARCH_MAX_LIMIT = 100
+PRODUCT_SEARCH_MAX_OFFSET = 1000
+PRODUCT_BROWSE_MAX_LIMIT = 100 # Page size cap for /api/products/ (see products/facets.py)
+PRODUCT_NEIGHBORS = 24 # Neighbors stored per product by `manage.py compute_neighbors`
+
+# Catalog versions the change log behind /api/catalog/changes/ reaches back; clients
+# further behind get a full snapshot (see products/changes.py)
+CATALOG_CHANGE_LOG_VERSIONS = 1000
+
+# --- ADMIN ---
+# Unfiltered changelists of tables past this many rows show the planner's estimate
+# (Postgres pg_class.reltuples) instead of running COUNT(*) (see api/admin_tools.py)
+ADMIN_ESTIMATED_COUNT_MIN = 100_000
+
+# --- REQUEST METRICS ---
+
+# Fraction of requests instrumented for SQL counts/time (latency and sizes are always recorded)
+METRICS_SAMPLE_RATE = float(os.environ.get('METRICS_SAMPLE_RATE', 0.1))
+METRICS_MAX_VIEWS = 200 # Caps the number of (URL name, method) series per process
+METRICS_SERVER_TIMING = os.environ.get('METRICS_SERVER_TIMING', 'True') == 'True'
+# If set, /api/metrics/ requires "Authorization: Bearer <token>"; unset, it is only served with DEBUG on
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
\ No newline at end of file
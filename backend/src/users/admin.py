@@ -1,5 +1,13 @@
 # backend/src/users/admin.py
-from django.contrib import admin
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin.helpers import ActionForm
+from django.db import transaction
+from django.utils import timezone
+
+from api.admin_tools import LargeTableAdmin
+from products.tags import rewrite_tags, rewritten_rows, tag_rewrites, with_tag, without_tag
+from .cache import forget_users
 from .models import UserAccount, UserProfile
 
 # We can display the UserProfile inline with the UserAccount for convenience
@@ -16,4 +24,52 @@ class CustomUserAdmin(admin.ModelAdmin):
 # admin.site.unregister(Group)
 
 admin.site.register(UserAccount, CustomUserAdmin)
+
+
+class LifestyleActionForm(ActionForm):
+    lifestyle = forms.CharField(required=False, max_length=50, label='Weekend lifestyle')
+
+
+@admin.register(UserProfile)
+class UserProfileAdmin(LargeTableAdmin):
+    list_display = ('user', 'primary_body_type', 'weekday_lifestyle', 'weekend_lifestyle', 'top_three_styles', 'updated_at')
+    list_select_related = ('user',)
+    list_only = ('user__email', *list_display[1:])
+    ordering = ('-updated_at',)
+    prefix_search_fields = ('user__email',)
+    raw_id_fields = ('user',)
+    action_form = LifestyleActionForm
+    actions = ('add_weekend_lifestyle', 'remove_weekend_lifestyle')
+
+    def _retag(self, request, queryset, remove):
+        label = request.POST.get('lifestyle', '').strip()
+        if not label:
+            self.message_user(request, "Enter a lifestyle.", messages.ERROR)
+            return
+        max_length = UserProfile._meta.get_field('weekend_lifestyle').max_length
+
+        def edit(value):
+            edited = without_tag(value, label) if remove else with_tag(value, label)
+            return edited if len(edited) <= max_length else (value or '')
+
+        with transaction.atomic():
+            rewrites = tag_rewrites(queryset, 'weekend_lifestyle', edit)
+            # The rows about to change, locked so the UPDATE below changes just these
+            user_ids = list(
+                rewritten_rows(queryset, 'weekend_lifestyle', rewrites).select_for_update()
+                .values_list('user_id', flat=True)
+            ) if rewrites else []
+            # A new updated_at is a new profile version, so the rankings are rebuilt
+            changed = rewrite_tags(queryset, 'weekend_lifestyle', rewrites, updated_at=timezone.now())
+            # An UPDATE sends no post_save, so drop the cached copies ourselves
+            transaction.on_commit(lambda: forget_users(user_ids))
+        self.message_user(request, f"{'Removed' if remove else 'Added'} \"{label}\" on {changed} profiles.")
+
+    @admin.action(description='Add weekend lifestyle to selected profiles')
+    def add_weekend_lifestyle(self, request, queryset):
+        self._retag(request, queryset, remove=False)
+
+    @admin.action(description='Remove weekend lifestyle from selected profiles')
+    def remove_weekend_lifestyle(self, request, queryset):
+        self._retag(request, queryset, remove=True)
 # Register your models here.
@@ -0,0 +1,113 @@
+# backend/src/users/authentication.py
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from recommender_project.routers import anote_user, note_user
+from .cache import auser_generation, get_cached_user, remember_user, user_generation
+
+
+def _user_id(validated_token):
+    """
+    The user id from the token, converted to the model's type (simplejwt
+    writes it as a string) so it matches the keys of the user cache.
+    """
+    try:
+        user_id = validated_token[api_settings.USER_ID_CLAIM]
+        return get_user_model()._meta.get_field(api_settings.USER_ID_FIELD).to_python(user_id)
+    except (KeyError, ValidationError) as e:
+        raise InvalidToken(_("Token contained no recognizable user identification")) from e
+
+
+def _check_user(user, validated_token):
+    """
+    The checks JWTAuthentication.get_user makes once it has found the user.
+    """
+    if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+        raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+    if api_settings.CHECK_REVOKE_TOKEN:
+        if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+            raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication for the hot-path views. The signed token tells us who
+    the user is; the user and their profile are then built from a short-TTL
+    per-process cache (users/cache.py), so a warm request makes no auth or
+    profile queries. A miss loads both with a single query.
+
+    request.user is a real UserAccount with `.profile` attached, but it may
+    be a few seconds stale: views that write use plain JWTAuthentication.
+    """
+
+    def get_user(self, validated_token):
+        user_id = _user_id(validated_token)
+        note_user(user_id)  # Keeps a user who just wrote on the primary
+        generation = user_generation(user_id)
+        user = get_cached_user(user_id, generation)
+        if user is None:
+            try:
+                user = self.user_model.objects.select_related('profile').get(**{api_settings.USER_ID_FIELD: user_id})
+            except self.user_model.DoesNotExist as e:
+                raise AuthenticationFailed(_("User not found"), code="user_not_found") from e
+            remember_user(user, generation)
+
+        _check_user(user, validated_token)
+        return user
+
+
+class AsyncJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication for plain Django async views (DRF views are sync only).
+    Token validation is pure CPU, so only the user lookup needs the async ORM;
+    the profile is fetched in the same query since every view using this needs
+    it. Shares the per-process user cache with CachedJWTAuthentication, unless
+    `cached` is False (for views that write).
+    """
+
+    def __init__(self, cached=True):
+        super().__init__()
+        self.cached = cached
+
+    async def aauthenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        validated_token = self.get_validated_token(raw_token)
+
+        return await self.aget_user(validated_token), validated_token
+
+    async def aget_user(self, validated_token):
+        """
+        Async version of CachedJWTAuthentication.get_user, with the same checks.
+        """
+        user_id = _user_id(validated_token)
+        await anote_user(user_id)
+        user = None
+        if self.cached:
+            generation = await auser_generation(user_id)
+            user = get_cached_user(user_id, generation)  # In-memory only, fine to call on the event loop
+        if user is None:
+            try:
+                user = await self.user_model.objects.select_related('profile').aget(
+                    **{api_settings.USER_ID_FIELD: user_id}
+                )
+            except self.user_model.DoesNotExist as e:
+                raise AuthenticationFailed(_("User not found"), code="user_not_found") from e
+            if self.cached:
+                remember_user(user, generation)
+
+        _check_user(user, validated_token)
+        return user
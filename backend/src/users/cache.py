@@ -0,0 +1,127 @@
+# backend/src/users/cache.py
+"""
+A small per-process cache of UserAccount + UserProfile rows, so the
+authentication hot path (see users/authentication.py) doesn't query the
+database on every request.
+
+Entries live for USER_CACHE_TTL seconds and the least recently used are
+dropped past USER_CACHE_MAX_ENTRIES. Saving a user or profile forgets the
+entry (see users/signals.py) by moving the user's generation, a key in the
+default cache that every entry is checked against. With a shared default
+cache (REDIS_URL) that reaches every process at once, for one cache read
+per request; with the local-memory default, other processes pick the
+change up when their copy expires.
+
+We store plain field values, not model instances, and build fresh instances
+for every request, so nothing a view does to its request.user leaks into the
+next request.
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+from .models import UserAccount, UserProfile
+
+_entries = OrderedDict()  # user id -> (expires at, generation, user values, profile values or None)
+_lock = threading.Lock()
+
+
+def generation_key(user_id):
+    return f'user-generation:{user_id}'
+
+
+def user_generation(user_id):
+    """
+    The user's current generation, to look the cache up with and, on a miss,
+    to remember the freshly loaded rows under.
+    """
+    return cache.get(generation_key(user_id))
+
+
+async def auser_generation(user_id):
+    return await cache.aget(generation_key(user_id))
+
+
+def _values(instance):
+    # Copied, so the caller may go on changing the instance it cached
+    return copy.deepcopy(tuple(getattr(instance, field.attname) for field in instance._meta.concrete_fields))
+
+
+def _build(model, values):
+    names = [field.attname for field in model._meta.concrete_fields]
+    # JSONField values are mutable; give every request its own copy
+    return model.from_db(DEFAULT_DB_ALIAS, names, copy.deepcopy(values))
+
+
+def remember_user(user, generation):
+    """
+    Caches `user` and its profile under `generation`, read before they were
+    loaded. The profile should already be loaded (select_related('profile'));
+    a missing profile is cached as missing.
+    """
+    try:
+        profile = user.profile
+    except UserProfile.DoesNotExist:
+        profile_values = None
+    else:
+        profile_values = _values(profile)
+
+    with _lock:
+        _entries[user.pk] = (time.monotonic() + settings.USER_CACHE_TTL, generation, _values(user), profile_values)
+        _entries.move_to_end(user.pk)
+        while len(_entries) > settings.USER_CACHE_MAX_ENTRIES:
+            _entries.popitem(last=False)
+
+
+def get_cached_user(user_id, generation):
+    """
+    A UserAccount (with `.profile` already attached) built from the cache, or
+    None if the user isn't cached, the entry has expired or it was cached
+    under another generation.
+    """
+    with _lock:
+        entry = _entries.get(user_id)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic() or entry[1] != generation:
+            del _entries[user_id]
+            return None
+        _entries.move_to_end(user_id)
+
+    _, _, user_values, profile_values = entry
+    user = _build(UserAccount, user_values)
+    if profile_values is not None:
+        user.profile = _build(UserProfile, profile_values)
+    else:
+        # Cache the absence too, so `user.profile` raises DoesNotExist without a query
+        UserAccount.profile.related.set_cached_value(user, None)
+    return user
+
+
+def forget_user(user_id):
+    forget_users([user_id])
+
+
+def forget_users(user_ids):
+    """
+    Drops the users' entries here and, by moving their generations, in every
+    process sharing the default cache. Call it once the change has
+    committed, or another process may cache the old rows again.
+    """
+    user_ids = list(user_ids)
+    with _lock:
+        for user_id in user_ids:
+            _entries.pop(user_id, None)
+    # Entries don't outlive USER_CACHE_TTL, so neither need the generations
+    generation = time.time_ns()
+    cache.set_many({generation_key(user_id): generation for user_id in user_ids}, settings.USER_CACHE_TTL)
+
+
+def clear():
+    with _lock:
+        _entries.clear()
@@ -0,0 +1,31 @@
+from django.db import migrations
+
+
+def create_prefix_index(apps, schema_editor):
+    """
+    Serves the admin's prefix search on email, UPPER(email::text) LIKE
+    UPPER('term%') (see api/admin_tools.py). Postgres only.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS users_useraccount_email_prefix_idx "
+        "ON users_useraccount ((UPPER(email::text)) text_pattern_ops)"
+    )
+
+
+def drop_prefix_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS users_useraccount_email_prefix_idx")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_userprofile'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_prefix_index, drop_prefix_index),
+    ]
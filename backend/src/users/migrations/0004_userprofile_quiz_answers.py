@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_useraccount_email_prefix_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='quiz_answers',
+            field=models.BinaryField(null=True),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='scoring_version',
+            field=models.PositiveIntegerField(editable=False, null=True),
+        ),
+    ]
@@ -69,8 +69,21 @@ class UserProfile(models.Model):
     
     top_three_styles = models.CharField(max_length=150, blank=True, null=True) # Stores the final result, e.g., "Classic,Romantic,Chic"
 
+    # The answers the fields above were scored from (quiz/answers.py), and
+    # the version of the scoring rules that scored them, so the profile can
+    # be re-scored when the rules change (manage.py rescore_profiles)
+    quiz_answers = models.BinaryField(null=True, editable=False)
+    scoring_version = models.PositiveIntegerField(null=True, editable=False)
+
     # Timestamp for when the profile was last updated
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # The admin lists the most recently updated first (pk breaks ties);
+            # also serves generate_recommendations --since
+            models.Index(fields=['updated_at', 'user'], name='users_profile_updated_idx'),
+        ]
+
     def __str__(self):
         return f"{self.user.email}'s Profile"
\ No newline at end of file
@@ -1,7 +1,9 @@
 # backend/src/users/signals.py
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from django.conf import settings
+from .cache import forget_user
 from .models import UserProfile
 
 # This function will be called every time a UserAccount object is saved.
@@ -11,4 +13,17 @@ def create_or_update_user_profile(sender, instance, created, **kwargs):
     Create a UserProfile when a new UserAccount is created.
     """
     if created:
-        UserProfile.objects.create(user=instance)
\ No newline at end of file
+        UserProfile.objects.create(user=instance)
+
+
+# Keep the per-process auth cache (users/cache.py) from serving stale rows
+@receiver([post_save, post_delete], sender=settings.AUTH_USER_MODEL)
+def forget_cached_user(sender, instance, **kwargs):
+    user_id = instance.pk
+    transaction.on_commit(lambda: forget_user(user_id))
+
+
+@receiver(post_save, sender=UserProfile)
+def forget_cached_profile(sender, instance, **kwargs):
+    user_id = instance.user_id
+    transaction.on_commit(lambda: forget_user(user_id))
\ No newline at end of file
@@ -1,3 +1,92 @@
+from django.contrib.messages import get_messages
+from django.core.cache import cache
 from django.test import TestCase
+from django.urls import reverse
+from rest_framework_simplejwt.tokens import AccessToken
 
-# Create your tests here.
+from . import cache as user_cache
+from .authentication import CachedJWTAuthentication
+from .models import UserAccount, UserProfile
+
+
+class UserCacheTests(TestCase):
+    def setUp(self):
+        user_cache.clear()
+        self.addCleanup(user_cache.clear)
+        self.user = UserAccount.objects.create(email='cached@example.com', first_name='A', last_name='B', password='!')
+        self.addCleanup(cache.delete, user_cache.generation_key(self.user.pk))
+        self.auth = CachedJWTAuthentication()
+        self.token = self.auth.get_validated_token(str(AccessToken.for_user(self.user)))
+
+    def test_warm_requests_make_no_queries_and_saves_are_seen(self):
+        with self.assertNumQueries(1):
+            user = self.auth.get_user(self.token)
+        user.profile.style_scores['Boho'] = 1.0  # Views get their own copy
+        with self.assertNumQueries(0):
+            user = self.auth.get_user(self.token)
+        self.assertEqual(user.profile.style_scores, {})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            user.profile.style_scores = {'Classic': 2.0}
+            user.profile.save()
+        with self.assertNumQueries(1):
+            self.assertEqual(self.auth.get_user(self.token).profile.style_scores, {'Classic': 2.0})
+
+    def test_a_save_in_another_process_drops_the_entry(self):
+        self.auth.get_user(self.token)
+        # What forget_users in another process sharing the default cache leaves behind
+        cache.set(user_cache.generation_key(self.user.pk), 1)
+        with self.assertNumQueries(1):
+            self.auth.get_user(self.token)
+        with self.assertNumQueries(0):
+            self.auth.get_user(self.token)
+
+
+class ProfileAdminTests(TestCase):
+    def setUp(self):
+        admin = UserAccount.objects.create(
+            email='admin@example.com', first_name='A', last_name='B', password='!', is_staff=True, is_superuser=True,
+        )
+        self.client.force_login(admin)
+        self.users = [
+            UserAccount.objects.create(email=f'retag{number}@example.com', first_name='A', last_name='B', password='!')
+            for number in range(3)
+        ]
+        for user, lifestyle in zip(self.users, ('Social', 'Social,Lounge', None)):
+            UserProfile.objects.filter(user=user).update(weekend_lifestyle=lifestyle)
+        for user in self.users:
+            self.addCleanup(cache.delete, user_cache.generation_key(user.pk))
+
+    def act(self, action, lifestyle, users):
+        return self.client.post(reverse('admin:users_userprofile_changelist'), {
+            'action': action, 'lifestyle': lifestyle, '_selected_action': [user.pk for user in users],
+        }, follow=True)
+
+    def lifestyles(self):
+        return [UserProfile.objects.get(user=user).weekend_lifestyle for user in self.users]
+
+    def test_changelist(self):
+        response = self.client.get(reverse('admin:users_userprofile_changelist'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['cl'].result_count, 4)
+
+    def test_weekend_lifestyles_are_added_and_removed(self):
+        before = dict(UserProfile.objects.values_list('user_id', 'updated_at'))
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.act('add_weekend_lifestyle', 'Lounge', self.users[:2])
+        self.assertEqual(self.lifestyles(), ['Social,Lounge', 'Social,Lounge', None])
+        self.assertIn('Added "Lounge" on 1 profiles.', [str(message) for message in get_messages(response.wsgi_request)])
+        # Only the profile that changed has a new version and lost its cached copy
+        after = dict(UserProfile.objects.values_list('user_id', 'updated_at'))
+        self.assertGreater(after[self.users[0].pk], before[self.users[0].pk])
+        self.assertEqual(after[self.users[1].pk], before[self.users[1].pk])
+        self.assertIsNotNone(cache.get(user_cache.generation_key(self.users[0].pk)))
+        self.assertIsNone(cache.get(user_cache.generation_key(self.users[1].pk)))
+
+        self.act('remove_weekend_lifestyle', 'Social', self.users)
+        self.assertEqual(self.lifestyles(), ['Lounge', 'Lounge', None])
+
+    def test_a_lifestyle_is_required(self):
+        response = self.act('add_weekend_lifestyle', ' ', self.users)
+        self.assertIn('Enter a lifestyle.', [str(message) for message in get_messages(response.wsgi_request)])
+        self.assertEqual(self.lifestyles(), ['Social', 'Social,Lounge', None])
@@ -19,19 +19,27 @@ function ResultsDisplay() {
     const [error, setError] = useState('');
 
     useEffect(() => {
+        let retryTimer: ReturnType<typeof setTimeout> | undefined;
+
         const fetchRecommendations = async () => {
             try {
                 const data = await apiService.getAuth('api/recommendations/');
+                // The backend answers 202 {status: "pending"} while the capsule is being built
+                if (!Array.isArray(data) && data.status === 'pending') {
+                    retryTimer = setTimeout(fetchRecommendations, 1000);
+                    return;
+                }
                 setProducts(data);
+                setIsLoading(false);
             } catch (err) {
                 setError('Could not fetch recommendations. Have you completed the quiz?');
                 console.error(err);
-            } finally {
                 setIsLoading(false);
             }
         };
 
         fetchRecommendations();
+        return () => clearTimeout(retryTimer);
     }, []); // Empty array means this runs once on component mount
 
     if (isLoading) {